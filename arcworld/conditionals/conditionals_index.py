@@ -0,0 +1,63 @@
+import numpy as np
+
+## The shape conditionals table (n_shapes, n_conditionals) of calculate_conditions.py, stored as one packed bit column
+## per conditional. A query is a conjunction of conditionals that shapes must satisfy and conditionals they must not
+## satisfy, evaluated with bitwise operations on the packed columns. The shape ids matching a query are memoized.
+
+
+class ConditionalsIndex:
+    """
+    Usage:
+        index = ConditionalsIndex(*hdf5_utils.load_conditions())
+        shape_ids = index.query(["is_shape_less_than_6_rows"], ["is_shape_not_fully_connected"])
+    """
+
+    def __init__(self, table: np.ndarray, names: list):
+        """
+        Parameters:
+        table (np.ndarray): (n_shapes, n_conditionals) table, nonzero where a shape satisfies a conditional
+        names (list): names of the conditionals, in the order of the columns of the table
+        """
+        table = np.asarray(table)
+        if table.ndim != 2 or table.shape[1] != len(names):
+            raise ValueError(f"Conditionals table of shape {table.shape} does not match {len(names)} conditionals")
+        self.names = {name: i for i, name in enumerate(names)}
+        self.n_shapes = table.shape[0]
+        self.columns = np.packbits(table.T != 0, axis=1)  # (n_conditionals, ceil(n_shapes / 8))
+        self.columns.flags.writeable = False
+        self._all_shapes = np.packbits(np.ones(self.n_shapes, dtype=bool))
+        self._queries = {}
+
+    def __len__(self):
+        return self.n_shapes
+
+    def column(self, name: str) -> np.ndarray:
+        """Boolean mask of the shapes satisfying a conditional"""
+        return np.unpackbits(self.columns[self.names[name]], count=self.n_shapes).astype(bool)
+
+    def packed_mask(self, to_satisfy=(), not_to_satisfy=()) -> np.ndarray:
+        """Packed bits of the shapes satisfying every conditional of to_satisfy and none of not_to_satisfy"""
+        mask = self._all_shapes.copy()
+        for name in to_satisfy:
+            mask &= self.columns[self.names[name]]
+        for name in not_to_satisfy:
+            mask &= ~self.columns[self.names[name]]
+        return mask
+
+    def query(self, to_satisfy=(), not_to_satisfy=()) -> np.ndarray:
+        """
+        Parameters:
+        to_satisfy (iterable): conditionals the shapes must satisfy
+        not_to_satisfy (iterable): conditionals the shapes must NOT satisfy
+
+        Returns:
+        shape_ids (np.ndarray): sorted, read-only array of the ids of the matching shapes
+        """
+        key = (frozenset(to_satisfy), frozenset(not_to_satisfy))
+        shape_ids = self._queries.get(key)
+        if shape_ids is None:
+            mask = self.packed_mask(*key)
+            shape_ids = np.flatnonzero(np.unpackbits(mask, count=self.n_shapes))
+            shape_ids.flags.writeable = False
+            self._queries[key] = shape_ids
+        return shape_ids
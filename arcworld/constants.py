@@ -1,21 +1,43 @@
-from matplotlib import colors
-
 MAX_GRID_SIZE = 100
 MIN_GRID_SIZE = 1 
 ALLOWED_COLORS = [0,1,2,3,4,5,6,7,8,9]
 PADDING = -1
 
-COLORMAP = colors.ListedColormap(
-    ['#FFFFFF', '#0074D9','#FF4136','#2ECC40','#FFDC00',
-    '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25'])
-# COLORMAP = colors.ListedColormap(
-#     ['#000000', '#0074D9','#FF4136','#2ECC40','#FFDC00',
-#     '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25'])
-NORM = colors.Normalize(vmin=0, vmax=9)
+COLORS_HEX = ['#FFFFFF', '#0074D9','#FF4136','#2ECC40','#FFDC00',
+              '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25']
+# COLORS_HEX = ['#000000', '#0074D9','#FF4136','#2ECC40','#FFDC00',
+#               '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25']
+
+
+## COLORMAP and NORM are only needed for plotting: they are created on first access, so that generating tasks does not
+## import matplotlib.
+def __getattr__(name):
+    if name not in ("COLORMAP", "NORM"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from matplotlib import colors
+    globals()["COLORMAP"] = colors.ListedColormap(COLORS_HEX)
+    globals()["NORM"] = colors.Normalize(vmin=0, vmax=9)
+    return globals()[name]
 
 
 class DoesNotFitException(Exception):
     pass
 
+class ShapeOverlapException(DoesNotFitException):
+    '''The shape covers a non-zero cell of the world'''
+    pass
+
+class ShapeOutsideWorldException(DoesNotFitException):
+    '''Part of the shape is outside the world'''
+    pass
+
+class EmptyShapeException(DoesNotFitException):
+    '''The shape has no colored pixel'''
+    pass
+
 class ShapeOutOfBounds(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class InfeasibleConfigException(Exception):
+    '''The generation config can not (or only very rarely) produce a task'''
+    pass
@@ -1,21 +1,21 @@
-import random
-from matplotlib import pyplot as plt
 import scipy
 import json
 import os
-import copy
 import numpy as np
-from arcworld.constants import COLORMAP, NORM, DoesNotFitException
+from arcworld.constants import (DoesNotFitException, EmptyShapeException, ShapeOutsideWorldException,
+                                ShapeOverlapException)
 from arcworld.shapes.base import Shape
 from arcworld.shapes.utils import grid_to_cropped_grid, shift_indexes, grid_to_pc
 from scipy.ndimage import binary_dilation
-from matplotlib import colors
-from PIL import Image
 
 ###################################################### PLOTTING ######################################################
 
+## matplotlib and PIL are imported by the plotting functions themselves, so that generating tasks does not import them
+
 def plot_grid(grid, title = '', size = (10,10), save_path = None):
     '''Plot a single grid. Possibly, save it to a file, with high resolution.'''
+    from matplotlib import pyplot as plt
+    from arcworld.constants import COLORMAP, NORM
 
     fig, ax = plt.subplots(1, 1, figsize= size, dpi=300)
     ax.imshow(grid, cmap=COLORMAP, norm=NORM)
@@ -40,6 +40,9 @@ def grid_to_rgb_sized(grid, output_size=(128, 128)):
     Returns:
         np.ndarray: RGB image array of shape (height, width, 3) resized to output_size.
     """
+    from matplotlib import colors
+    from PIL import Image
+
     COLORMAP = colors.ListedColormap(
         ['#FFFFFF', '#0074D9', '#FF4136', '#2ECC40', '#FFDC00',
          '#AAAAAA', '#F012BE', '#FF851B', '#7FDBFF', '#870C25'])
@@ -65,6 +68,8 @@ def grid_to_rgb_sized(grid, output_size=(128, 128)):
 
 def plot_task(task, size = (18,8)):
     '''Plot full task (input and output examples) with appropriate title'''
+    from matplotlib import pyplot as plt
+    from arcworld.constants import COLORMAP, NORM
     fig, axs = plt.subplots(2, len(task["pairs"]), figsize=size)
 
         
@@ -115,6 +120,8 @@ def plot_json_ARC_task(file_path: str, title = None):
     Args:
         file: Path to the json file containing the task.
     """
+    from matplotlib import pyplot as plt
+    from arcworld.constants import COLORMAP, NORM
 
     with open(file_path) as f:
         data = json.load(f)
@@ -184,86 +191,146 @@ def find_possible_positions_diagonal(world, grid, allow_holes = True) -> list([(
 
     return indexes
 
-def find_possible_positions_no_diagonal(original_grid, object_to_position):
-    '''Finds all possible positions for the grid in the world, using 8-connectivity'''
-    '''This function thus returns all possible positions for the grid in the world, *NOT including diagonal touch* '''
-    # Slower version that checks for 8-connectivity
-    m, n = original_grid.shape
-    h, w = object_to_position.shape
-    
-    # Precompute valid search space
-    safe_positions = []
-    object_mask = (object_to_position != 0)
-    
-    # Create a binary dilation of non-zero grid cells for faster neighbor checking
-    
+def get_danger_zone(grid):
+    '''Cells that are occupied or 8-connected to an occupied cell of the grid'''
     # Create a 3x3 structuring element for 8-connectivity
     structure = np.ones((3, 3), dtype=bool)
-    # Dilate non-zero cells to mark their 8-connected neighborhood
-    danger_zone = binary_dilation(original_grid != 0, structure=structure)
-    
-    # Vectorize the position checking
-    valid_i = np.arange(m - h + 1)
-    valid_j = np.arange(n - w + 1)
-    jj, ii = np.meshgrid(valid_j, valid_i)
-    
-    # Flatten for iteration
-    positions = np.column_stack((ii.ravel(), jj.ravel()))
-    
-    for i, j in positions:
-        # Check if any part of the object would overlap with danger zone
-        region = danger_zone[i:i+h, j:j+w]
-        if not np.any(region & object_mask):
-            safe_positions.append((i, j))
-    
-    return safe_positions
+    return binary_dilation(grid != 0, structure=structure)
 
 
-def randomly_add_shape_to_world(world, shape, background = 0, allow_touching_objects = False):
-    '''Randomly chooses position for the shape in the grid'''
-    shape = Shape(shape)
-    zeroedworld = world.copy()
-    zeroedworld[world == background] = 0
+def valid_positions_mask_no_diagonal(original_grid, object_to_position, danger_zone = None):
+    '''Returns a boolean (m - h + 1, n - w + 1) map of the top left corners where the object can be placed without
+    touching any non-zero cell of the grid, diagonals included. The danger zone of the grid can be passed if known.'''
+    m, n = original_grid.shape
+    h, w = object_to_position.shape
+    if h > m or w > n:
+        return np.zeros((max(m - h + 1, 0), max(n - w + 1, 0)), dtype=bool)
+    if danger_zone is None:
+        danger_zone = get_danger_zone(original_grid)
+    # Number of object pixels falling in the danger zone, for every offset at once. Inputs are integers, so the
+    # result is exact whichever method (direct or fft) scipy picks.
+    overlaps = scipy.signal.correlate(danger_zone.astype(np.int32), (object_to_position != 0).astype(np.int32), mode='valid')
+    return overlaps == 0
+
+
+def find_possible_positions_no_diagonal(original_grid, object_to_position):
+    '''Finds all possible positions for the grid in the world, using 8-connectivity'''
+    '''This function thus returns all possible positions for the grid in the world, *NOT including diagonal touch* '''
+    valid = valid_positions_mask_no_diagonal(original_grid, object_to_position)
+    return list(zip(*(indexes.tolist() for indexes in np.nonzero(valid))))
 
-    positions = find_possible_positions_no_diagonal(zeroedworld, shape.as_shape_only_grid)
 
-    if len(positions) == 0:
+def sample_position_no_diagonal(original_grid, object_to_position, rng = None, danger_zone = None):
+    '''Draws one of the positions of find_possible_positions_no_diagonal, without building the list of positions.
+    Consumes the random stream exactly like `positions[rng.integers(len(positions))]`.'''
+    rng = np.random.default_rng(rng)
+    valid = valid_positions_mask_no_diagonal(original_grid, object_to_position, danger_zone)
+    n_valid = np.count_nonzero(valid)
+    if n_valid == 0:
         raise DoesNotFitException('Shape does not fit')
-    
-    position = random.choice(positions)
-    shape.move_to_position(position)
-    shape_grid_at_world_size = shape.grid[:world.shape[0], :world.shape[1]]
-    world[shape_grid_at_world_size > 0] = shape_grid_at_world_size[shape_grid_at_world_size>0]
+    k = rng.integers(n_valid)
+    # k-th valid position in row-major order, the order of find_possible_positions_no_diagonal
+    return divmod(int(np.flatnonzero(valid)[k]), valid.shape[1])
+
+
+class PlacementContext:
+    '''Keeps the occupancy and the 8-connected danger zone of a world up to date while shapes are added one by one.
+    Committing a shape only updates the masks around its bounding box, instead of dilating the whole world again.'''
+
+    def __init__(self, world, background = 0):
+        self.world = world
+        self.occupancy = (world != background) & (world != 0)
+        self.danger_zone = get_danger_zone(self.occupancy)
+
+    def sample_position(self, shape_grid, rng = None):
+        '''Draws a position where shape_grid does not touch any committed shape, see sample_position_no_diagonal'''
+        return sample_position_no_diagonal(self.occupancy, shape_grid, rng, self.danger_zone)
+
+    def touches(self, shape):
+        '''Whether the (already positionned) shape overlaps or touches a committed shape, diagonals included'''
+        coords = shape.pc.coords[shape.pc.color_array > 0]
+        return bool(self.danger_zone[coords[:, 0], coords[:, 1]].any())
+
+    def commit(self, shape):
+        '''Writes the (already positionned) shape in the world and updates the masks around it'''
+        colors = shape.pc.color_array
+        keep = colors > 0
+        xs, ys = shape.pc.coords[keep, 0], shape.pc.coords[keep, 1]
+        self.world[xs, ys] = colors[keep]
+        self.occupancy[xs, ys] = True
+
+        # The dilation of a union is the union of the dilations: dilating the shape alone, with a margin of one cell,
+        # gives exactly the cells added to the danger zone
+        (min_x, min_y), (max_x, max_y) = shape.pc.bounding_corners
+        x0, y0 = max(min_x - 1, 0), max(min_y - 1, 0)
+        x1, y1 = min(max_x + 2, self.world.shape[0]), min(max_y + 2, self.world.shape[1])
+        local_mask = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+        local_mask[xs - x0, ys - y0] = True
+        self.danger_zone[x0:x1, y0:y1] |= get_danger_zone(local_mask)
+
+    def add_shape(self, shape, rng = None):
+        '''Randomly positions a copy of the shape in the world, and returns it'''
+        shape = Shape(shape)
+        position = self.sample_position(shape.as_shape_only_grid, rng)
+        shape.move_to_position(position)
+        self.commit(shape)
+        return shape
+
+
+def randomly_add_shape_to_world(world, shape, background = 0, allow_touching_objects = False, rng = None):
+    '''Randomly chooses position for the shape in the grid'''
+    rng = np.random.default_rng(rng)
+    shape = PlacementContext(world, background).add_shape(shape, rng)
     return world, shape
 
-def position_shape_in_world(world, shape, check_for_overlap = True):
-    new_world = copy.deepcopy(world)
+def position_shape_in_world(world, shape, check_for_overlap = True, in_place = False):
+    '''Writes the colored pixels of the shape in the world at its current position. Raises a DoesNotFitException if
+    check_for_overlap and the shape overlaps a non-zero cell of the world or goes out of it (see get_placement_error).
+    With in_place, the world itself is modified instead of a copy.'''
+    new_world = world if in_place else world.copy()
     if check_for_overlap:
-        if check_if_shape_can_be_positionned_in_world(new_world, shape):
-            for idx in shape.pc:
-                new_world[idx] = shape.pc[idx]
-            return new_world
-        raise DoesNotFitException
-    else:
-        for idx in shape.pc:
-            new_world[idx] = shape.pc[idx]
-        return new_world
+        error = get_placement_error(new_world, shape)
+        if error is not None:
+            raise error
+    coords = shape.pc.coords
+    colored = shape.pc.color_array != 0
+    new_world[coords[colored, 0], coords[colored, 1]] = shape.pc.color_array[colored]
+    return new_world
 
 
 def check_if_shape_can_be_positionned_in_world(world, shape):
     '''assesses whether the shape new current position can be positionned in the world'''
-    return shape.current_position in find_possible_positions_diagonal(world, shape.as_shape_only_grid)
+    return get_placement_error(world, shape) is None
+
+
+def get_placement_error(world, shape):
+    '''Only reads the world under the pixels of the shape: all its points, colorless ones included, must be inside the
+    world, and its colored pixels must be on zero cells. Returns None if the shape can be positionned, and otherwise
+    the DoesNotFitException subclass saying why.'''
+    colored = shape.pc.color_array != 0
+    if not colored.any():
+        return EmptyShapeException('Shape has no colored pixel')
+    all_coords = shape.pc.coords
+    (min_x, min_y), (max_x, max_y) = all_coords.min(axis=0), all_coords.max(axis=0)
+    if min_x < 0 or min_y < 0 or max_x >= world.shape[0] or max_y >= world.shape[1]:
+        return ShapeOutsideWorldException(f'Shape is not inside the world of size {world.shape}')
+    coords = all_coords[colored]
+    if np.any(world[coords[:, 0], coords[:, 1]]):
+        return ShapeOverlapException('Shape overlaps another shape')
+    return None
+
 
 ################################################## TASK GENERATION ########################################################
 
-def generate_key(key_length = 9):
+def generate_key(key_length = 9, rng = None):
     """ generates a random task identifier """
+    rng = np.random.default_rng(rng)
     key = ''
     for i in range(key_length):
-        if random.choice((True, False)):
-            key += chr(random.randint(48, 57))
+        if rng.integers(2):
+            key += chr(rng.integers(48, 58))
         else:
-            key += chr(random.randint(97, 122))
+            key += chr(rng.integers(97, 123))
     return key
 
 def from_generated_task_to_arc_json_format(ex):
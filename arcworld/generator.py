@@ -1,72 +1,316 @@
+import warnings
+
 import numpy as np
-import random
-import h5py
-import pandas as pd
 
 from . import hdf5_utils
+from .shape_library import ShapeLibrary
 from .shapes.base import Shape
 from .general_utils import (
+    PlacementContext,
     position_shape_in_world,
-    randomly_add_shape_to_world,
 )
+from .conditionals.conditionals_index import ConditionalsIndex
 from .conditionals.single_shape_conditionals import (
     conditionals_dict as single_shape_conditionals_dict,
 )
 from .transformations.shape_transformations import (
+    apply_transform_suite,
+    compile_transform_suite,
     transformations_dict,
     transformations_constraints,
 )
+from .transformations.geometric_transformations import TRANSLATIONS
+from .transformations.transform_cache import TransformCache
+from .utils.config_feasibility import analyze_config_feasibility, check_config_feasibility
 from .utils.config_validation import ConfigValidator
+from .constants import (
+    DoesNotFitException,
+    EmptyShapeException,
+    ShapeOutOfBounds,
+    ShapeOutsideWorldException,
+    ShapeOverlapException,
+)
+from .utils.instrumentation import RejectionStats, StageTimer
+from .utils.task_enumeration import TaskSpace
+
+
+def get_rejection_reason(exception: Exception) -> str:
+    """Rejection reason (see instrumentation.REJECTION_REASONS) of an exception raised while generating a pair"""
+    if isinstance(exception, EmptyShapeException):
+        return "null_shape"
+    if isinstance(exception, ShapeOverlapException):
+        return "output_overlap"
+    if isinstance(exception, (ShapeOutOfBounds, ShapeOutsideWorldException)):
+        return "shape_out_of_bounds"
+    if isinstance(exception, DoesNotFitException):
+        return "does_not_fit"
+    return "other"
+
+
+class SuitePlan:
+    """Everything generate_single_task needs to know about a transform suite, compiled once per config"""
+
+    __slots__ = ("transform_suite", "stages", "step_stages", "shape_constraints", "shape_ids")
+
+    def __init__(self, transform_suite, stages, step_stages, shape_constraints, shape_ids):
+        self.transform_suite = transform_suite  # list of transform names
+        self.stages = stages  # compiled stages of transform_suite
+        self.step_stages = step_stages  # compiled stages of every transform of transform_suite
+        self.shape_constraints = shape_constraints  # merged incompatible shape conditionals of the suite
+        self.shape_ids = shape_ids  # ids of the library shapes the suite can be applied to
+
+    def __repr__(self):
+        return f"SuitePlan({self.transform_suite}, {len(self.shape_ids)} shapes)"
+
+
+class GeneratorCore:
+    """
+    Config independent state, loaded once and shared by all the Generators of a process: shape library,
+    conditionals index, transform feasibility table and transform registry. The arrays are read-only; the only
+    mutable parts are the memoized conditionals queries and the transform cache, which are keyed on config
+    independent values, and the feasibility reports, which are keyed on the config.
+
+    Usage:
+        core = GeneratorCore.shared()
+        gen = Generator(config, seed=0, core=core)  # or Generator.with_config on an existing Generator
+    """
+
+    _shared = None
+
+    def __init__(self):
+        self.transformations_dict = transformations_dict
+        self.transformations_constraints = transformations_constraints
+        self.conditionals_dict = single_shape_conditionals_dict
+
+        shape_conditionals_table, conditionals_names = hdf5_utils.load_conditions()
+        shape_conditionals_table.flags.writeable = False
+        self.shape_conditionals_table = shape_conditionals_table
+        self.conditionals_index = ConditionalsIndex(shape_conditionals_table, conditionals_names)
+        self.shape_library = ShapeLibrary.load()
+        self.feasibility_transforms, self.transform_feasibility = load_transform_feasibility(
+            len(self.shape_library)
+        )
+        self.transform_cache = TransformCache()
+        self.feasibility_reports = {}  # config json -> Generator.analyze_feasibility report
+
+    @classmethod
+    def shared(cls, reload: bool = False) -> "GeneratorCore":
+        """Returns the core of the process, loading it on first use (or again if reload is True, e.g. after
+        recomputing the conditions)"""
+        if cls._shared is None or reload:
+            cls._shared = cls()
+        return cls._shared
+
+
+def load_transform_feasibility(n_shapes: int):
+    """
+    Loads the shape x transform feasibility table computed by calculate_transform_feasibility.py, if any
+
+    Returns:
+    feasibility_transforms (dict): column of every transform in the table
+    transform_feasibility (dict): the table, see hdf5_utils.save_transform_feasibility. None if it is missing
+    """
+    feasibility = hdf5_utils.load_transform_feasibility()
+    if feasibility is None:
+        return {}, None
+    transform_names, table = feasibility
+    if table["fails"].shape[0] != n_shapes:
+        warnings.warn(
+            "The transform feasibility table does not match the shape library, it is ignored. "
+            "Run calculate_transform_feasibility.py to recompute it."
+        )
+        return {}, None
+    for values in table.values():
+        values.flags.writeable = False
+    return {k: v for v, k in enumerate(transform_names)}, table
 
 
 class Generator:
-    def __init__(self, config: dict | ConfigValidator, debug_mode=False):
+    def __init__(
+        self,
+        config: dict | ConfigValidator,
+        debug_mode=False,
+        seed=None,
+        core: GeneratorCore = None,
+        instrument: bool = False,
+        check_feasibility: str = "warn",
+    ):
+        """
+        Parameters:
+        config (dict | ConfigValidator): generation config
+        debug_mode (bool): print the exceptions raised while generating tasks
+        seed (int | np.random.SeedSequence | np.random.Generator): seed of the generator. All the randomness of the
+            generation is drawn from self.rng. With generate_single_task(task_index=i), the task is generated from
+            its own stream spawned from the seed, so it only depends on (config, seed, i).
+        core (GeneratorCore): config independent state, GeneratorCore.shared() by default
+        instrument (bool): time the stages of generate_single_task and count trials in self.timer
+        check_feasibility (str): "warn" to estimate the acceptance rate of the config (see self.analyze_feasibility)
+            and warn about the suites which rarely or never produce a pair, "strict" to raise instead, "off" to skip
+            the analysis. The report of a config is computed once per core.
+        """
+        if isinstance(seed, np.random.Generator):
+            self.rng = seed
+            self.seed_sequence = seed.bit_generator.seed_seq
+        else:
+            if not isinstance(seed, np.random.SeedSequence):
+                seed = np.random.SeedSequence(seed)
+            self.seed_sequence = seed
+            self.rng = np.random.default_rng(seed)
         if isinstance(config, ConfigValidator):
             self.config = config
         else:
             self.config = ConfigValidator(**config)
-        self.transformations_dict = transformations_dict  ## Loads transformations_dict into the class (from the ...transformation.py files)
-        self.transformations_constraints = transformations_constraints
 
-        self.conditionals_dict = single_shape_conditionals_dict  ## Loads conditionals_dict into the class (from the ...conditionals.py files)
+        self.timer = StageTimer(enabled=instrument)
+        self.rejections = RejectionStats()  # Pair attempts and rejection reasons per transform suite
+        self.core = core if core is not None else GeneratorCore.shared()
+        self.transformations_dict = self.core.transformations_dict  ## Loads transformations_dict into the class (from the ...transformation.py files)
+        self.transformations_constraints = self.core.transformations_constraints
+        self.transform_cache = self.core.transform_cache
+        self.conditionals_dict = self.core.conditionals_dict  ## Loads conditionals_dict into the class (from the ...conditionals.py files)
+        self.conditionals_index = self.core.conditionals_index
+        self.conditionals_names = self.conditionals_index.names
+        self.shape_library = self.core.shape_library
+        self.feasibility_transforms = self.core.feasibility_transforms
+        self.transform_feasibility = self.core.transform_feasibility
 
-        self.shape_conditionals_table, self.conditionals_names = (
-            hdf5_utils.load_conditions()
-        )
-        self.shape_conditionals_table_df = pd.DataFrame(self.shape_conditionals_table)
-        self.conditionals_names = {k: v for v, k in enumerate(self.conditionals_names)}
-        self.shape_file = h5py.File(hdf5_utils.SHAPE_DATASET_PATH)
         self.subset_shapes()
+        self.compile_plan()
         self.max_trials_for_function_combination = (
             15  # Number of trials to generate a specific function combination
         )
         self.max_trials_for_configuration = 30  # Number of trials to sample from a specific configuration before quitting
         # and advising the user to maybe update the config
         self.debug_mode = debug_mode
+        self.check_feasibility = check_feasibility
+        self.feasibility_report = None
+        if check_feasibility != "off":
+            config_key = self.config.model_dump_json()
+            if config_key not in self.core.feasibility_reports:
+                self.core.feasibility_reports[config_key] = self.analyze_feasibility()
+            self.feasibility_report = self.core.feasibility_reports[config_key]
+            check_config_feasibility(self.feasibility_report, strict=check_feasibility == "strict")
+
+    def with_config(self, config: dict | ConfigValidator, seed=None, debug_mode=None,
+                    check_feasibility: str = "off") -> "Generator":
+        """Returns a Generator for another config (and seed), sharing the core of this one. The feasibility of the
+        config is not checked by default, see __init__."""
+        if debug_mode is None:
+            debug_mode = self.debug_mode
+        return Generator(
+            config,
+            debug_mode=debug_mode,
+            seed=seed,
+            core=self.core,
+            instrument=self.timer.enabled,
+            check_feasibility=check_feasibility,
+        )
+
+    def task_rng(self, task_index: int) -> np.random.Generator:
+        """Independent random stream of task `task_index`, i.e. the task_index-th child of the seed sequence"""
+        return np.random.default_rng(
+            np.random.SeedSequence(
+                self.seed_sequence.entropy,
+                spawn_key=self.seed_sequence.spawn_key + (task_index,),
+                pool_size=self.seed_sequence.pool_size,
+            )
+        )
+
+    def get_doomed_shapes(self, transform_suite: list):
+        """
+        Shapes on which the transform suite is known to fail, from the feasibility table. Translations only move a
+        shape, so the first other transform of the suite is applied to the library shape itself: the shapes on which
+        it fails, or which it leaves empty, can not make a valid pair.
+
+        Returns:
+        doomed_shapes (np.ndarray): boolean mask over the library shapes, None if nothing is known
+        """
+        if self.transform_feasibility is None:
+            return None
+        for t in transform_suite:
+            if t in TRANSLATIONS:
+                continue
+            if t not in self.feasibility_transforms:
+                return None
+            column = self.feasibility_transforms[t]
+            return (
+                self.transform_feasibility["fails"][:, column]
+                | self.transform_feasibility["becomes_empty"][:, column]
+            )
+        return None
 
     def subset_shapes(self):
         """Subset shapes based on the compulsory conditions specified in the config in order to reduce search
         space during generation"""
-        conditional_indices_of_interest = []
-        for c in self.config.shape_compulsory_conditionals:
-            conditional_indices_of_interest.append(self.conditionals_names[c])
-        condition_satisfaction_mask = (
-            self.shape_conditionals_table[:, conditional_indices_of_interest] == 1
+        self.possible_shapes = self.conditionals_index.query(
+            self.config.shape_compulsory_conditionals
         )
-        condition_satisfaction_mask_sum = np.sum(condition_satisfaction_mask, axis=-1)
-        satisfying_rows = np.where(
-            condition_satisfaction_mask_sum == len(conditional_indices_of_interest)
-        )[0].tolist()
-        self.possible_shapes = np.arange(self.shape_conditionals_table.shape[0])[
-            satisfying_rows
-        ]
-        self.shape_conditionals_table = self.shape_conditionals_table[satisfying_rows]
+        self.shape_conditionals_table = self.core.shape_conditionals_table[self.possible_shapes]
+
+    def compile_plan(self):
+        """Compiles a SuitePlan for every allowed combination of the config. Plans of sampled suites (with
+        allowed_transformations) are compiled the first time the suite is sampled."""
+        self.suite_plans = {}
+        self.allowed_suite_plans = None
+        if self.config.allowed_combinations is not None:
+            self.allowed_suite_plans = [
+                self.get_suite_plan(transform_suite)
+                for transform_suite in self.config.allowed_combinations
+            ]
+
+    def get_suite_plan(self, transform_suite: list) -> SuitePlan:
+        key = tuple(transform_suite)
+        plan = self.suite_plans.get(key)
+        if plan is None:
+            shape_constraints = self.get_shape_constraints_from_rule_sampled(transform_suite)
+            with self.timer.stage("get_compatible_shape_rows"):
+                shape_ids = self.get_compatible_shape_rows(
+                    shape_conditionals_to_satisfy=self.config.shape_compulsory_conditionals,
+                    shape_conditionals_not_to_satisfy=shape_constraints,
+                    transform_suite=transform_suite,
+                )
+            stages = compile_transform_suite(transform_suite)
+            step_stages = [compile_transform_suite([t]) for t in transform_suite]
+            plan = SuitePlan(list(transform_suite), stages, step_stages, shape_constraints, shape_ids)
+            self.suite_plans[key] = plan
+        return plan
+
+    def analyze_feasibility(self) -> dict:
+        """
+        Static estimate of the compatible shape pool and the acceptance rate of every suite of the config, see
+        utils/config_feasibility.py. With allowed_transformations, suites are sampled at generation time: every
+        allowed transform is analyzed as a suite of its own.
+
+        Returns:
+        report (dict): suite key -> estimate
+        """
+        if self.allowed_suite_plans is not None:
+            suite_plans = self.allowed_suite_plans
+        else:
+            suite_plans = [self.get_suite_plan([t]) for t in self.config.allowed_transformations]
+        return analyze_config_feasibility(
+            self.config,
+            suite_plans,
+            self.shape_library,
+            self.feasibility_transforms,
+            self.transform_feasibility,
+            self.max_trials_for_function_combination,
+        )
+
+    def sample_suite_plan(self) -> SuitePlan:
+        """Samples a transform suite like sample_transform_suite, and returns its plan"""
+        if self.allowed_suite_plans is not None:
+            return self.allowed_suite_plans[
+                self.rng.integers(len(self.allowed_suite_plans))
+            ]
+        return self.get_suite_plan(self.sample_transform_suite())
 
     def get_compatible_shape_rows(
         self,
         shape_conditionals_to_satisfy: list,
         shape_conditionals_not_to_satisfy: list,
-    ) -> list:
+        transform_suite: list = None,
+    ) -> np.ndarray:
         """
         Sample shapes rows from the library of available shapes given compulsory conditionals and constraints from
         sequence of transformations
@@ -80,9 +324,11 @@ class Generator:
         Parameters:
         conditionals_to_satisfy (list): shape conditionals that sample shapes must satisfy
         conditionals_not_to_satisfy (list): shape conditionals that sample shapes must NOT satisfy
+        transform_suite (list): if given, shapes on which the suite is known to fail are excluded (see
+            self.get_doomed_shapes)
 
         Returns:
-        compatible_shape_rows (list): shape rows that are compatible to position
+        compatible_shape_rows (np.ndarray): sorted ids of the shapes that are compatible to position
         """
 
         ## Verify there is no overlap between conditions to satisfy and not to satisfy
@@ -98,36 +344,15 @@ class Generator:
                             to satisfy. Check your config file!"
             )
 
-        ## "Conditional indices" serve the purpose of searching through the shape table and corresponding conditionals.
-        conditionals_to_satisfy_indices = []
-        for c in shape_conditionals_to_satisfy:
-            conditionals_to_satisfy_indices.append(self.conditionals_names[c])
-
-        conditionals_not_to_satisfy_indices = []
-        for c in shape_conditionals_not_to_satisfy:
-            conditionals_not_to_satisfy_indices.append(self.conditionals_names[c])
-
-        conditions_ones = [
-            self.shape_conditionals_table_df[col] == 1
-            for col in conditionals_to_satisfy_indices
-        ]
-        conditions_zeros = [
-            self.shape_conditionals_table_df[col] == 0
-            for col in conditionals_not_to_satisfy_indices
-        ]
-
-        if conditions_ones:
-            combined_conditions = conditions_ones[0]
-            for condition in conditions_ones[1:]:
-                combined_conditions &= condition
-
-        # For the zeros, start with the first condition and chain with &
-        if conditions_zeros:
-            for condition in conditions_zeros:
-                combined_conditions &= condition
-
-        # Filter the DataFrame based on the combined conditions
-        return self.shape_conditionals_table_df[combined_conditions].index.tolist()
+        ## Shapes satisfying the conjunction, from the packed bit columns of the conditionals index (memoized)
+        compatible_shape_rows = self.conditionals_index.query(
+            shape_conditionals_to_satisfy, shape_conditionals_not_to_satisfy
+        )
+
+        doomed_shapes = self.get_doomed_shapes(transform_suite) if transform_suite is not None else None
+        if doomed_shapes is not None:
+            compatible_shape_rows = compatible_shape_rows[~doomed_shapes[compatible_shape_rows]]
+        return compatible_shape_rows
 
     def randomly_sample_shapes(
         self, compatible_shape_rows: list, n_shapes_wanted: int
@@ -141,9 +366,8 @@ class Generator:
         """
         shapes_to_position = []
         for i in range(n_shapes_wanted):
-            random_row = int(random.choice(compatible_shape_rows))
-            shape_grid = hdf5_utils.load_shape(random_row, self.shape_file)
-            shapes_to_position.append(Shape(shape_grid))
+            random_row = int(compatible_shape_rows[self.rng.integers(len(compatible_shape_rows))])
+            shapes_to_position.append(self.shape_library.get_shape(random_row))
         return shapes_to_position
 
     def sample_transform_suite(self):
@@ -156,7 +380,9 @@ class Generator:
         if (
             self.config.allowed_combinations is not None
         ):  ## If allowed combinations are specified, sample from them
-            return random.choice(self.config.allowed_combinations)
+            return self.config.allowed_combinations[
+                self.rng.integers(len(self.config.allowed_combinations))
+            ]
 
         elif (
             self.config.allowed_transformations is not None
@@ -168,13 +394,17 @@ class Generator:
                 if t in self.config.allowed_transformations
             ]
 
-            depth = random.randint(
-                self.config.min_transformation_depth,
-                self.config.max_transformation_depth,
+            depth = int(
+                self.rng.integers(
+                    self.config.min_transformation_depth,
+                    self.config.max_transformation_depth + 1,
+                )
             )
             transform_suite = []
             for k in range(depth):
-                transform_suite.append(random.sample(compatible_transforms, 1)[0])
+                transform_suite.append(
+                    compatible_transforms[self.rng.integers(len(compatible_transforms))]
+                )
 
                 ## Remove incompatible transforms from the pool of compatible transforms once transform selected.
                 ## This will basically remove "translate_down" from pool of possible transforms if "translate_up" is selected, for example.
@@ -229,25 +459,65 @@ class Generator:
         main_grid (np.ndarray): grid with positionned shape
         positionned_shapes (list[Shape]): list of Shapes.
         """
-        grid_size = [
-            random.randint(self.config.min_grid_size, self.config.max_grid_size),
-            random.randint(self.config.min_grid_size, self.config.max_grid_size),
-        ]
+        grid_size = self.rng.integers(
+            self.config.min_grid_size, self.config.max_grid_size + 1, size=2
+        ).tolist()
         main_grid = np.zeros(grid_size)
 
-        n_shapes_wanted = random.randint(
-            self.config.min_n_shapes_per_grid, self.config.max_n_shapes_per_grid
+        n_shapes_wanted = int(
+            self.rng.integers(
+                self.config.min_n_shapes_per_grid, self.config.max_n_shapes_per_grid + 1
+            )
         )
 
-        shapes_to_position = self.randomly_sample_shapes(
-            compatible_shape_rows=compatible_shape_rows, n_shapes_wanted=n_shapes_wanted
-        )
+        with self.timer.stage("randomly_sample_shapes"):
+            shapes_to_position = self.randomly_sample_shapes(
+                compatible_shape_rows=compatible_shape_rows, n_shapes_wanted=n_shapes_wanted
+            )
+        placement = PlacementContext(main_grid)
+        if self.config.max_placement_retries > 0:
+            return main_grid, self.place_shapes_with_retries(placement, shapes_to_position, compatible_shape_rows)
         positionned_shapes = []
         for s in shapes_to_position:
-            main_grid, positionned_s = randomly_add_shape_to_world(main_grid, s)
-            positionned_shapes.append(positionned_s)
+            positionned_shapes.append(placement.add_shape(s, rng=self.rng))
         return main_grid, positionned_shapes
 
+    def place_shapes_with_retries(
+        self, placement: PlacementContext, shapes_to_position: list[Shape], compatible_shape_rows: list
+    ) -> list[Shape]:
+        """
+        Places the shapes largest first, keeping the shapes already placed when one does not fit: the failing shape is
+        replaced by a new shape sampled from compatible_shape_rows, at most config.max_placement_retries times for the
+        whole grid. Large shapes are the most likely not to fit, so placing them first on an empty grid means fewer
+        retries, and a retry only throws away one shape instead of the whole grid.
+
+        Parameters:
+        placement (PlacementContext): placement context of the input grid
+        shapes_to_position (list[Shape]): shapes sampled by self.randomly_sample_shapes
+        compatible_shape_rows (list): pool the replacement shapes are sampled from
+
+        Returns:
+        positionned_shapes (list[Shape]): positionned shapes, largest first. Raises a DoesNotFitException once the
+            retries are exhausted
+        """
+        areas = [s.n_rows * s.n_cols for s in shapes_to_position]
+        order = np.argsort(-np.array(areas), kind="stable")
+        n_retries_left = self.config.max_placement_retries
+        positionned_shapes = []
+        for idx in order:
+            shape = shapes_to_position[idx]
+            while True:
+                try:
+                    positionned_shapes.append(placement.add_shape(shape, rng=self.rng))
+                    break
+                except DoesNotFitException:
+                    if n_retries_left == 0:
+                        raise
+                    n_retries_left -= 1
+                    self.timer.count("placement_retries")
+                    shape = self.randomly_sample_shapes(compatible_shape_rows, n_shapes_wanted=1)[0]
+        return positionned_shapes
+
     def apply_transform_suite_to_grid(
         self, transform_suite, input_grid, shapes_positionned
     ):
@@ -266,21 +536,21 @@ class Generator:
             input_grid.copy()
         ]  # To keep track of the full sequence of grids
         for original_shape in shapes_positionned:
-            transformed_shape = original_shape
-            for t in transform_suite:
-                transformed_shape = self.transformations_dict[t](transformed_shape)
+            transformed_shape = self.transform_cache.apply(original_shape, transform_suite)
 
             if (
                 transformed_shape.is_null == False
             ):  ### Invalidate the whole initial grid
-                output_grid = position_shape_in_world(output_grid, transformed_shape)
+                output_grid = position_shape_in_world(
+                    output_grid, transformed_shape, in_place=True
+                )
             else:
                 output_grid = None  # If the shape is null, we invalidate the whole grid
             full_grid_sequence.append(output_grid.copy())
         return output_grid, full_grid_sequence
 
     def apply_transform_suite_to_grid_2(
-        self, transform_suite, input_grid, shapes_positionned
+        self, transform_suite, input_grid, shapes_positionned, plan: SuitePlan = None
     ):
         """
         Apply the transformation suite to the grid and return the output grid.
@@ -290,35 +560,45 @@ class Generator:
         transform_suite (list): the transformation sequence for the task. e.g. ["translate_up", "fill_holes"]
         input_grid (np.ndarray): grid with positioned shapes
         shapes_positionned (list[Shape]): list of Shapes.
+        plan (SuitePlan): plan of transform_suite, to reuse its compiled stages
 
         Returns:
         output_grid (np.ndarray): grid with positioned shapes
-        full_grid_sequence (list): sequence of grid states after each transformation
+        full_grid_sequence (list): sequence of grid states after each transformation, None from the first step
+            leaving an empty shape
         """
         output_grid = np.zeros_like(input_grid)
         full_grid_sequence = [input_grid.copy()]
+        if plan is not None:
+            stages, step_stages = plan.stages, plan.step_stages
+        else:
+            stages, step_stages = None, [compile_transform_suite([t]) for t in transform_suite]
 
-        # Start with the original shapes
         current_shapes = shapes_positionned
-
-        for t in transform_suite:
-            transformed_shapes = []
-            for shape in current_shapes:
-                transformed_shape = self.transformations_dict[t](shape)
-                transformed_shapes.append(transformed_shape)
-            current_shapes = transformed_shapes
+        for step in range(1, len(transform_suite) + 1):
+            if step < len(transform_suite):
+                # Intermediate shapes: only the transformation of this step is applied to the previous shapes
+                current_shapes = [apply_transform_suite(shape, step_stages[step - 1]) for shape in current_shapes]
+            else:
+                # Final shapes: the whole suite, from the cache of the library shapes when possible
+                current_shapes = [
+                    self.transform_cache.apply(shape, transform_suite, stages=stages)
+                    for shape in shapes_positionned
+                ]
 
             # Build grid for this transformation step
             temp_grid = np.zeros_like(input_grid)
             for shape in current_shapes:
                 if not shape.is_null:
-                    temp_grid = position_shape_in_world(temp_grid, shape)
+                    position_shape_in_world(temp_grid, shape, in_place=True)
                 else:
                     temp_grid = None
                     break
-            full_grid_sequence.append(
-                temp_grid.copy() if temp_grid is not None else None
-            )
+            full_grid_sequence.append(temp_grid)  # Fresh grid for every step, no copy needed
+            if temp_grid is None:
+                # Later steps would be applied to an empty shape: the remaining grids are invalid as well
+                full_grid_sequence += [None] * (len(transform_suite) - step)
+                break
 
         # Final output grid is the last valid temp_grid
         output_grid = (
@@ -326,67 +606,153 @@ class Generator:
         )
         return output_grid, full_grid_sequence
 
-    def generate_single_task(self):
-        task = {"pairs": [], "transform_suite": None}
+    def generate_single_task(self, task_index: int = None):
+        """
+        Generate a task. If task_index is given, the generator is first reseeded with the stream of this task
+        (see self.task_rng), so that the task only depends on the config, the seed and task_index.
+        """
+        with self.timer.stage("generate_single_task"):
+            return self._generate_single_task(task_index)
+
+    def _generate_single_task(self, task_index: int = None):
+        if task_index is not None:
+            self.rng = self.task_rng(task_index)
         n_config_trials = 0
         while n_config_trials < self.max_trials_for_configuration:
-            transform_suite = self.sample_transform_suite()
-
-            # Probably some edits needed here --> not a practical way of operating
-            task_shape_constraints = self.get_shape_constraints_from_rule_sampled(
-                transform_suite
-            )
-            compatible_shape_rows = self.get_compatible_shape_rows(
-                shape_conditionals_to_satisfy=self.config.shape_compulsory_conditionals,
-                shape_conditionals_not_to_satisfy=task_shape_constraints,
-            )
+            with self.timer.stage("sample_transform_suite"):
+                plan = self.sample_suite_plan()
+            transform_suite = plan.transform_suite
 
-            failed_transform_trials = 0
-            generated_pairs = []
-            while (
-                failed_transform_trials < self.max_trials_for_function_combination
-                and len(generated_pairs) < self.config.n_examples
-            ):
-                try:
-                    input_grid, shapes_positionned = self.set_up_initial_grid(
-                        compatible_shape_rows=compatible_shape_rows
-                    )
-                    output_grid, full_grid_sequence = (
-                        self.apply_transform_suite_to_grid_2(
-                            transform_suite, input_grid, shapes_positionned
-                        )
-                    )
-                    to_append = {
-                        "input": input_grid,
-                        "output": output_grid,
-                        "n_shapes": len(shapes_positionned),
-                        "grid_size": input_grid.shape,
-                        "full_grid_sequence": full_grid_sequence,
-                    }
-                    generated_pairs.append(to_append)
-                    failed_transform_trials = 0  # If we successfully generate a grid, we reset the failed trials
-                except Exception as e:
-                    if self.debug_mode:
-                        print(e)
-                    failed_transform_trials += 1
-
-            if len(generated_pairs) == self.config.n_examples:
-                n_config_trials = (
-                    0  # If we successfully generate a grid, we reset the config trials
-                )
+            generated_pairs = self.sample_pairs(plan, self.config.n_examples)
+            if generated_pairs is not None:
+                self.rejections.count(transform_suite, "tasks")
                 return {
                     "pairs": generated_pairs,
-                    "full_grid_sequence": full_grid_sequence,
+                    "full_grid_sequence": generated_pairs[-1]["full_grid_sequence"],
                     "transformation_suite": transform_suite,
                 }
-            elif failed_transform_trials >= self.max_trials_for_function_combination:
-                n_config_trials += 1
-            else:
-                print("Something went wrong with the generation of the task.")
+            self.timer.count("failed_suite_trials")
+            n_config_trials += 1
 
+        self.timer.count("failed_tasks")
+        self.rejections.count(transform_suite, "failed_task")
         print(
             "Failed to generate a task with the current configuration. Please consider updating the config file. \n \
               Config is the following:",
             self.config,
         )
         return {}
+
+    def sample_pairs(self, plan: SuitePlan, n_pairs: int):
+        """
+        Samples pairs of the suite of plan until n_pairs are generated, or until
+        self.max_trials_for_function_combination attempts in a row have failed
+
+        Returns:
+        pairs (list): the generated pairs, None if the generator gave up on the suite
+        """
+        transform_suite = plan.transform_suite
+        failed_transform_trials = 0
+        generated_pairs = []
+        while failed_transform_trials < self.max_trials_for_function_combination and len(generated_pairs) < n_pairs:
+            self.timer.count("pair_trials")
+            self.rejections.count(transform_suite, "pair_attempts")
+            try:
+                with self.timer.stage("set_up_initial_grid"):
+                    input_grid, shapes_positionned = self.set_up_initial_grid(
+                        compatible_shape_rows=plan.shape_ids
+                    )
+                generated_pairs.append(self.make_pair(plan, input_grid, shapes_positionned))
+                self.rejections.count(transform_suite, "pairs")
+                failed_transform_trials = 0  # If we successfully generate a grid, we reset the failed trials
+            except Exception as e:
+                if self.debug_mode:
+                    print(e)
+                self.timer.count("failed_pair_trials")
+                self.rejections.count(transform_suite, get_rejection_reason(e))
+                failed_transform_trials += 1
+        return generated_pairs if len(generated_pairs) == n_pairs else None
+
+    def make_pair(self, plan: SuitePlan, input_grid: np.ndarray, shapes_positionned: list[Shape]) -> dict:
+        """Applies the suite of plan to the shapes of the input grid. Raises a DoesNotFitException if a grid of the
+        sequence is invalid."""
+        with self.timer.stage("apply_transform_suite_to_grid_2"):
+            output_grid, full_grid_sequence = self.apply_transform_suite_to_grid_2(
+                plan.transform_suite, input_grid, shapes_positionned, plan=plan
+            )
+        if any(grid is None for grid in full_grid_sequence):
+            raise EmptyShapeException("A shape is empty after a transformation")
+        return {
+            "input": input_grid,
+            "output": output_grid,
+            "n_shapes": len(shapes_positionned),
+            "grid_size": input_grid.shape,
+            "full_grid_sequence": full_grid_sequence,
+        }
+
+    def get_task_space(self, transform_suite: list, seed=None) -> TaskSpace:
+        """Candidate test inputs of a suite, to generate its tasks by enumeration (see utils/task_enumeration.py)"""
+        return TaskSpace(self.get_suite_plan(transform_suite), self.config, self.shape_library, seed=seed)
+
+    def place_candidate(self, candidate) -> tuple[np.ndarray, list[Shape]]:
+        """
+        Builds the input grid of a TaskSpace candidate. Raises a DoesNotFitException if its shapes touch.
+
+        Returns:
+        main_grid (np.ndarray): grid with positionned shapes
+        positionned_shapes (list[Shape]): list of Shapes
+        """
+        grid_size, shape_ids, positions = candidate
+        main_grid = np.zeros(grid_size)
+        placement = PlacementContext(main_grid)
+        positionned_shapes = []
+        for shape_id, position in zip(shape_ids, positions):
+            shape = self.shape_library.get_shape(shape_id)
+            shape.move_to_position(position)
+            if placement.touches(shape):
+                raise DoesNotFitException("Shape touches another shape")
+            placement.commit(shape)
+            positionned_shapes.append(shape)
+        return main_grid, positionned_shapes
+
+    def generate_enumerated_task(self, task_space: TaskSpace, task_index: int):
+        """
+        Generates attempt task_index of the enumeration of a task space: the test pair is made from the candidate of
+        the attempt, and the demonstration pairs are sampled like in generate_single_task. Like generate_single_task,
+        the task only depends on (config, seed, task_index).
+
+        Returns:
+        task (dict): same as generate_single_task, {} if the candidate is not a valid pair or if there is no
+            candidate for this attempt
+        """
+        with self.timer.stage("generate_enumerated_task"):
+            self.rng = self.task_rng(task_index)
+            candidate = task_space.get_candidate(task_index)
+            if candidate is None:
+                return {}
+            plan = task_space.plan
+            transform_suite = plan.transform_suite
+            self.timer.count("pair_trials")
+            self.rejections.count(transform_suite, "pair_attempts")
+            try:
+                input_grid, shapes_positionned = self.place_candidate(candidate)
+                test_pair = self.make_pair(plan, input_grid, shapes_positionned)
+            except Exception as e:
+                if self.debug_mode:
+                    print(e)
+                self.timer.count("failed_pair_trials")
+                self.rejections.count(transform_suite, get_rejection_reason(e))
+                return {}
+            self.rejections.count(transform_suite, "pairs")
+
+            demo_pairs = self.sample_pairs(plan, self.config.n_examples - 1)
+            if demo_pairs is None:
+                self.timer.count("failed_tasks")
+                self.rejections.count(transform_suite, "failed_task")
+                return {}
+            self.rejections.count(transform_suite, "tasks")
+            return {
+                "pairs": demo_pairs + [test_pair],
+                "full_grid_sequence": test_pair["full_grid_sequence"],
+                "transformation_suite": transform_suite,
+            }
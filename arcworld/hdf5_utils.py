@@ -2,6 +2,7 @@ import os
 import zipfile
 
 import h5py
+import numpy as np
 
 current_path = os.path.dirname(__file__)
 
@@ -10,6 +11,7 @@ SHAPE_DATASET_ZIP_PATH = os.path.join(current_path, "datasets", "shapes.zip")
 
 
 def extract_h5():
+    """Extracts shapes.h5 from shapes.zip if needed. Called on first use of the dataset, not on import."""
     if os.path.exists(SHAPE_DATASET_PATH):
         return
     if not os.path.exists(SHAPE_DATASET_ZIP_PATH):
@@ -20,18 +22,49 @@ def extract_h5():
         zip_ref.extractall(os.path.dirname(SHAPE_DATASET_PATH))
 
 
-# Run extraction on import to ensure the dataset is available
-extract_h5()
+def open_shape_dataset(mode="r"):
+    """Opens shapes.h5, extracting it first if needed"""
+    extract_h5()
+    return h5py.File(SHAPE_DATASET_PATH, mode)
+
+
+## Two layouts of the shapes file are supported:
+## - legacy: every shape is its own dataset under "shapes/{idx}"
+## - packed: all shapes are stored one after the other (row-major) in a single ragged uint8 "shape_pixels" dataset,
+##   and "shape_index" holds one (offset, n_rows, n_cols) row per shape. Both datasets are chunked and compressed.
+## load_shape, load_conditions and get_nr_of_shapes read both layouts. Use convert_to_packed to migrate a legacy file.
+
+PACKED_PIXELS = "shape_pixels"
+PACKED_INDEX = "shape_index"
+PACKED_CHUNK_SIZE = 1 << 16
+COMPRESSION = "gzip"
 
 
 def load_h5(f, filename):
     return f[filename][()]
 
 
+def is_packed(f):
+    return PACKED_PIXELS in f
+
+
+def load_packed_shape(idx, f):
+    offset, n_rows, n_cols = f[PACKED_INDEX][idx]
+    pixels = f[PACKED_PIXELS][offset : offset + n_rows * n_cols]
+    return pixels.reshape(n_rows, n_cols).astype(np.int64)
+
+
+def load_packed_shapes(f):
+    """Returns the packed pixels buffer and the (offset, n_rows, n_cols) index of all shapes"""
+    return load_h5(f, PACKED_PIXELS), load_h5(f, PACKED_INDEX)
+
+
 def load_shape(idx, f=None):
     if not f:
-        with h5py.File(SHAPE_DATASET_PATH) as f:
-            return load_h5(f, f"shapes/{idx}")
+        with open_shape_dataset() as f:
+            return load_shape(idx, f)
+    if is_packed(f):
+        return load_packed_shape(idx, f)
     return load_h5(f, f"shapes/{idx}")
 
 
@@ -43,27 +76,128 @@ def save_h5(data, filename, f, dtype="i8"):
     f.create_dataset(filename, data=data, dtype=dtype)
 
 
+def pack_grids(grids):
+    """Packs a list of 2D grids into a flat uint8 pixels buffer and an (offset, n_rows, n_cols) index"""
+    dims = np.array([np.shape(grid) for grid in grids], dtype=np.int64).reshape(-1, 2)
+    sizes = dims[:, 0] * dims[:, 1]
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    pixels = np.concatenate([np.ravel(grid) for grid in grids]) if grids else np.zeros(0)
+    if pixels.size and (pixels.min() < 0 or pixels.max() > 255):
+        raise ValueError("Shape pixels do not fit in uint8")
+    return pixels.astype(np.uint8), np.column_stack((offsets, dims))
+
+
+def create_packed_datasets(f, pixels, index):
+    f.create_dataset(PACKED_PIXELS, data=pixels, dtype="u1", maxshape=(None,),
+                     chunks=(PACKED_CHUNK_SIZE,), compression=COMPRESSION)
+    f.create_dataset(PACKED_INDEX, data=index, dtype="i8", maxshape=(None, 3),
+                     chunks=(PACKED_CHUNK_SIZE // 8, 3), compression=COMPRESSION)
+
+
+def append_packed_shape(data, idx, f):
+    index = f[PACKED_INDEX]
+    if idx != index.shape[0]:
+        raise ValueError(f"Shapes can only be appended to a packed shapes file (next index is {index.shape[0]}, got {idx})")
+    pixels = f[PACKED_PIXELS]
+    offset = pixels.shape[0]
+    data = np.asarray(data)
+    pixels.resize((offset + data.size,))
+    pixels[offset:] = data.ravel()
+    index.resize((idx + 1, 3))
+    index[idx] = (offset, *data.shape)
+
+
 def save_shape(data, idx, f=None):
     if not f:
-        with h5py.File(SHAPE_DATASET_PATH, "a") as f:
-            save_h5(data, f"shapes/{idx}", f)
+        with open_shape_dataset("a") as f:
+            save_shape(data, idx, f)
             return
+    if is_packed(f):
+        append_packed_shape(data, idx, f)
+        return
     save_h5(data, f"shapes/{idx}", f)
 
 
 def save_conditions(data, colnames):
-    with h5py.File(SHAPE_DATASET_PATH, "a") as f:
+    with open_shape_dataset("a") as f:
         save_h5(colnames, "condition_names", f, dtype=None)
-        save_h5(data, "conditions", f)
+        if is_packed(f):
+            try:
+                del f["conditions"]
+            except KeyError:
+                pass
+            f.create_dataset("conditions", data=data, dtype="u1", chunks=True, compression=COMPRESSION)
+        else:
+            save_h5(data, "conditions", f)
 
 
 def load_conditions():
-    with h5py.File(SHAPE_DATASET_PATH) as f:
+    with open_shape_dataset() as f:
         names = [str(x, "utf-8") for x in load_h5(f, "condition_names")]
         return load_h5(f, "conditions"), names
 
 
+## Feasibility of every transform on every shape of the library, see calculate_transform_feasibility.py. The
+## "transform_feasibility" group holds the transform names and, for each (shape, transform), whether the transform
+## fails, whether it leaves an empty shape, whether it changes the shape at all, and the bounding box delta
+## (min_x, min_y, max_x, max_y) of the result.
+
+TRANSFORM_FEASIBILITY = "transform_feasibility"
+FEASIBILITY_FLAGS = ("fails", "becomes_empty", "changes")
+
+
+def save_transform_feasibility(transform_names, table):
+    """
+    Parameters:
+    transform_names (list): names of the transforms, in the order of the second axis of the table
+    table (dict): "fails", "becomes_empty", "changes" (n_shapes, n_transforms) bool arrays and
+        "bbox_delta" (n_shapes, n_transforms, 4) int array
+    """
+    with open_shape_dataset("a") as f:
+        if TRANSFORM_FEASIBILITY in f:
+            del f[TRANSFORM_FEASIBILITY]
+        group = f.create_group(TRANSFORM_FEASIBILITY)
+        group.create_dataset("transform_names", data=[name.encode("utf-8") for name in transform_names])
+        for flag in FEASIBILITY_FLAGS:
+            group.create_dataset(flag, data=table[flag], dtype="u1", compression=COMPRESSION)
+        group.create_dataset("bbox_delta", data=table["bbox_delta"], dtype="i2", compression=COMPRESSION)
+
+
+def load_transform_feasibility():
+    """Returns (transform_names, table) as given to save_transform_feasibility, or None if it was never computed"""
+    with open_shape_dataset() as f:
+        if TRANSFORM_FEASIBILITY not in f:
+            return None
+        group = f[TRANSFORM_FEASIBILITY]
+        transform_names = [str(x, "utf-8") for x in load_h5(group, "transform_names")]
+        table = {flag: load_h5(group, flag).astype(bool) for flag in FEASIBILITY_FLAGS}
+        table["bbox_delta"] = load_h5(group, "bbox_delta")
+        return transform_names, table
+
+
 def get_nr_of_shapes():
-    with h5py.File(SHAPE_DATASET_PATH) as f:
+    with open_shape_dataset() as f:
+        if is_packed(f):
+            return f[PACKED_INDEX].shape[0]
         num_shapes = len(f["shapes"].keys())
     return num_shapes
+
+
+def convert_to_packed(src_path, dst_path):
+    """Writes the shapes, conditions and transform feasibility table of a legacy shapes file to a new file with the
+    packed layout. Shapes keep their index, so the rows of the conditions and of the table stay valid."""
+    with h5py.File(src_path, "r") as src:
+        if is_packed(src):
+            raise ValueError(f"{src_path} already uses the packed layout")
+        n_shapes = len(src["shapes"].keys())
+        pixels, index = pack_grids([load_h5(src, f"shapes/{idx}") for idx in range(n_shapes)])
+
+        with h5py.File(dst_path, "w") as dst:
+            create_packed_datasets(dst, pixels, index)
+            if "conditions" in src:
+                dst.create_dataset("conditions", data=load_h5(src, "conditions"), dtype="u1",
+                                   chunks=True, compression=COMPRESSION)
+                dst.create_dataset("condition_names", data=load_h5(src, "condition_names"))
+            if TRANSFORM_FEASIBILITY in src:
+                src.copy(src[TRANSFORM_FEASIBILITY], dst, name=TRANSFORM_FEASIBILITY)  # Datasets and attributes
+    return n_shapes
@@ -1,177 +1,241 @@
 import collections.abc
-from collections import UserDict
 import numpy as np
 
 from ..constants import MAX_GRID_SIZE, ALLOWED_COLORS
 from .utils import pc_to_full_sized_grid, pc_to_shape_only_grid
 
-## For this generator, which is shape-centric (object-centric), we define the "PointCloud" class below as a dedicate class with its own 
-## method and attributes to facilitate shape manipulation (e.g. moving a shape within a grid). 
+## For this generator, which is shape-centric (object-centric), we define the "PointCloud" class below as a dedicate class with its own
+## method and attributes to facilitate shape manipulation (e.g. moving a shape within a grid).
 
-class DictWrapper(collections.abc.MutableMapping):
+## The point cloud is stored as two contiguous arrays: the (x, y) coordinates of every pixel as an (N, 2) int16 array and
+## the pixel colors as an (N,) uint8 array, in insertion order. Both arrays are treated as immutable, so copies can share
+## them and bounding box statistics can be cached. The class still behaves as a `(x, y) -> color` mapping.
 
-    def __init__(self, data=None, /, **kwargs):
-        self._data = {}
-        if data is not None:
-            self.update(data)
-        if kwargs:
-            self.update(kwargs)
+COORDS_DTYPE = np.int16
+COLORS_DTYPE = np.uint8
+
+ALLOWED_COLORS_LOOKUP = np.zeros(max(ALLOWED_COLORS) + 1, dtype=bool)
+ALLOWED_COLORS_LOOKUP[ALLOWED_COLORS] = True
+
+
+def are_colors_allowed(colors: np.ndarray) -> bool:
+    '''Vectorized equivalent of `all(color in ALLOWED_COLORS for color in colors)`'''
+    if colors.size == 0:
+        return True
+    int_colors = colors.astype(np.int64)
+    if colors.dtype.kind not in 'biu' and not np.array_equal(int_colors, colors):
+        return False
+    if int_colors.min() < 0 or int_colors.max() >= len(ALLOWED_COLORS_LOOKUP):
+        return False
+    return bool(ALLOWED_COLORS_LOOKUP[int_colors].all())
+
+
+class PointCloudItemsView(collections.abc.ItemsView):
+
+    def __iter__(self):
+        return zip(iter(self._mapping), self._mapping.color_array.tolist())
+
+
+class PointCloudValuesView(collections.abc.ValuesView):
+
+    def __iter__(self):
+        return iter(self._mapping.color_array.tolist())
+
+
+class PointCloud(collections.abc.MutableMapping):
+
+    def __init__(self, data: dict):
+        self.check_dict(data)
+        coords = np.array(list(data.keys()), dtype=COORDS_DTYPE).reshape(-1, 2)
+        colors = np.array(list(data.values()), dtype=COLORS_DTYPE).reshape(-1)
+        self._set_arrays(coords, colors)
+
+    @classmethod
+    def from_arrays(cls, coords, colors):
+        '''Creates a point cloud directly from an (N, 2) coordinates array and an (N,) colors array.
+        Coordinates are expected to be unique.'''
+        colors = np.asarray(colors)
+        if not are_colors_allowed(colors):
+            raise ValueError('Colors not allowed')
+        inst = cls.__new__(cls)
+        inst._set_arrays(np.asarray(coords, dtype=COORDS_DTYPE).reshape(-1, 2),
+                         colors.astype(COLORS_DTYPE).reshape(-1))
+        return inst
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        return cls(dict.fromkeys(iterable, value))
+
+    def _set_arrays(self, coords, colors):
+        if coords.flags.writeable or colors.flags.writeable:
+            coords = coords.copy()
+            colors = colors.copy()
+            coords.flags.writeable = False
+            colors.flags.writeable = False
+        self._coords = coords
+        self._colors = colors
+        self._lookup = None
+        self._bounds = None
+
+    @property
+    def coords(self):
+        '''Read-only (N, 2) int16 array of the (x, y) coordinates of the points'''
+        return self._coords
+
+    @property
+    def color_array(self):
+        '''Read-only (N,) uint8 array of the colors of the points'''
+        return self._colors
+
+    ## Mapping interface
+
+    def _get_lookup(self):
+        if self._lookup is None:
+            self._lookup = {key: row for row, key in enumerate(self)}
+        return self._lookup
 
     def __len__(self):
-        return len(self._data)
+        return self._coords.shape[0]
+
+    def __iter__(self):
+        return zip(self._coords[:, 0].tolist(), self._coords[:, 1].tolist())
+
+    def __contains__(self, key):
+        return key in self._get_lookup()
 
     def __getitem__(self, key):
-        if key in self._data:
-            return self._data[key]
-        if hasattr(self.__class__, "__missing__"):
-            return self.__class__.__missing__(self, key)
-        raise KeyError(key)
+        return int(self._colors[self._get_lookup()[key]])
 
     def __setitem__(self, key, item):
-        self._data[key] = item
+        self.check_dict({key: item})
+        row = self._get_lookup().get(key)
+        if row is None:
+            coords = np.concatenate((self._coords, np.array([key], dtype=COORDS_DTYPE)))
+            colors = np.append(self._colors, np.array(item, dtype=COLORS_DTYPE))
+        else:
+            coords = self._coords
+            colors = self._colors.copy()
+            colors[row] = item
+        self._set_arrays(coords, colors)
 
     def __delitem__(self, key):
-        del self._data[key]
+        row = self._get_lookup()[key]
+        keep = np.ones(len(self), dtype=bool)
+        keep[row] = False
+        self._set_arrays(self._coords[keep], self._colors[keep])
 
-    def __iter__(self):
-        return iter(self._data)
+    def items(self):
+        return PointCloudItemsView(self)
 
-    # Modify __contains__ to work correctly when __missing__ is present
-    def __contains__(self, key):
-        return key in self._data
+    def values(self):
+        return PointCloudValuesView(self)
+
+    def clear(self):
+        self._set_arrays(np.empty((0, 2), dtype=COORDS_DTYPE), np.empty(0, dtype=COLORS_DTYPE))
 
-    # Now, add the methods in dicts but not in MutableMapping
     def __repr__(self):
-        return repr(self._data)
+        return repr(self.data)
 
     def __or__(self, other):
-        if isinstance(other, UserDict):
-            return self.__class__(self._data | other._data)
-        if isinstance(other, dict):
-            return self.__class__(self._data | other)
+        if isinstance(other, collections.abc.Mapping):
+            return self.__class__(self.data | dict(other.items()))
         return NotImplemented
 
     def __ror__(self, other):
-        if isinstance(other, UserDict):
-            return self.__class__(other._data | self._data)
-        if isinstance(other, dict):
-            return self.__class__(other | self._data)
+        if isinstance(other, collections.abc.Mapping):
+            return self.__class__(dict(other.items()) | self.data)
         return NotImplemented
 
     def __ior__(self, other):
-        if isinstance(other, UserDict):
-            self._data |= other._data
-        else:
-            self._data |= other
+        self.update(other)
         return self
 
     def __copy__(self):
         inst = self.__class__.__new__(self.__class__)
         inst.__dict__.update(self.__dict__)
-        # Create a copy and avoid triggering descriptors
-        inst.__dict__["_data"] = self.__dict__["_data"].copy()
         return inst
 
     def copy(self):
-        if self.__class__ is UserDict:
-            return UserDict(self._data.copy())
-        import copy
-        _data = self._data
-        try:
-            self._data = {}
-            c = copy.copy(self)
-        finally:
-            self._data = _data
-        c.update(self)
-        return c
+        return self.__copy__()
 
-    @classmethod
-    def fromkeys(cls, iterable, value=None):
-        d = cls()
-        for key in iterable:
-            d[key] = value
-        return d
-
-
-class PointCloud(DictWrapper):
-
-    def __init__(self, data: dict):
-        self.check_dict(data)
-        super().__init__(data)
+    ## Point cloud attributes
 
     @property
     def data(self):
-        return self._data
+        '''Returns the point cloud as a `(x, y) -> color` dict'''
+        return dict(self.items())
 
     @data.setter
     def data(self, data: dict):
-        self.check_dict(data)
-        self.clear()
-        self.update(data)
+        self.__init__(data)
 
     @property
     def indexes(self):
-        return self.data.keys()
+        return self.keys()
 
     @property
     def x_vals(self):
-        if self.data:
-            return list(list(zip(*self.data.keys()))[0])
-        return []
+        return self._coords[:, 0].tolist()
 
     @property
     def y_vals(self):
-        if self.data:
-            return list(list(zip(*self.data.keys()))[1])
-        return []
+        return self._coords[:, 1].tolist()
+
+    def _get_bounds(self):
+        if self._bounds is None:
+            min_x, min_y = self._coords.min(axis=0).tolist()
+            max_x, max_y = self._coords.max(axis=0).tolist()
+            self._bounds = (min_x, max_x, min_y, max_y)
+        return self._bounds
 
     @property
     def max_x(self):
-        if self.data:
-            return max(self.x_vals)
+        if len(self):
+            return self._get_bounds()[1]
         return None
 
     @property
     def min_x(self):
-        if self.data:
-            return min(self.x_vals)
+        if len(self):
+            return self._get_bounds()[0]
         return None
 
     @property
     def max_y(self):
-        if self.data:
-            return max(self.y_vals)
+        if len(self):
+            return self._get_bounds()[3]
         return None
 
     @property
     def min_y(self):
-        if self.data:
-            return min(self.y_vals)
+        if len(self):
+            return self._get_bounds()[2]
         return None
 
     @property
     def n_rows(self): ## Height
-        if self.data:
+        if len(self):
             return self.max_x - self.min_x + 1
         return 0
 
     @property
     def n_cols(self): ## Width
-        if self.data:
+        if len(self):
             return self.max_y - self.min_y + 1
         return 0
 
     @property
     def colors(self):
-        return list(self.data.values())
-    
+        return self._colors.tolist()
+
     @property
     def most_frequent_color(self):
-        return max(set(self.colors), key = self.colors.count)
-    
+        counts = np.bincount(self._colors)
+        return max(set(self.colors), key=counts.__getitem__)
+
     @property
     def existing_colors(self):
-        return np.unique(list(self.data.values()))
+        return np.unique(self._colors)
 
     @property
     def num_points(self):
@@ -179,25 +243,25 @@ class PointCloud(DictWrapper):
 
     @property
     def current_position(self):
-        min_x = min(self.x_vals)
-        min_y = min(self.y_vals)
+        if not len(self):
+            raise ValueError('Empty point cloud has no position')
+        min_x, _, min_y, _ = self._get_bounds()
         return min_x, min_y
 
     @property
     def bounding_corners(self):
         '''Returns the lower left and the top right corner of the bounding box of the object'''
-        max_x = max(self.x_vals)
-        max_y = max(self.y_vals)
         top_left = self.current_position
+        _, max_x, _, max_y = self._get_bounds()
         lower_right = (max_x, max_y)
         return top_left, lower_right
 
     def as_grid(self):
             return pc_to_full_sized_grid(self)
-    
+
     def as_shape_only_grid(self):
         return pc_to_shape_only_grid(self)
-    
+
     def as_colorless_shape_only_grid(self):
         return np.int_(pc_to_shape_only_grid(self) != 0)
 
@@ -211,6 +275,5 @@ class PointCloud(DictWrapper):
     def check_dict(self, pc_dict: dict):
         if not isinstance(pc_dict, dict):
             raise ValueError('Can only create point cloud from dict')
-        for idx, color in pc_dict.items():
-            if color not in ALLOWED_COLORS:
-                raise ValueError('Colors not allowed')
+        if not are_colors_allowed(np.array(list(pc_dict.values()))):
+            raise ValueError('Colors not allowed')
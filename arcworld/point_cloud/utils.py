@@ -4,15 +4,18 @@ from ..constants import ShapeOutOfBounds, MAX_GRID_SIZE
 
 def pc_to_full_sized_grid(pc, n_cols=MAX_GRID_SIZE, n_rows=MAX_GRID_SIZE) -> np.ndarray:
     '''
-    Converts a point cloud into a 
-    grid of size (n_cols, n_rows)
+    Converts a point cloud into a
+    grid of size (n_cols, n_rows). All the grids of the
+    default size can be combined with each other
     '''
-    grid = np.zeros((n_cols, n_rows), dtype=int)
-    try:
-        for idx, color in pc.items():
-            grid[idx] = color
-    except IndexError:
+    if len(pc) == 0:
+        return np.zeros((n_cols, n_rows), dtype=int)
+    (min_x, min_y), (max_x, max_y) = pc.bounding_corners
+    if min_x < 0 or min_y < 0 or max_x >= n_cols or max_y >= n_rows:
         raise ShapeOutOfBounds(f'Can not convert this pc into a grid of size ({n_cols}, {n_rows})')
+    grid = np.zeros((n_cols, n_rows), dtype=int)
+    coords = pc.coords
+    grid[coords[:, 0], coords[:, 1]] = pc.color_array
     return grid
 
 def pc_to_shape_only_grid(pc) -> np.ndarray:
@@ -20,11 +23,10 @@ def pc_to_shape_only_grid(pc) -> np.ndarray:
     Converts a point cloud into
     a grid of size (pc.n_cols, pc.n_rows)
     '''
-    grid = np.zeros((pc.n_rows, pc.n_cols), dtype=int)
-    dx = pc.min_x
-    dy = pc.min_y
-    for idx, color in pc.items():
-        x,y = idx
-        grid[(x-dx,y-dy)] = color
+    if len(pc) == 0:
+        return np.zeros((0, 0), dtype=int)
+    (min_x, min_y), (max_x, max_y) = pc.bounding_corners
+    grid = np.zeros((max_x - min_x + 1, max_y - min_y + 1), dtype=int)
+    coords = pc.coords
+    grid[coords[:, 0] - min_x, coords[:, 1] - min_y] = pc.color_array
     return grid
-
@@ -0,0 +1,123 @@
+import os
+
+import h5py
+import numpy as np
+
+from . import hdf5_utils
+from .shapes.base import Shape
+
+## The shape library holds every shape of shapes.h5 in memory, packed into a single flat uint8 buffer. Shape `idx` is
+## stored row-major in pixels[offsets[idx]: offsets[idx] + n_rows[idx] * n_cols[idx]]. The packed buffer is cached next
+## to the shapes file as .npy files and memory-mapped, so that worker processes reading the same library share its pages.
+
+
+class ShapeLibrary:
+    def __init__(self, pixels: np.ndarray, offsets: np.ndarray, dims: np.ndarray):
+        """
+        Parameters:
+        pixels (np.ndarray): flat uint8 buffer with all the shape grids, one after the other
+        offsets (np.ndarray): (n_shapes,) start of each shape in the pixels buffer
+        dims (np.ndarray): (n_shapes, 2) number of rows and columns of each shape
+        """
+        self.pixels = pixels
+        self.offsets = offsets
+        self.dims = dims
+        self._point_clouds = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def n_rows(self) -> np.ndarray:
+        return self.dims[:, 0]
+
+    @property
+    def n_cols(self) -> np.ndarray:
+        return self.dims[:, 1]
+
+    def get_grid(self, idx: int) -> np.ndarray:
+        """Returns a read-only view on the shape only grid of shape `idx`. No data is copied."""
+        start = self.offsets[idx]
+        n_rows, n_cols = self.dims[idx]
+        grid = self.pixels[start : start + n_rows * n_cols].reshape(n_rows, n_cols)
+        grid.flags.writeable = False
+        return grid
+
+    def get_shape(self, idx: int) -> Shape:
+        """Returns shape `idx` positionned at (0, 0). The point cloud of each shape is only built once, the
+        returned Shapes share its (immutable) arrays."""
+        pc = self._point_clouds.get(idx)
+        if pc is None:
+            pc = Shape(self.get_grid(idx)).pc
+            self._point_clouds[idx] = pc
+        shape = Shape(pc)
+        shape.library_id = idx
+        return shape
+
+    @classmethod
+    def from_grids(cls, grids: list) -> "ShapeLibrary":
+        """Packs a list of 2D shape grids into a library"""
+        pixels, index = hdf5_utils.pack_grids(grids)
+        return cls(pixels, index[:, 0], index[:, 1:])
+
+    @classmethod
+    def from_h5(cls, path: str = None) -> "ShapeLibrary":
+        """Reads all the shapes of a shapes.h5 file"""
+        if path is None:
+            hdf5_utils.extract_h5()
+            path = hdf5_utils.SHAPE_DATASET_PATH
+        with h5py.File(path, "r") as f:
+            if hdf5_utils.is_packed(f):
+                pixels, index = hdf5_utils.load_packed_shapes(f)
+                return cls(pixels, index[:, 0], index[:, 1:])
+            n_shapes = len(f["shapes"].keys())
+            grids = [hdf5_utils.load_shape(idx, f) for idx in range(n_shapes)]
+        return cls.from_grids(grids)
+
+    @classmethod
+    def load(cls, path: str = None, use_cache: bool = True) -> "ShapeLibrary":
+        """
+        Loads the shape library of a shapes.h5 file.
+
+        If use_cache is True, the packed library is written next to the shapes file on first use
+        (or when the shapes file is newer than the cache) and then memory-mapped.
+        """
+        if path is None:
+            hdf5_utils.extract_h5()
+            path = hdf5_utils.SHAPE_DATASET_PATH
+        if not use_cache:
+            return cls.from_h5(path)
+
+        pixels_path, index_path = get_cache_paths(path)
+        if not is_cache_up_to_date(path, pixels_path, index_path):
+            library = cls.from_h5(path)
+            try:
+                library.save(pixels_path, index_path)
+            except OSError:
+                return library  # The dataset folder is not writeable, keep the library in memory
+
+        pixels = np.load(pixels_path, mmap_mode="r")
+        index = np.load(index_path)
+        return cls(pixels, index[:, 0], index[:, 1:])
+
+    def save(self, pixels_path: str, index_path: str):
+        """Writes the packed library to .npy files. Files are written atomically, so that concurrent
+        processes never read a partially written cache."""
+        index = np.column_stack((self.offsets, self.dims)).astype(np.int64)
+        for file_path, data in [(pixels_path, np.asarray(self.pixels)), (index_path, index)]:
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp_path, file_path)
+
+
+def get_cache_paths(path: str) -> tuple[str, str]:
+    root, _ = os.path.splitext(path)
+    return f"{root}_library_pixels.npy", f"{root}_library_index.npy"
+
+
+def is_cache_up_to_date(path: str, pixels_path: str, index_path: str) -> bool:
+    if not (os.path.exists(pixels_path) and os.path.exists(index_path)):
+        return False
+    source_mtime = os.path.getmtime(path)
+    return os.path.getmtime(pixels_path) >= source_mtime and os.path.getmtime(index_path) >= source_mtime
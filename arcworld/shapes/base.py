@@ -1,16 +1,21 @@
 from abc import abstractmethod
 from functools import cached_property
 
+import numpy as np
+
 from ..point_cloud.point_cloud import PointCloud
 from .utils import move_to_position, delete_out_of_bounds_points, grid_to_pc
 
 
 class Shape():
 
+    library_id = None  # Index of the shape in the shape library, as long as the shape is only moved
+
     def __init__(self, data):
         '''create shape from grid or PointCloud'''
         if isinstance(data, Shape):
             self.pc = data.pc
+            self.library_id = data.library_id
         elif isinstance(data, PointCloud) or isinstance(data, dict) or data is None:
             self.pc = data
         else:
@@ -103,6 +108,7 @@ class Shape():
     @grid.setter
     def grid(self, grid):
         self._pc = grid_to_pc(grid)
+        self.library_id = None
 
     @pc.setter
     def pc(self, pc):
@@ -115,6 +121,7 @@ class Shape():
         else:
             raise ValueError(f"Point cloud can't be set from {pc}")
         self._grid = None
+        self.library_id = None
         try:
             del self.as_shape_only_grid
         except AttributeError:
@@ -124,7 +131,9 @@ class Shape():
         self.pc.possible_positions()
 
     def move_to_position(self, position):
+        library_id = self.library_id
         self.pc = move_to_position(self.pc, position)
+        self.library_id = library_id
 
     def delete_out_of_bounds_points(self):
         self.pc = delete_out_of_bounds_points(self.pc)
@@ -133,7 +142,10 @@ class BasicShape(Shape):
     def __init__(self,
                  max_n_rows: int,
                  max_n_cols: int,
-                 color_pattern: str):
+                 color_pattern: str,
+                 rng=None):
+        """rng (int | np.random.Generator): seed or generator used to sample the shape"""
+        self.rng = np.random.default_rng(rng)
         self.max_n_rows = max_n_rows
         self.max_n_cols = max_n_cols
         self.color_pattern = color_pattern
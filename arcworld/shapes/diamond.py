@@ -8,11 +8,13 @@ class Diamond(BasicShape):
                  max_n_rows,
                  max_n_cols,
                  color_pattern,
-                 color=None):
+                 color=None,
+                 rng=None):
         super(Diamond, self).__init__(
             max_n_rows=max_n_rows,
             max_n_cols=max_n_cols,
             color_pattern=color_pattern,
+            rng=rng,
         )
 
         if max_n_rows < 3 or max_n_cols < 3:
@@ -23,7 +25,7 @@ class Diamond(BasicShape):
         self.max_n_cols = max_n_cols
 
         if color_pattern is None:
-            color_pattern = np.random.choice(
+            color_pattern = self.rng.choice(
                 ['uniform', 'first_diagonal_symmetry', 'second_diagonal_symmetry', 'vertical_symmetry', 'random'])
 
         if color_pattern not in ['uniform', 'first_diagonal_symmetry', 'second_diagonal_symmetry', 'vertical_symmetry',
@@ -33,7 +35,7 @@ class Diamond(BasicShape):
         self.color_pattern = color_pattern
 
         if color is None:
-            color = np.random.randint(1, 10)
+            color = self.rng.integers(1, 10)
 
         self.color = color
         self.no_black_pixels = 1  # If True, then no black pixels are added in the rectangle
@@ -45,7 +47,7 @@ class Diamond(BasicShape):
         shape = np.zeros((3, 3))
 
         if self.color_pattern == 'uniform':
-            col = np.random.randint(self.no_black_pixels, 10)
+            col = self.rng.integers(self.no_black_pixels, 10)
 
             shape[0, 1] = col
             shape[1, 0] = col
@@ -54,10 +56,10 @@ class Diamond(BasicShape):
 
         if self.color_pattern == 'first_diagonal_symmetry':
 
-            col1 = np.random.randint(self.no_black_pixels, 10)
+            col1 = self.rng.integers(self.no_black_pixels, 10)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10)
+                col2 = self.rng.integers(self.no_black_pixels, 10)
 
             shape[0, 1] = col1
             shape[1, 0] = col2
@@ -66,10 +68,10 @@ class Diamond(BasicShape):
 
         if self.color_pattern == 'second_diagonal_symmetry':
 
-            col1 = np.random.randint(self.no_black_pixels, 10)
+            col1 = self.rng.integers(self.no_black_pixels, 10)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10)
+                col2 = self.rng.integers(self.no_black_pixels, 10)
 
             shape[0, 1] = col1
             shape[1, 0] = col1
@@ -78,10 +80,10 @@ class Diamond(BasicShape):
 
         if self.color_pattern == 'vertical_symmetry':
 
-            col1 = np.random.randint(self.no_black_pixels, 10)
+            col1 = self.rng.integers(self.no_black_pixels, 10)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10)
+                col2 = self.rng.integers(self.no_black_pixels, 10)
 
             shape[0, 1] = col1
             shape[1, 0] = col2
@@ -89,9 +91,9 @@ class Diamond(BasicShape):
             shape[2, 1] = col1
 
         if self.color_pattern == 'random':
-            shape[0, 1] = np.random.randint(self.no_black_pixels, 10)
-            shape[1, 0] = np.random.randint(self.no_black_pixels, 10)
-            shape[1, 2] = np.random.randint(self.no_black_pixels, 10)
-            shape[2, 1] = np.random.randint(self.no_black_pixels, 10)
+            shape[0, 1] = self.rng.integers(self.no_black_pixels, 10)
+            shape[1, 0] = self.rng.integers(self.no_black_pixels, 10)
+            shape[1, 2] = self.rng.integers(self.no_black_pixels, 10)
+            shape[2, 1] = self.rng.integers(self.no_black_pixels, 10)
 
         return shape
@@ -1,5 +1,3 @@
-import random
-
 import factory
 import numpy as np
 import scipy
@@ -11,8 +9,10 @@ from .utils import grid_to_pc, pc_from_indexes_and_colors, grid_to_cropped_grid
 
 
 class RandomShape(Shape):
-    def __init__(self, params=None, **kwargs):
-        self.params = params if params else RandomShapeParamsFactory(**kwargs)
+    def __init__(self, params=None, rng=None, **kwargs):
+        """rng (int | np.random.Generator): seed or generator used to sample the parameters and grow the shape"""
+        self.rng = np.random.default_rng(rng)
+        self.params = params if params else RandomShapeParamsFactory(rng=self.rng, **kwargs)
         self.grid = self.generate()
 
     def grow_horizontal_symmetric_shape(self, max_rows, max_cols, min_rows, min_cols):
@@ -151,26 +151,26 @@ class RandomShape(Shape):
             grid[::2] *= self.params.colors[1]
         elif self.params.color_pattern == 'random':
             indexes = grid_to_pc(grid).indexes
-            colors = np.random.choice(self.params.colors, len(indexes))
+            colors = self.rng.choice(self.params.colors, len(indexes))
             grid = pc_from_indexes_and_colors(indexes, colors).as_shape_only_grid()
 
         elif self.params.color_pattern == 'top_bot':
-            uneven = np.random.choice([0, 1], 1, p=[0.5, 0.5]).item()
+            uneven = self.rng.choice([0, 1], 1, p=[0.5, 0.5]).item()
             half = (grid.shape[0] + uneven) // 2
             grid[half:] *= self.params.colors[0]
             grid[:half] *= self.params.colors[1]
         elif self.params.color_pattern == 'left_right':
-            uneven = np.random.choice([0, 1], 1, p=[0.5, 0.5]).item()
+            uneven = self.rng.choice([0, 1], 1, p=[0.5, 0.5]).item()
             half = (grid.shape[1] + uneven) // 2
             grid[:, half:] *= self.params.colors[0]
             grid[:, :half] *= self.params.colors[1]
         elif self.params.color_pattern == 'diag_tl_br':
-            uneven = np.random.choice([0, -1], 1, p=[0.5, 0.5]).item()
+            uneven = self.rng.choice([0, -1], 1, p=[0.5, 0.5]).item()
             mask = np.tri(grid.shape[0], M=grid.shape[1], k=uneven, dtype=int)
             color_mask = np.where(mask, self.params.colors[1], self.params.colors[0])
             grid = grid * color_mask
         elif self.params.color_pattern == 'diag_bl_tr':
-            uneven = np.random.choice([0, -1], 1, p=[0.5, 0.5]).item()
+            uneven = self.rng.choice([0, -1], 1, p=[0.5, 0.5]).item()
             mask = np.tri(grid.shape[0], M=grid.shape[1], k=uneven, dtype=int)
             mask = np.flipud(mask)
             color_mask = np.where(mask, self.params.colors[1], self.params.colors[0])
@@ -188,7 +188,7 @@ class RandomShape(Shape):
             already_testet = already_testet | current_pixels
             if np.sum(current_pixels) == 0:
                 break
-            mask = current_pixels & np.random.choice([1, 0], size=grid.shape, p=[p, 1 - p])
+            mask = current_pixels & self.rng.choice([1, 0], size=grid.shape, p=[p, 1 - p])
             grid = mask | grid
         pc = grid_to_pc(grid)
         if pc.n_cols < min_cols or pc.n_rows < min_rows:
@@ -233,6 +233,7 @@ class RandomShapeParams():
 
 class RandomShapeParamsFactory(factory.Factory):
     class Params:
+        rng = factory.LazyFunction(np.random.default_rng)
         set_cols_from_max = False
         set_rows_from_max = False
         set_connectivity_to_dist = False
@@ -241,23 +242,23 @@ class RandomShapeParamsFactory(factory.Factory):
     @factory.lazy_attribute
     def use_footprint(self):
         # return True
-        return random.choice([True, False])
+        return self.rng.choice([True, False])
     
     @factory.lazy_attribute
     def footprint(self):
-        return random.choice(RandomShapeParams.allowed_footprints)
+        return self.rng.choice(RandomShapeParams.allowed_footprints)
 
     @factory.lazy_attribute
     def outline(self):
-        return random.choice([True, False])
+        return self.rng.choice([True, False])
 
     @factory.lazy_attribute
     def symmetry(self):
-        return random.choice(RandomShapeParams.allowed_symmetry)
+        return self.rng.choice(RandomShapeParams.allowed_symmetry)
 
     @factory.lazy_attribute
     def grow_probability(self):
-        sample = scipy.stats.halfnorm.rvs(loc=0.2, scale=0.2)
+        sample = scipy.stats.halfnorm.rvs(loc=0.2, scale=0.2, random_state=self.rng)
         return sample
 
     @factory.lazy_attribute
@@ -265,10 +266,10 @@ class RandomShapeParamsFactory(factory.Factory):
         if not self.set_pattern_from_colors:
             num_cols = RandomShapeParams.allowed_color_pattern[self.color_pattern]
             if num_cols == -1:
-                num_cols = np.random.choice(np.arange(1, 10), 1)
-            return np.random.choice(RandomShapeParams.allowed_colors, num_cols)
-        num_cols = np.random.choice([1, 2, 3, 4], 1)
-        return np.random.choice(RandomShapeParams.allowed_colors, num_cols)
+                num_cols = self.rng.choice(np.arange(1, 10), 1)
+            return self.rng.choice(RandomShapeParams.allowed_colors, num_cols)
+        num_cols = self.rng.choice([1, 2, 3, 4], 1)
+        return self.rng.choice(RandomShapeParams.allowed_colors, num_cols)
 
     @factory.lazy_attribute
     def color_pattern(self):
@@ -278,50 +279,50 @@ class RandomShapeParamsFactory(factory.Factory):
             for pattern, num_colors_for_pattern in RandomShapeParams.allowed_color_pattern.items():
                 if num_colors == num_colors_for_pattern or num_colors_for_pattern == -1:
                     possible_patterns.append(pattern)
-            return np.random.choice(possible_patterns, 1)
-        return random.choice(list(RandomShapeParams.allowed_color_pattern.keys()))
+            return self.rng.choice(possible_patterns, 1)
+        return self.rng.choice(list(RandomShapeParams.allowed_color_pattern.keys()))
 
     @factory.lazy_attribute
     def connectivity(self):
         if self.set_connectivity_to_dist:
             return 'distance'
-        return random.choice(RandomShapeParams.allowed_connectivity)
+        return self.rng.choice(RandomShapeParams.allowed_connectivity)
 
     @factory.lazy_attribute
     def distance(self):
         if self.connectivity == 'distance':
-            return np.random.choice([2, 3], 1).item()
+            return self.rng.choice([2, 3], 1).item()
         return None
 
     @factory.lazy_attribute
     def min_cols(self):
         if self.set_cols_from_max:
             possible_vals = np.arange(1, self.max_cols + 1)
-            return np.random.choice(possible_vals, 1).item()
+            return self.rng.choice(possible_vals, 1).item()
         possible_vals = np.arange(1, RandomShapeParams.allowed_max_size + 1)
-        return np.random.choice(possible_vals, 1).item()
+        return self.rng.choice(possible_vals, 1).item()
 
     @factory.lazy_attribute
     def max_cols(self):
         if not self.set_cols_from_max:
             possible_vals = np.arange(self.min_cols, RandomShapeParams.allowed_max_size + 1)
-            return np.random.choice(possible_vals, 1).item()
-        return np.random.choice(RandomShapeParams.allowed_max_size, 1).item()
+            return self.rng.choice(possible_vals, 1).item()
+        return self.rng.choice(RandomShapeParams.allowed_max_size, 1).item()
 
     @factory.lazy_attribute
     def min_rows(self):
         if self.set_rows_from_max:
             possible_vals = np.arange(1, self.max_rows + 1)
-            return np.random.choice(possible_vals, 1).item()
+            return self.rng.choice(possible_vals, 1).item()
         possible_vals = np.arange(1, RandomShapeParams.allowed_max_size + 1)
-        return np.random.choice(possible_vals, 1).item()
+        return self.rng.choice(possible_vals, 1).item()
 
     @factory.lazy_attribute
     def max_rows(self):
         if not self.set_rows_from_max:
             possible_vals = np.arange(self.min_rows, RandomShapeParams.allowed_max_size + 1)
-            return np.random.choice(possible_vals, 1).item()
-        return np.random.choice(RandomShapeParams.allowed_max_size, 1).item()
+            return self.rng.choice(possible_vals, 1).item()
+        return self.rng.choice(RandomShapeParams.allowed_max_size, 1).item()
 
     @classmethod
     def build(cls, **kwargs):
@@ -11,11 +11,13 @@ class Rectangle(BasicShape):
                  color=None,
                  shape_n_rows=-1,
                  shape_n_cols=-1,
-                 max_shape_to_grid_ratio=1):
+                 max_shape_to_grid_ratio=1,
+                 rng=None):
         super().__init__(
             max_n_rows=max_n_rows,
             max_n_cols=max_n_cols,
-            color_pattern=color_pattern
+            color_pattern=color_pattern,
+            rng=rng
         )
 
         self.shape_n_rows = shape_n_rows
@@ -26,10 +28,10 @@ class Rectangle(BasicShape):
             ## Scaling the generation by sqrt(max_ratio) to ensure that product of the two will be smaller than max_ratio * grid size!
             if self.shape_n_rows == -1:
                 self.shape_n_rows = int(
-                    np.floor(np.random.randint(2, 1 + self.max_n_rows) * np.sqrt(max_shape_to_grid_ratio)))
+                    np.floor(self.rng.integers(2, 1 + self.max_n_rows) * np.sqrt(max_shape_to_grid_ratio)))
             if self.shape_n_cols == -1:
                 self.shape_n_cols = int(
-                    np.floor(np.random.randint(2, 1 + self.max_n_cols) * np.sqrt(max_shape_to_grid_ratio)))
+                    np.floor(self.rng.integers(2, 1 + self.max_n_cols) * np.sqrt(max_shape_to_grid_ratio)))
         if color_pattern not in ['uniform', 'diag_symmetry', 'hor_symmetry', 'ver_symmetry', 'chessboard', 'ver_line',
                                  'hor_line', 'diag_line']:
             self.color_pattern = 'uniform'
@@ -77,7 +79,7 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
         if self.color is None:
-            self.color = np.random.randint(self.no_black_pixels, 10, size=1)
+            self.color = self.rng.integers(self.no_black_pixels, 10, size=1)
         shape = self.color * np.ones((self.shape_n_rows, self.shape_n_cols))
         return shape
 
@@ -86,10 +88,10 @@ class Rectangle(BasicShape):
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
         if self.shape_n_rows % 2 == 0:
-            col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
             mask1 = np.array(range(self.shape_n_rows)) < self.shape_n_rows / 2
             mask2 = np.array(range(self.shape_n_rows)) >= self.shape_n_rows / 2
@@ -98,15 +100,15 @@ class Rectangle(BasicShape):
             shape[mask2, :] = col2
 
         else:
-            col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
             col3 = col2
 
             while col3 == col2 or col3 == col1:
-                col3 = np.random.randint(self.no_black_pixels, 10, 1)
+                col3 = self.rng.integers(self.no_black_pixels, 10, 1)
 
             mask1 = np.array(range(self.shape_n_rows)) < int(self.shape_n_rows / 2)
             mask2 = np.array(range(self.shape_n_rows)) > int(self.shape_n_rows / 2)
@@ -123,10 +125,10 @@ class Rectangle(BasicShape):
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
         if self.shape_n_rows % 2 == 0:
-            col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
             mask1 = np.array(range(self.shape_n_cols)) < self.shape_n_cols / 2
             mask2 = np.array(range(self.shape_n_cols)) >= self.shape_n_cols / 2
@@ -135,14 +137,14 @@ class Rectangle(BasicShape):
             shape[:, mask2] = col2
 
         else:
-            col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
             col2 = col1
             while col2 == col1:
-                col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
             col3 = col2
 
             while col3 == col2 or col3 == col1:
-                col3 = np.random.randint(self.no_black_pixels, 10, 1)
+                col3 = self.rng.integers(self.no_black_pixels, 10, 1)
 
             mask1 = np.array(range(self.shape_n_cols)) < int(self.shape_n_cols / 2)
             mask2 = np.array(range(self.shape_n_cols)) > int(self.shape_n_cols / 2)
@@ -158,14 +160,14 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
-        col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+        col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col2 = col1
         while col2 == col1:
-            col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col3 = col2
 
         while col3 == col2 or col3 == col1:
-            col3 = np.random.randint(self.no_black_pixels, 10, 1)
+            col3 = self.rng.integers(self.no_black_pixels, 10, 1)
 
         shape[np.tril_indices(self.shape_n_rows, k=1)] = col1
         shape[np.triu_indices(self.shape_n_rows, k=1)] = col2
@@ -177,10 +179,10 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
-        col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+        col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col2 = col1
         while col2 == col1:
-            col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
         for i in range(self.shape_n_rows):
             for j in range(self.shape_n_cols):
@@ -195,12 +197,12 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
-        col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+        col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col2 = col1
         while col2 == col1:
-            col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
-        line_index = np.random.randint(0, self.shape_n_rows, size=1)  # randomly selects which line to draw differently
+        line_index = self.rng.integers(0, self.shape_n_rows, size=1)  # randomly selects which line to draw differently
 
         shape = col1 * np.ones((self.shape_n_rows, self.shape_n_cols))
         shape[line_index, :] = col2
@@ -211,12 +213,12 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
-        col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+        col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col2 = col1
         while col2 == col1:
-            col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
-        line_index = np.random.randint(0, self.shape_n_cols, size=1)
+        line_index = self.rng.integers(0, self.shape_n_cols, size=1)
 
         shape = col1 * np.ones((self.shape_n_rows, self.shape_n_cols))
         shape[:, line_index] = col2
@@ -227,10 +229,10 @@ class Rectangle(BasicShape):
 
         shape = np.zeros((self.shape_n_rows, self.shape_n_cols))
 
-        col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+        col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
         col2 = col1
         while col2 == col1:
-            col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+            col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
         shape = col1 * np.ones((self.shape_n_rows, self.shape_n_cols))
 
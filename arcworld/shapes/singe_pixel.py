@@ -8,15 +8,17 @@ class Single_Pixel(BasicShape):
     def __init__(self, max_n_rows,
                  max_n_cols,
                  color_pattern=None,
-                 color=None):
+                 color=None,
+                 rng=None):
         super().__init__(max_n_rows=None,
                          max_n_cols=None,
-                         color_pattern=None)
+                         color_pattern=None,
+                         rng=rng)
 
         self.no_black_pixels = 1
 
         if color is None:
-            self.color = np.random.randint(self.no_black_pixels, 10)
+            self.color = self.rng.integers(self.no_black_pixels, 10)
         else:
             self.color = color
 
@@ -12,18 +12,20 @@ class StraightLine(BasicShape):
                  orientation=None,
                  n_colors=None,
                  length=None,
-                 color=None):
+                 color=None,
+                 rng=None):
         super().__init__(
             max_n_rows=max_n_rows,
             max_n_cols=max_n_cols,
-            color_pattern=color_pattern
+            color_pattern=color_pattern,
+            rng=rng
         )
 
         self.grid_height = max_n_rows
         self.grid_width = max_n_cols
 
         if color_pattern is None:
-            color_pattern = np.random.choice(['uniform', 'symmetric', 'alternated', 'random'])
+            color_pattern = self.rng.choice(['uniform', 'symmetric', 'alternated', 'random'])
         if color_pattern not in ['uniform', 'symmetric', 'alternated', 'random']:
             color_pattern = 'uniform'
 
@@ -31,7 +33,7 @@ class StraightLine(BasicShape):
 
         # orientation: diagonal/horizontal/vertical
         if orientation is None:
-            orientation = np.random.choice(['horizontal', 'vertical', 'diagonal'])
+            orientation = self.rng.choice(['horizontal', 'vertical', 'diagonal'])
 
         # when we initialize self.oritentation 
         # we will just create an array of elements: 
@@ -40,11 +42,11 @@ class StraightLine(BasicShape):
 
         if length is None:
             if orientation == 'horizontal':
-                length = np.random.randint(1, 1 + max_n_cols)
+                length = self.rng.integers(1, 1 + max_n_cols)
             if orientation == 'vertical':
-                length = np.random.randint(1, 1 + max_n_rows)
+                length = self.rng.integers(1, 1 + max_n_rows)
             if orientation == 'diagonal':
-                length = np.random.randint(1, 1 + min(max_n_cols, max_n_rows))
+                length = self.rng.integers(1, 1 + min(max_n_cols, max_n_rows))
 
         self.length = length
 
@@ -58,7 +60,7 @@ class StraightLine(BasicShape):
             self.length = min(max_n_cols, max_n_rows)
 
         if n_colors is None:
-            n_colors = np.random.randint(1, 11)
+            n_colors = self.rng.integers(1, 11)
         self.n_colors = n_colors  # number of different colors in the line
         if n_colors >= self.length:
             self.n_colors = self.length
@@ -79,17 +81,17 @@ class StraightLine(BasicShape):
                 line = self.color * np.ones(self.length)
 
             else:
-                col = np.random.randint(self.no_black_pixels, 10, size=1)
+                col = self.rng.integers(self.no_black_pixels, 10, size=1)
                 line = col * np.ones(self.length)
 
         if self.color_pattern == 'symmetric':
 
             if self.length % 2 == 0:
 
-                col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
                 col2 = col1
                 while col2 == col1:
-                    col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                    col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
                 mask1 = np.array(range(self.length)) < self.length / 2
                 mask2 = np.array(range(self.length)) >= self.length / 2
@@ -98,15 +100,15 @@ class StraightLine(BasicShape):
                 line[mask2] = col2
 
             else:
-                col1 = np.random.randint(self.no_black_pixels, 10, size=1)
+                col1 = self.rng.integers(self.no_black_pixels, 10, size=1)
                 col2 = col1
                 while col2 == col1:
-                    col2 = np.random.randint(self.no_black_pixels, 10, size=1)
+                    col2 = self.rng.integers(self.no_black_pixels, 10, size=1)
 
                 col3 = col2
 
                 while col3 == col2 or col3 == col1:
-                    col3 = np.random.randint(self.no_black_pixels, 10, 1)
+                    col3 = self.rng.integers(self.no_black_pixels, 10, 1)
 
                 mask1 = np.array(range(self.length)) < int(self.length / 2)
                 mask2 = np.array(range(self.length)) > int(self.length / 2)
@@ -120,7 +122,7 @@ class StraightLine(BasicShape):
 
             line = np.zeros(self.length)
             count = 0
-            col1 = np.random.randint(self.no_black_pixels, 10)
+            col1 = self.rng.integers(self.no_black_pixels, 10)
             colors = [col1]
             not_used_colors = []
 
@@ -131,14 +133,14 @@ class StraightLine(BasicShape):
                             if j not in colors:
                                 not_used_colors.append(j)
 
-                        col = np.random.choice(not_used_colors)
+                        col = self.rng.choice(not_used_colors)
                         not_used_colors.remove(col)
                         colors.append(col)
 
                     else:
                         col = col1
                         while col in colors:
-                            col = np.random.randint(self.no_black_pixels, 10)
+                            col = self.rng.integers(self.no_black_pixels, 10)
                         colors.append(col)
 
             for i in range(self.length):
@@ -154,7 +156,7 @@ class StraightLine(BasicShape):
             line = np.zeros(self.length)
 
             for i in range(self.length):
-                line[i] = np.random.randint(self.no_black_pixels, 10, size=1)
+                line[i] = self.rng.integers(self.no_black_pixels, 10)
 
         if self.orientation == 'horizontal':
             line = line.reshape((1, len(line)))
@@ -22,8 +22,7 @@ def shift_indexes(indexes: list([(int, int)]), dx: int = 0, dy: int = 0) -> list
 def move_to_position(pc, position):
     dx = position[0] - pc.current_position[0]
     dy = position[1] - pc.current_position[1]
-    indexes = shift_indexes(pc.indexes, dx, dy)
-    return pc_from_indexes_and_colors(indexes, pc.colors)
+    return PointCloud.from_arrays(pc.coords + np.array([dx, dy]), pc.color_array)
 
 def is_idx_within_bounds(idx):
     if idx[0] >= 0 and idx[0] < 30 and idx[1] >= 0 and idx[1] < 30:
@@ -32,23 +31,14 @@ def is_idx_within_bounds(idx):
         return False
 
 def delete_out_of_bounds_points(pc):
-    indexes = pc.indexes
-    colors = pc.colors
-    new_indexes = []
-    new_colors = []
-    for i, idx in enumerate(indexes):
-        if is_idx_within_bounds(idx):
-            new_indexes.append(idx)
-            new_colors.append(colors[i])
-    return pc_from_indexes_and_colors(new_indexes, new_colors)
+    coords = pc.coords
+    within_bounds = np.all((coords >= 0) & (coords < 30), axis=1)
+    return PointCloud.from_arrays(coords[within_bounds], pc.color_array[within_bounds])
 
 def grid_to_pc(grid) -> PointCloud:
-    pc = {}
-    indexes = np.transpose(np.nonzero(grid))
-    for idx in indexes:
-        idx = tuple(idx)
-        pc[idx] = grid[idx]
-    return PointCloud(pc)
+    grid = np.asarray(grid)
+    indexes = np.nonzero(grid)
+    return PointCloud.from_arrays(np.stack(indexes, axis=1), grid[indexes])
 
 def grid_to_cropped_grid(grid) -> np.ndarray:
     pc = grid_to_pc(grid)
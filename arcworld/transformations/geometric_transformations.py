@@ -0,0 +1,93 @@
+import numpy as np
+
+from ..constants import ShapeOutOfBounds
+from ..point_cloud.point_cloud import PointCloud
+from ..shapes.base import Shape
+
+## Geometric transforms (translations, rotations and mirrors) as integer affine maps on the coordinate arrays of a point
+## cloud, without going through a raster. Consecutive geometric steps of a transform suite are fused into a single
+## GeometricMap, applied to a whole shape at once.
+##
+## A map reproduces the raster transforms exactly:
+## - a translation moves every point, and keeps the colorless points and the order of the points
+## - a rotation or a mirror transforms the colored pixels inside their bounding box, and puts the result back at the
+##   top left corner of the bounding box of the point cloud. Colorless points are dropped and the points come out in
+##   row-major order, as when a shape is created from a grid. Like the raster, it fails on shapes with negative
+##   coordinates.
+
+## Linear parts act on (row, col) coordinates relative to the bounding box
+ROT90_MATRIX = np.array([[0, -1], [1, 0]])  # np.rot90: (r, c) -> (-c, r)
+FLIP_ROWS_MATRIX = np.array([[-1, 0], [0, 1]])  # np.flipud
+FLIP_COLS_MATRIX = np.array([[1, 0], [0, -1]])  # np.fliplr
+
+TRANSLATIONS = {
+    "translate_up": (-1, 0),
+    "translate_down": (1, 0),
+    "translate_right": (0, 1),
+    "translate_left": (0, -1),
+}
+
+LINEAR_MAPS = {
+    "rot90": ROT90_MATRIX,
+    "mirror_horizontal": FLIP_ROWS_MATRIX,
+    "mirror_vertical": FLIP_COLS_MATRIX,
+}
+
+
+def is_geometric(transform_name: str) -> bool:
+    return transform_name in TRANSLATIONS or transform_name in LINEAR_MAPS
+
+
+class GeometricMap:
+    """
+    Fused sequence of geometric steps. With A the top left corner of the input point cloud moved by the translations
+    preceding the first linear step, the output is the product of the linear steps applied to the colored pixels,
+    placed with its top left corner at A plus the translations following the first linear step.
+    """
+
+    def __init__(self, steps=()):
+        self.steps = []
+        self.pre_translation = np.zeros(2, dtype=np.int64)  # Translations before the first linear step
+        self.matrix = None  # Product of the linear steps, None if there are none
+        self.translation = np.zeros(2, dtype=np.int64)  # Translations after the first linear step
+        self.min_check_offset = np.zeros(2, dtype=np.int64)  # Every linear step needs A + offset >= 0
+        for step in steps:
+            self.append(step)
+
+    def append(self, step: str):
+        if step in TRANSLATIONS:
+            if self.matrix is None:
+                self.pre_translation += TRANSLATIONS[step]
+            else:
+                self.translation += TRANSLATIONS[step]
+        elif step in LINEAR_MAPS:
+            if self.matrix is None:
+                self.matrix = LINEAR_MAPS[step]
+            else:
+                self.matrix = LINEAR_MAPS[step] @ self.matrix
+                self.min_check_offset = np.minimum(self.min_check_offset, self.translation)
+        else:
+            raise ValueError(f"{step} is not a geometric transformation")
+        self.steps.append(step)
+
+    def apply(self, pc: PointCloud) -> PointCloud:
+        anchor = np.array(pc.current_position) + self.pre_translation  # Raises ValueError on empty point clouds
+        if self.matrix is None:
+            return PointCloud.from_arrays(pc.coords + self.pre_translation, pc.color_array)
+        if np.any(anchor + self.min_check_offset < 0):
+            raise ShapeOutOfBounds(f"Can not apply {self.steps} to a shape at position {tuple(anchor)}")
+
+        colored = pc.color_array != 0
+        coords, colors = pc.coords[colored].astype(np.int64), pc.color_array[colored]
+        if len(coords) == 0:
+            raise ValueError("Empty point cloud has no position")
+        coords = (coords - coords.min(axis=0)) @ self.matrix.T
+        coords += anchor + self.translation - coords.min(axis=0)
+        order = np.lexsort((coords[:, 1], coords[:, 0]))
+        return PointCloud.from_arrays(coords[order], colors[order])
+
+    def __call__(self, shape: Shape) -> Shape:
+        return Shape(self.apply(shape.pc))
+
+    def __repr__(self):
+        return f"GeometricMap({self.steps})"
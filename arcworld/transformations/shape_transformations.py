@@ -1,8 +1,11 @@
 import numpy as np
 import scipy
-from arcworld.constants import MAX_GRID_SIZE
+from arcworld.constants import MAX_GRID_SIZE, ShapeOutOfBounds
+from arcworld.point_cloud.point_cloud import PointCloud
 from arcworld.shapes.base import Shape
+from arcworld.shapes.utils import grid_to_pc
 from arcworld.conditionals.single_shape_conditionals import is_shape_hollow
+from arcworld.transformations.geometric_transformations import GeometricMap, is_geometric
 
 
 
@@ -26,6 +29,34 @@ PADDING_TOP = 8
 PADDING_BOTTOM = 9
 
 
+## Raster transforms work on the shape only grid (the bounding box of the shape) and its position, instead of a grid
+## spanning the world from (0, 0) to the shape.
+
+def get_local_grid(shape):
+    '''Returns the shape only grid of the shape and the position of its top left corner. As with the full sized grid,
+    a shape with negative coordinates can not be rasterized.'''
+    if shape.is_null:
+        raise ValueError('Empty shape has no position')
+    if shape.min_x < 0 or shape.min_y < 0:
+        raise ShapeOutOfBounds(f'Can not rasterize a shape at position {shape.current_position}')
+    return shape.as_shape_only_grid, shape.current_position
+
+def shape_from_local_grid(grid, position):
+    '''Inverse of get_local_grid: creates the shape whose shape only grid has its top left corner at position'''
+    pc = grid_to_pc(grid)
+    return Shape(PointCloud.from_arrays(pc.coords + np.array(position), pc.color_array))
+
+
+## Geometric transforms are integer affine maps on the coordinates, see geometric_transformations.py
+
+TRANSLATE_UP = GeometricMap(["translate_up"])
+TRANSLATE_DOWN = GeometricMap(["translate_down"])
+TRANSLATE_RIGHT = GeometricMap(["translate_right"])
+TRANSLATE_LEFT = GeometricMap(["translate_left"])
+ROT90 = GeometricMap(["rot90"])
+MIRROR_HORIZONTAL = GeometricMap(["mirror_horizontal"])
+MIRROR_VERTICAL = GeometricMap(["mirror_vertical"])
+
 ## Translate Up
 
 constraints_translate_up = {"incompatible_shapes": [], 
@@ -35,10 +66,7 @@ constraints_translate_up = {"incompatible_shapes": [],
                            }
 
 def translate_up(shape):
-    x, y = shape.current_position
-    new_shape = Shape(shape)
-    new_shape.move_to_position((x-1, y))
-    return new_shape
+    return TRANSLATE_UP(shape)
 
 ## Translate Down 
 
@@ -49,10 +77,7 @@ constraints_translate_down = {"incompatible_shapes": [],
                            }
 
 def translate_down(shape):
-    x, y = shape.current_position
-    new_shape = Shape(shape)
-    new_shape.move_to_position((x+1, y))
-    return new_shape
+    return TRANSLATE_DOWN(shape)
 
 ## Transle Right
 
@@ -63,10 +88,7 @@ constraints_translate_right = {"incompatible_shapes": [],
                            }
 
 def translate_right(shape):
-    x, y = shape.current_position
-    new_shape = Shape(shape)
-    new_shape.move_to_position((x, y+1))
-    return new_shape
+    return TRANSLATE_RIGHT(shape)
 
 ## Translate Left
 
@@ -77,10 +99,7 @@ constraints_translate_left = {"incompatible_shapes": [],
                            }
 
 def translate_left(shape):
-    x, y = shape.current_position
-    new_shape = Shape(shape)
-    new_shape.move_to_position((x, y-1))
-    return new_shape
+    return TRANSLATE_LEFT(shape)
 
 ## Rot90
 
@@ -91,10 +110,7 @@ constraints_rot90 = {"incompatible_shapes": [],
                     }
 
 def rot90(shape):
-    position = shape.current_position
-    rotated = Shape(np.rot90(shape.grid, 1))
-    rotated.move_to_position(position)
-    return rotated
+    return ROT90(shape)
 
 ## Shape Filling
 
@@ -107,7 +123,8 @@ constraints_fill_holes_same_color = {"incompatible_shapes": ["is_shape_not_hollo
 def fill_holes_same_color(shape): ## Fills hole with the first color
     if is_shape_hollow(shape):
         most_frequent_color = shape.most_frequent_color
-        return Shape(scipy.ndimage.binary_fill_holes(shape.grid).astype(int)*most_frequent_color)
+        shape_grid, position = get_local_grid(shape)
+        return shape_from_local_grid(scipy.ndimage.binary_fill_holes(shape_grid).astype(int)*most_frequent_color, position)
     else:
         return shape
     
@@ -122,9 +139,12 @@ constraints_fill_holes_different_color = {"incompatible_shapes": ["is_shape_not_
 def fill_holes_different_color(shape): ## Fills hole with the first color
     if is_shape_hollow(shape):
         new_color = (shape.most_frequent_color % 9) + 1
-        filled_shape = Shape(scipy.ndimage.binary_fill_holes(shape.grid).astype(int)*shape.colors[0])
-        filling_diff = ((filled_shape.grid - shape.grid) != 0) * new_color
-        return Shape(filling_diff + shape.grid) 
+        # The local grid spans the colorless points too. Its background cells on the border are connected to the
+        # outside of the shape, so the holes it fills are those of the full sized grid.
+        shape_grid, position = get_local_grid(shape)
+        filled_grid = scipy.ndimage.binary_fill_holes(shape_grid).astype(int)*shape.colors[0]
+        filling_diff = ((filled_grid - shape_grid) != 0) * new_color
+        return shape_from_local_grid(filling_diff + shape_grid, position)
     else:
         return shape
 
@@ -142,29 +162,14 @@ constraints_empty_inside_pixels = {"incompatible_shapes": ["is_shape_hollow",
 
 def empty_inside_pixels(shape):
     
-    shape_grid = shape.grid
-    shape_position = shape.current_position
+    shape_grid, shape_position = get_local_grid(shape)
     
-    # Create an empty grid of the same shape to store the result
-    result = np.zeros_like(shape_grid)
-
-    # Define the shape of the grid
-    rows, cols = shape_grid.shape
-
-    # Iterate over each cell in the grid
-    for i in range(rows):  # Avoid boundary pixels
-        for j in range(cols):  # Avoid boundary pixels
-            
-            if i == 0 or i == rows - 1 or j == 0 or j == cols - 1: # Edge
-                result[i, j] = shape_grid[i, j]
-            else:
-                # Check if the current cell is part of the shape (non-zero value)
-                if shape_grid[i, j] != 0:
-                    # Check the neighboring cells (top, bottom, left, right)
-                    if (shape_grid[i - 1, j] == 0 or shape_grid[i + 1, j] == 0 or 
-                        shape_grid[i, j - 1] == 0 or shape_grid[i, j + 1] == 0):
-                        # If any neighbor is zero, it's part of the contour
-                        result[i, j] = shape_grid[i, j]
+    # Keep the edges of the grid and the contour of the shape: pixels with a zero neighbor (top, bottom, left, right)
+    result = shape_grid.copy()
+    inside = result[1:-1, 1:-1]
+    inside[(inside != 0)
+           & (shape_grid[:-2, 1:-1] != 0) & (shape_grid[2:, 1:-1] != 0)
+           & (shape_grid[1:-1, :-2] != 0) & (shape_grid[1:-1, 2:] != 0)] = 0
     
     result = Shape(result)
     result.move_to_position(shape_position)
@@ -188,10 +193,7 @@ constraints_mirror_horizontal = {"incompatible_shapes": [],
                         }
 
 def mirror_horizontal(shape):
-    position = shape.current_position
-    mirrored = Shape(np.flipud(shape.grid))
-    mirrored.move_to_position(position)
-    return mirrored
+    return MIRROR_HORIZONTAL(shape)
 
 ## Mirroring Vertical 
 
@@ -202,10 +204,7 @@ constraints_mirror_vertical = {"incompatible_shapes": [],
                         }
 
 def mirror_vertical(shape):
-    position = shape.current_position
-    mirrored = Shape(np.fliplr(shape.grid))
-    mirrored.move_to_position(position)
-    return mirrored
+    return MIRROR_VERTICAL(shape)
 
 ## Shape Cropping 
 
@@ -383,7 +382,10 @@ def change_shape_color(shape):
     """Changes the color of the shape to new_color.
     Color changes following: new_color = (old_color mod 9) + 1
     """
-    return Shape((shape.grid != 0) * ((shape.grid % 9) + 1))
+    if shape.is_null:
+        return Shape(None)
+    shape_grid, position = get_local_grid(shape)
+    return shape_from_local_grid((shape_grid != 0) * ((shape_grid % 9) + 1), position)
 
 
 ## Padding 
@@ -623,4 +625,29 @@ transformations_constraints = {
     'double_left': constraints_double_left,
     'quadruple_shape': constraints_quadruple_shape,
     'crop_contours': constraints_crop_contours,
-}
\ No newline at end of file
+}
+
+
+def compile_transform_suite(transform_suite: list) -> list:
+    """
+    Fuses the consecutive geometric steps of a transform suite into single GeometricMaps.
+
+    Returns:
+    stages (list): functions (shape -> shape) to apply in order, see apply_transform_suite
+    """
+    stages = []
+    for t in transform_suite:
+        if not is_geometric(t):
+            stages.append(transformations_dict[t])
+        elif stages and isinstance(stages[-1], GeometricMap):
+            stages[-1].append(t)
+        else:
+            stages.append(GeometricMap([t]))
+    return stages
+
+
+def apply_transform_suite(shape, stages: list):
+    """Applies the stages of a compiled transform suite to a shape"""
+    for stage in stages:
+        shape = stage(shape)
+    return shape
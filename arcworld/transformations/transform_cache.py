@@ -0,0 +1,119 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from ..point_cloud.point_cloud import PointCloud
+from ..shapes.base import Shape
+from .shape_transformations import apply_transform_suite, compile_transform_suite, transformations_dict
+
+## Transforms commute with translations: transforming a moved shape gives the transformed shape, moved by the same
+## offset. The only exceptions are the transforms that fail on shapes with negative coordinates.
+##
+## TransformCache stores the result of (library shape, transform suite) once, computed at CANONICAL_POSITION and
+## expressed relative to the position of the input shape. A cached result is only used when the inputs of all the
+## steps stay at non-negative coordinates from the actual position, in which case it is exactly the result of the
+## transforms. Otherwise the suite is applied directly. The canonical position is small, so that transforms still
+## rasterizing a shape build small grids, but far enough from the borders for almost every suite: an entry whose
+## intermediate shapes went past the borders at the canonical position is never used.
+
+CANONICAL_POSITION = (32, 32)
+
+
+class CacheEntry:
+    __slots__ = ("coords", "colors", "min_offset", "error", "usable")
+
+    def __init__(self, coords=None, colors=None, min_offset=None, error=None):
+        self.coords = coords  # Output coordinates relative to the input position
+        self.colors = colors
+        self.min_offset = min_offset  # Smallest coordinates of the inputs of the steps, relative to the input position
+        self.error = error  # (exception class, args) of the exception raised by the suite, if any
+        # The steps did not go past the borders at the canonical position, so the entry holds for any position
+        self.usable = bool(np.all(np.array(CANONICAL_POSITION) + min_offset >= 0))
+
+
+class TransformCache:
+    """
+    Bounded LRU cache of the transform suites applied to the shapes of the shape library.
+
+    Usage:
+        cache = TransformCache()
+        transformed_shape = cache.apply(shape, ["rot90", "fill_holes_same_color"])
+        cache.stats()  # hits, misses, evictions, uncached
+    """
+
+    def __init__(self, max_size: int = 1 << 16):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncached = 0  # Shapes that are not library shapes, or too close to the grid borders
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        n_lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "uncached": self.uncached,
+            "hit_rate": self.hits / n_lookups if n_lookups else 0.0,
+        }
+
+    def apply(self, shape: Shape, transform_suite, stages=None) -> Shape:
+        """Returns apply_transform_suite(shape, compile_transform_suite(transform_suite)), from the cache if possible.
+        stages can be given if the suite was already compiled."""
+        transform_suite = tuple(transform_suite)
+        if shape.library_id is None or shape.is_null:
+            self.uncached += 1
+            return apply_transform_suite(shape, stages or compile_transform_suite(transform_suite))
+
+        entry = self._get_entry(shape, transform_suite)
+        position = np.array(shape.current_position)
+        if not entry.usable or np.any(position + entry.min_offset < 0):
+            self.uncached += 1
+            return apply_transform_suite(shape, stages or compile_transform_suite(transform_suite))
+        if entry.error is not None:
+            error_class, error_args = entry.error
+            raise error_class(*error_args)
+        return Shape(PointCloud.from_arrays(entry.coords + position, entry.colors))
+
+    def _get_entry(self, shape: Shape, transform_suite: tuple) -> CacheEntry:
+        key = (shape.library_id, transform_suite)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = compute_entry(shape, transform_suite)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+
+def compute_entry(shape: Shape, transform_suite: tuple) -> CacheEntry:
+    """Applies the suite step by step to the shape moved to CANONICAL_POSITION, recording how close to the borders
+    the inputs of the steps go"""
+    canonical = Shape(shape)
+    canonical.move_to_position(CANONICAL_POSITION)
+    origin = np.array(CANONICAL_POSITION)
+    min_offset = np.zeros(2, dtype=np.int64)
+    try:
+        for t in transform_suite:
+            if not canonical.is_null:
+                min_offset = np.minimum(min_offset, np.array(canonical.current_position) - origin)
+            canonical = transformations_dict[t](canonical)
+    except Exception as e:
+        return CacheEntry(min_offset=min_offset, error=(type(e), e.args))
+    coords = canonical.pc.coords.astype(np.int64) - origin
+    coords.flags.writeable = False
+    return CacheEntry(coords, canonical.pc.color_array, min_offset)
@@ -0,0 +1,184 @@
+import warnings
+
+import numpy as np
+
+from ..constants import InfeasibleConfigException
+from .instrumentation import get_suite_key
+
+## Static estimate of how often a config can produce a pair, computed before any task is generated. It only reads the
+## bounding boxes of the library shapes, the compatible shape pool of every transform suite (conditionals table and
+## feasibility table) and how each transform moves and resizes the bounding box (bbox_delta of the feasibility table).
+## Grid sizes, numbers of shapes and shapes are drawn from the config with a fixed seed, and for every draw:
+## - the input fits if every shape fits in the grid and, when there are several shapes, their bounding boxes with a
+##   margin of one cell cover at most PACKING_EFFICIENCY of the grid. Shapes are placed one by one at random, so they
+##   block each other well before the grid is full. Shapes replaced after failing to fit (max_placement_retries of the
+##   config) are not accounted for, so the fit probability is underestimated when retries are enabled.
+## - a shape stays in the grid after the suite with the fraction of its input positions where its transformed bounding
+##   box is inside the grid. The transforms of a suite are all looked up on the library shape, and overlaps between
+##   transformed shapes are ignored: the estimate is an upper bound for suites making shapes grow.
+
+N_FEASIBILITY_SAMPLES = 1000
+FEASIBILITY_SEED = 0
+PACKING_EFFICIENCY = 0.6
+MIN_PAIR_ACCEPTANCE_RATE = 0.02  # Below this, the generator gives up on most of its tries of a suite
+
+
+def get_suite_bounding_boxes(transform_suite, shape_ids, dims, feasibility_transforms, transform_feasibility):
+    """
+    Moves the bounding boxes of the shapes through the transform suite
+
+    Parameters:
+    shape_ids (np.ndarray): ids of the library shapes
+    dims (np.ndarray): (n_shapes, 2) number of rows and columns of the library shapes
+
+    Returns:
+    offsets (np.ndarray): (len(shape_ids), 2) position of the output bounding box relative to the input one
+    out_dims (np.ndarray): (len(shape_ids), 2) number of rows and columns of the output bounding box
+    valid (np.ndarray): boolean mask of the shapes which no transform of the suite fails on or empties
+    """
+    offsets = np.zeros((len(shape_ids), 2), dtype=np.int64)
+    out_dims = dims[shape_ids].astype(np.int64)
+    valid = np.ones(len(shape_ids), dtype=bool)
+    if transform_feasibility is None:
+        return offsets, out_dims, valid
+    for t in transform_suite:
+        column = feasibility_transforms.get(t)
+        if column is None:
+            continue  # Unknown transform, assumed to keep the bounding box
+        delta = transform_feasibility["bbox_delta"][shape_ids, column].astype(np.int64)
+        offsets += delta[:, :2]
+        out_dims += delta[:, 2:] - delta[:, :2]
+        valid &= ~(
+            transform_feasibility["fails"][shape_ids, column]
+            | transform_feasibility["becomes_empty"][shape_ids, column]
+        )
+    return offsets, out_dims, valid
+
+
+def get_in_bounds_fraction(grid_size, size, offset, out_size):
+    """Fraction of the positions of a box of `size` in `grid_size` where the box moved by `offset` and resized to
+    `out_size` is still inside the grid (elementwise, 0 where the box does not fit at all)"""
+    n_positions = grid_size - size + 1
+    low = np.maximum(0, -offset)
+    high = np.minimum(n_positions - 1, grid_size - out_size - offset)
+    n_in_bounds = np.clip(high - low + 1, 0, None)
+    return np.where(n_positions > 0, n_in_bounds / np.maximum(n_positions, 1), 0.0)
+
+
+def estimate_suite_feasibility(config, transform_suite, shape_ids, dims, feasibility_transforms,
+                               transform_feasibility, rng):
+    """
+    Parameters:
+    config (ConfigValidator): generation config
+    transform_suite (list): transform suite
+    shape_ids (np.ndarray): compatible shape pool of the suite
+
+    Returns:
+    estimate (dict): pool size, probability that the input grid can be set up, probability that the shapes of a set up
+        input stay in the grid, and estimated pair acceptance rate
+    """
+    estimate = {"pool_size": int(len(shape_ids))}
+    if len(shape_ids) == 0:
+        estimate.update(fit_probability=0.0, output_fit_probability=0.0, pair_acceptance_rate=0.0)
+    else:
+        offsets, out_dims, valid = get_suite_bounding_boxes(
+            transform_suite, shape_ids, dims, feasibility_transforms, transform_feasibility
+        )
+        grid_sizes = rng.integers(config.min_grid_size, config.max_grid_size + 1, size=(N_FEASIBILITY_SAMPLES, 1, 2))
+        n_shapes = rng.integers(
+            config.min_n_shapes_per_grid, config.max_n_shapes_per_grid + 1, size=(N_FEASIBILITY_SAMPLES, 1)
+        )
+        picks = rng.integers(len(shape_ids), size=(N_FEASIBILITY_SAMPLES, config.max_n_shapes_per_grid))
+        used = np.arange(config.max_n_shapes_per_grid) < n_shapes  # Only the first n_shapes picks of a draw
+
+        sizes = dims[shape_ids[picks]]  # (n_samples, max_n_shapes, 2)
+        fits = np.all((sizes <= grid_sizes).all(axis=2) | ~used, axis=1)
+        padded_area = np.where(used, np.prod(sizes + 1, axis=2), 0).sum(axis=1)
+        grid_area = np.prod(grid_sizes[:, 0] + 1, axis=1)
+        fits &= (n_shapes[:, 0] == 1) | (padded_area <= PACKING_EFFICIENCY * grid_area)
+
+        in_bounds = get_in_bounds_fraction(grid_sizes, sizes, offsets[picks], out_dims[picks]).prod(axis=2)
+        in_bounds = np.where(used, in_bounds * valid[picks], 1.0).prod(axis=1)
+
+        fit_probability = float(fits.mean())
+        estimate.update(
+            fit_probability=fit_probability,
+            output_fit_probability=float(in_bounds[fits].mean()) if fits.any() else 0.0,
+            pair_acceptance_rate=float((fits * in_bounds).mean()),
+        )
+    return estimate
+
+
+def estimate_task_success(estimate, n_examples, max_trials_for_function_combination):
+    """Adds to a suite estimate the probability of getting n_examples pairs before max_trials_for_function_combination
+    failures in a row, and the expected number of pair attempts per task"""
+    p = estimate["pair_acceptance_rate"]
+    p_pair_before_giving_up = 1 - (1 - p) ** max_trials_for_function_combination
+    estimate["suite_success_probability"] = p_pair_before_giving_up**n_examples
+    estimate["expected_pair_attempts"] = n_examples / p if p > 0 else None
+    return estimate
+
+
+def analyze_config_feasibility(config, suite_plans, shape_library, feasibility_transforms, transform_feasibility,
+                               max_trials_for_function_combination):
+    """
+    Estimates, for every transform suite, the size of its compatible shape pool and its acceptance rate
+
+    Parameters:
+    config (ConfigValidator): generation config
+    suite_plans (list): SuitePlans of the suites to analyze
+    shape_library (ShapeLibrary): library the shape ids refer to
+    feasibility_transforms (dict), transform_feasibility (dict): feasibility table, see load_transform_feasibility
+    max_trials_for_function_combination (int): failed pair attempts in a row before the generator gives up on a suite
+
+    Returns:
+    report (dict): suite key -> estimate (see estimate_suite_feasibility and estimate_task_success)
+    """
+    rng = np.random.default_rng(FEASIBILITY_SEED)
+    report = {}
+    for plan in suite_plans:
+        estimate = estimate_suite_feasibility(
+            config,
+            plan.transform_suite,
+            plan.shape_ids,
+            shape_library.dims,
+            feasibility_transforms,
+            transform_feasibility,
+            rng,
+        )
+        report[get_suite_key(plan.transform_suite)] = estimate_task_success(
+            estimate, config.n_examples, max_trials_for_function_combination
+        )
+    return report
+
+
+def check_config_feasibility(report, strict=False):
+    """
+    Warns about the suites of the config which can not produce a pair, or only rarely. The estimate is a heuristic:
+    it only raises if strict.
+
+    Parameters:
+    report (dict): output of analyze_config_feasibility
+    strict (bool): raise an InfeasibleConfigException instead of warning
+    """
+    problems = []
+    for suite, estimate in report.items():
+        if estimate["pool_size"] == 0:
+            problems.append(f"{suite}: no shape of the library satisfies the conditionals of the suite")
+        elif estimate["pair_acceptance_rate"] == 0:
+            problems.append(
+                f"{suite}: the shapes can never fit in the grid (fit probability {estimate['fit_probability']:.2f}, "
+                f"output fit probability {estimate['output_fit_probability']:.2f})"
+            )
+        elif estimate["pair_acceptance_rate"] < MIN_PAIR_ACCEPTANCE_RATE:
+            problems.append(
+                f"{suite}: estimated pair acceptance rate of {estimate['pair_acceptance_rate']:.3f} "
+                f"(pool of {estimate['pool_size']} shapes, fit probability {estimate['fit_probability']:.2f}, "
+                f"output fit probability {estimate['output_fit_probability']:.2f})"
+            )
+    if not problems:
+        return
+    message = "Config feasibility check:\n  " + "\n  ".join(problems)
+    if strict:
+        raise InfeasibleConfigException(message)
+    warnings.warn(message)
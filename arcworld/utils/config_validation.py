@@ -19,6 +19,14 @@ class ConfigValidator(BaseModel):
 
     shape_compulsory_conditionals: List[str]
 
+    # Shapes which do not fit in the input grid are replaced by new shapes, up to this many times per grid, instead of
+    # starting the grid over. With retries, shapes are placed largest first. 0 keeps the original placement.
+    max_placement_retries: int = Field(default=0, ge=0)
+
+    # Generate the test pairs by walking the candidate test inputs of every suite instead of sampling them (see
+    # utils/task_enumeration.py). Tasks never repeat, and the generation stops when the space is exhausted.
+    enumerate_tasks: bool = False
+
     @field_validator("allowed_transformations")
     @classmethod
     def validate_allowed_transformations(cls, v):
@@ -74,4 +82,10 @@ class ConfigValidator(BaseModel):
                     "min_transformation_depth and max_transformation_depth must be set to None when allowed_transformations is None"
                 )
 
+        if self.enumerate_tasks:
+            if allowed_combs is None:
+                raise ValueError("enumerate_tasks requires allowed_combinations")
+            if max_shapes > 2:
+                raise ValueError("enumerate_tasks supports at most 2 shapes per grid")
+
         return self
@@ -1,13 +1,23 @@
 
 import sqlite3
-import pandas as pd
 import os
 import hashlib
 import numpy as np
 
-def hash_task(grid: list[list], transformations: list[str]) -> str:
+## Task hashes are versioned, the version of a database is stored in its user_version pragma:
+## - 1: hash of the grid bytes and the transformations. Databases created before the versioning use it.
+## - 2: the shape of the grid is hashed too, since a 4x5 and a 5x4 grid can have the same bytes.
+## A database keeps the version it was created with, so that the hashes of new tasks can be compared with the hashes
+## already stored. New databases use HASH_VERSION.
+
+HASH_VERSION = 2
+
+
+def hash_task(grid: list[list], transformations: list[str], version: int = HASH_VERSION) -> str:
     np_grid = np.array(grid, dtype=np.uint8)
     grid_bytes = np_grid.tobytes()
+    if version >= 2:
+        grid_bytes = np.array(np_grid.shape, dtype=np.int64).tobytes() + grid_bytes
     transformations_str = '|'.join(transformations)  # Use a delimiter unlikely to appear in your strings
     combined = grid_bytes + transformations_str.encode('utf-8')
     return hashlib.sha256(combined).hexdigest()
@@ -24,6 +34,7 @@ def access_db(db_name, db_path):
     
 
     cursor = conn.cursor()
+    is_new = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='tasks'").fetchone() is None
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS tasks (
         i INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,9 +43,15 @@ def access_db(db_name, db_path):
         transformations TEXT
     )
     """)    
+    if is_new:
+        cursor.execute(f"PRAGMA user_version = {HASH_VERSION}")
     conn.commit()
     return cursor, conn
 
+def get_hash_version(conn):
+    """Version of the task hashes stored in the database, see hash_task"""
+    return conn.execute("PRAGMA user_version").fetchone()[0] or 1
+
 def close_db(conn):
     conn.close()
 
@@ -51,8 +68,95 @@ def store_task_in_db(cursor, conn, task_key, task_hash, transformations, debug =
             print(f"Duplicate detected: {task_hash} already exists. Skipping insertion.")
         return False  # Hash already exists
 
+class BatchedTaskWriter:
+    """
+    Dedup sink for generated tasks. Duplicates are detected in memory against the hashes (and keys) already in the
+    database, and new tasks are buffered and inserted with a single executemany per batch, in one transaction.
+    The connection is switched to WAL mode with relaxed syncing, so that a batch costs one fsync at most.
+    With batch_size=None, tasks are only inserted by explicit flush() calls. Buffered tasks are dropped if the block
+    exits with an exception, so that the hashes of tasks that were never saved are not reserved.
+    The hashes given to add must be computed with hash_task(..., version=writer.hash_version).
+
+    Usage:
+        with BatchedTaskWriter(conn) as writer:
+            if writer.add(task_key, task_hash, transformations):
+                ...  # the task is new
+    """
+
+    def __init__(self, conn, batch_size=1000):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.buffer = []
+        self.hash_version = get_hash_version(conn)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        rows = self.conn.execute("SELECT task_key, task_hash FROM tasks").fetchall()
+        self.known_keys = {key for key, _ in rows}
+        self.known_hashes = {task_hash for _, task_hash in rows}
+        self.n_accepted = {}
+        self.n_duplicates = {}
+
+    def add(self, task_key, task_hash, transformations, debug=False):
+        """Returns False if the task (or its key) is already in the database, otherwise buffers it and returns True"""
+        if task_hash in self.known_hashes or task_key in self.known_keys:
+            if debug:
+                print(f"Duplicate detected: {task_hash} already exists. Skipping insertion.")
+            self.n_duplicates[transformations] = self.n_duplicates.get(transformations, 0) + 1
+            return False
+        self.known_hashes.add(task_hash)
+        self.known_keys.add(task_key)
+        self.n_accepted[transformations] = self.n_accepted.get(transformations, 0) + 1
+        self.buffer.append((task_key, task_hash, transformations))
+        if self.batch_size is not None and len(self.buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def restore(self, task_key, task_hash, transformations):
+        """Buffers a task which was already accepted by a previous run, if its hash is not in the database yet. Unlike
+        add, it is not counted in the duplicate rates."""
+        if task_hash in self.known_hashes or task_key in self.known_keys:
+            return
+        self.known_hashes.add(task_hash)
+        self.known_keys.add(task_key)
+        self.buffer.append((task_key, task_hash, transformations))
+
+    def flush(self):
+        if not self.buffer:
+            return
+        with self.conn:  # One transaction per batch
+            self.conn.executemany("""
+                INSERT INTO tasks (task_key, task_hash, transformations)
+                VALUES (?, ?, ?)
+            """, self.buffer)
+        self.buffer = []
+
+    def duplicate_rates(self):
+        """Returns {transformations: {"accepted", "duplicates", "duplicate_rate"}} for the tasks seen by this writer"""
+        report = {}
+        for transformations in dict.fromkeys(list(self.n_accepted) + list(self.n_duplicates)):
+            n_accepted = self.n_accepted.get(transformations, 0)
+            n_duplicates = self.n_duplicates.get(transformations, 0)
+            report[transformations] = {
+                "accepted": n_accepted,
+                "duplicates": n_duplicates,
+                "duplicate_rate": n_duplicates / (n_accepted + n_duplicates),
+            }
+        return report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        return False
+
 def load_tasks_to_dataframe(db_path):
     """Loads the entire tasks table from the database into a Pandas DataFrame."""
+    import pandas as pd  # Only needed to inspect the database, not to generate tasks
+
     conn = sqlite3.connect(os.path.join(db_path))
     query = "SELECT * FROM tasks"
     df = pd.read_sql_query(query, conn)
@@ -0,0 +1,273 @@
+import cProfile
+import csv
+import json
+import pstats
+import time
+
+## Opt-in per-stage timers and counters. A disabled StageTimer hands out a shared no-op context manager, so the
+## instrumented code costs one method call per stage when instrumentation is off. Snapshots are plain dicts: workers
+## send them to the coordinator, which merges them into a single breakdown per config. Stages can be nested (e.g.
+## randomly_sample_shapes inside set_up_initial_grid); the time of a stage includes the stages it contains.
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageTimer:
+    """
+    Accumulates the wall time and the number of calls of named stages, and named event counters.
+
+    Usage:
+        timer = StageTimer(enabled=True)
+        with timer.stage("set_up_initial_grid"):
+            ...
+        timer.count("failed_trials")
+        timer.snapshot()  # {"stages": {name: {"calls": n, "seconds": s}}, "counters": {name: n}}
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages = {}  # name -> [calls, seconds]
+        self.counters = {}
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = [calls, seconds]
+        else:
+            totals[0] += calls
+            totals[1] += seconds
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        return {
+            "stages": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+
+    def pop_snapshot(self) -> dict:
+        """Returns the snapshot and resets the timer, to send the stats accumulated since the last call"""
+        snapshot = self.snapshot()
+        self.reset()
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        """Adds the stats of a snapshot (e.g. from a worker process)"""
+        for name, totals in snapshot["stages"].items():
+            self.add(name, totals["seconds"], totals["calls"])
+        for name, n in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+def write_stage_report(reports: dict, path: str):
+    """
+    Writes per-config breakdowns, as JSON if path ends with .json and as CSV otherwise (one row per config and stage
+    or counter)
+
+    Parameters:
+    reports (dict): config name -> StageTimer snapshot
+    """
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(reports, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["config", "kind", "name", "calls", "seconds"])
+        for config_name, snapshot in reports.items():
+            for name, totals in snapshot["stages"].items():
+                writer.writerow([config_name, "stage", name, totals["calls"], f"{totals['seconds']:.6f}"])
+            for name, n in snapshot["counters"].items():
+                writer.writerow([config_name, "counter", name, n, ""])
+
+
+## Rejections are counted per transform suite (keyed like the transformations column of the tasks database). The
+## generator counts its pair attempts and why they failed; the coordinator adds the tasks it accepted and the
+## duplicates it dropped.
+
+REJECTION_REASONS = (
+    "does_not_fit",  # a shape could not be placed in the input grid
+    "shape_out_of_bounds",  # a transformed shape left the grid, or a transform failed near the border
+    "null_shape",  # a shape is empty after a transformation
+    "output_overlap",  # transformed shapes overlap in the output grid
+    "other",  # any other exception raised while generating a pair
+    "failed_task",  # the generator gave up on a task after max_trials_for_configuration suites
+    "task_error",  # an exception was raised while generating or exporting a task, outside of its pairs
+    "duplicate",  # the task was already in the database
+)
+
+
+def get_suite_key(transform_suite) -> str:
+    return str(list(transform_suite))
+
+
+class RejectionStats:
+    """
+    Counts, per transform suite, the generated pairs and tasks and the reasons they were rejected.
+
+    Usage:
+        stats = RejectionStats()
+        stats.count(["rot90"], "pair_attempts")
+        stats.count(["rot90"], "does_not_fit")
+        stats.report()  # {"['rot90']": {"pair_attempts": 1, "does_not_fit": 1, ..., "pair_acceptance_rate": 0.0}}
+    """
+
+    def __init__(self):
+        self.suites = {}  # suite key -> {name: count}
+
+    def count(self, transform_suite, name: str, n: int = 1):
+        counts = self.suites.setdefault(get_suite_key(transform_suite), {})
+        counts[name] = counts.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        return {suite: dict(counts) for suite, counts in self.suites.items()}
+
+    def pop_snapshot(self) -> dict:
+        snapshot = self.snapshot()
+        self.suites = {}
+        return snapshot
+
+    def merge(self, snapshot: dict):
+        for suite, counts in snapshot.items():
+            suite_counts = self.suites.setdefault(suite, {})
+            for name, n in counts.items():
+                suite_counts[name] = suite_counts.get(name, 0) + n
+
+    def report(self) -> dict:
+        """
+        Returns:
+        report (dict): per suite, the counts of every rejection reason, the number of pair attempts and generated
+            pairs, the number of generated and accepted tasks, and the acceptance rates (of the pair attempts, and of
+            the tasks checked against the database). Suites are sorted by number of rejections, the most wasteful
+            first.
+        """
+        report = {}
+        for suite, counts in self.suites.items():
+            suite_report = {name: counts.get(name, 0) for name in REJECTION_REASONS}
+            for name in ("pair_attempts", "pairs", "tasks", "accepted_tasks"):
+                suite_report[name] = counts.get(name, 0)
+            suite_report["rejections"] = sum(suite_report[name] for name in REJECTION_REASONS)
+            pair_attempts = suite_report["pair_attempts"]
+            stored_tasks = suite_report["accepted_tasks"] + suite_report["duplicate"]
+            suite_report["pair_acceptance_rate"] = suite_report["pairs"] / pair_attempts if pair_attempts else None
+            suite_report["task_acceptance_rate"] = (
+                suite_report["accepted_tasks"] / stored_tasks if stored_tasks else None
+            )
+            report[suite] = suite_report
+        return dict(sorted(report.items(), key=lambda item: -item[1]["rejections"]))
+
+
+## cProfile stats of a run. Every worker profiles the chunks it generates and sends the raw stats with the chunk, and
+## the coordinator profiles its own processing of the chunks (deduplication and storage). Everything is merged with
+## pstats.Stats.add, so the profile covers the whole run whatever the number of workers.
+
+
+class _RawProfile:
+    """Raw stats of a profiler, in the form pstats.Stats loads them from a profiler"""
+
+    __slots__ = ("stats",)
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class _Profiled:
+    __slots__ = ("profile_stats", "profiler")
+
+    def __init__(self, profile_stats):
+        self.profile_stats = profile_stats
+
+    def __enter__(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.profiler.create_stats()
+        self.profile_stats.merge(self.profiler.stats)
+        return False
+
+
+class ProfileStats:
+    """
+    Accumulates the cProfile stats of the profiled blocks of code, and of snapshots of other processes.
+
+    Usage:
+        profile = ProfileStats(enabled=True)
+        with profile.profile():
+            ...
+        profile.merge(snapshot)  # pop_snapshot() of a worker
+        profile.dump("train.prof")
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stats = None  # pstats.Stats, None until something was profiled
+
+    def profile(self):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Profiled(self)
+
+    def merge(self, snapshot: dict):
+        """Adds raw cProfile stats (Profile.stats after create_stats, or a snapshot)"""
+        if not snapshot:
+            return
+        if self.stats is None:
+            self.stats = pstats.Stats(_RawProfile(snapshot))
+        else:
+            self.stats.add(_RawProfile(snapshot))
+
+    def pop_snapshot(self) -> dict:
+        """Returns the raw stats and resets them, to send the stats accumulated since the last call"""
+        snapshot = self.stats.stats if self.stats is not None else {}
+        self.stats = None
+        return snapshot
+
+    def dump(self, path: str):
+        """Writes the stats in the format of cProfile, e.g. for snakeviz or pstats. Nothing is written if no code was
+        profiled."""
+        if self.stats is not None:
+            self.stats.dump_stats(path)
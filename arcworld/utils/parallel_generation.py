@@ -0,0 +1,323 @@
+import copy
+import math
+import warnings
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from ..general_utils import generate_key
+from ..generator import Generator, GeneratorCore
+from .db_utils import HASH_VERSION, hash_task
+from .instrumentation import ProfileStats, RejectionStats, StageTimer
+
+## Multi-process task generation. A single coordinator (the calling process) splits the per-transform quotas into
+## small work items and hands them to a pool of workers. Each worker keeps one Generator per transform suite, all
+## sharing the same GeneratorCore (memory-mapped shape library, conditionals index and transform cache). Workers only
+## generate and hash tasks: deduplication and storage are done by the coordinator, which also drops the tasks produced
+## in excess so that every transform gets exactly its quota.
+##
+## Attempt k of transform i is generated from its own random stream, spawned from the seed with the key (i, k), and
+## the coordinator processes the attempts of every transform in order. The output of a run therefore only depends on
+## the config and the seed, not on the number of workers or on how the work was split.
+##
+## With config["enumerate_tasks"], the test input of attempt k of transform i is the candidate of attempt k in the
+## enumeration of the task space of the suite (see task_enumeration.py), keyed by the seed: attempts never repeat a test
+## input, and the generation of a transform stops when its space has been walked. A split continuing the state of a
+## previous split of the same config (see get_next_split_state) walks the candidates the previous split did not reach.
+##
+## Without enumeration, nothing bounds the attempts of a suite whose tasks always fail or are duplicates. A suite is
+## skipped once max_attempts_without_progress attempts in a row (in processing order) have not produced a new task.
+
+_worker_state = {}
+
+# The generator of transform i is seeded with the spawn key (i,), and its attempt k with (i, k). The enumeration keys
+# start with a key out of the range of the transform indices, so that they are independent of both.
+ENUMERATION_SPAWN_KEY = 1 << 32
+
+
+def adapt_task_format(task, task_key):
+    task_dict = {}
+    task_dict["input"] = np.int_(task["pairs"][-1]["input"]).tolist()
+    task_dict["output"] = np.int_(task["pairs"][-1]["output"]).tolist()
+
+    if len(task["pairs"]) > 1:
+        task_dict["demo_input"] = np.int_(task["pairs"][0]["input"]).tolist()
+        task_dict["demo_output"] = np.int_(task["pairs"][0]["output"]).tolist()
+
+    task_dict["transformation_suite"] = task["transformation_suite"]
+    task_dict["task_key"] = task_key
+    return task_dict
+
+
+def split_quotas(n_tasks, n_transforms):
+    """Splits n_tasks as evenly as possible over n_transforms, the first transforms getting the remainder"""
+    n_per_transform, remainder = divmod(n_tasks, n_transforms)
+    return [n_per_transform + (i < remainder) for i in range(n_transforms)]
+
+
+def init_worker(config, entropy, instrument=False, profile=False, hash_version=HASH_VERSION):
+    _worker_state["config"] = config
+    _worker_state["hash_version"] = hash_version
+    _worker_state["entropy"] = entropy
+    _worker_state["instrument"] = instrument
+    _worker_state["profile"] = ProfileStats(enabled=profile)
+    _worker_state["generators"] = {}
+    _worker_state["task_spaces"] = {}
+    GeneratorCore.shared()  # Library, conditionals and transform registry, loaded once and shared by the generators
+
+
+def get_worker_generator(transform_idx):
+    generators = _worker_state["generators"]
+    if transform_idx not in generators:
+        config = copy.deepcopy(_worker_state["config"])
+        config["allowed_combinations"] = [config["allowed_combinations"][transform_idx]]
+        seed = np.random.SeedSequence(_worker_state["entropy"], spawn_key=(transform_idx,))
+        generators[transform_idx] = Generator(
+            config, seed=seed, instrument=_worker_state["instrument"], check_feasibility="off"
+        )
+    return generators[transform_idx]
+
+
+def get_enumeration_seed(entropy, transform_idx):
+    """Seed of the permutations of the task space of a transform"""
+    return np.random.SeedSequence(entropy, spawn_key=(ENUMERATION_SPAWN_KEY, transform_idx))
+
+
+def get_worker_task_space(transform_idx):
+    task_spaces = _worker_state["task_spaces"]
+    if transform_idx not in task_spaces:
+        gen = get_worker_generator(transform_idx)
+        seed = get_enumeration_seed(_worker_state["entropy"], transform_idx)
+        task_spaces[transform_idx] = gen.get_task_space(gen.config.allowed_combinations[0], seed=seed)
+    return task_spaces[transform_idx]
+
+
+def get_task_spaces(gen, entropy):
+    """Task spaces of the transform suites of the config of gen, as enumerated by the workers"""
+    return [
+        gen.get_task_space(transform_suite, seed=get_enumeration_seed(entropy, i))
+        for i, transform_suite in enumerate(gen.config.allowed_combinations)
+    ]
+
+
+def get_next_split_state(state):
+    """
+    State to start the next split of the same config from. With enumerate_tasks, the next split uses the same
+    enumeration and starts after the attempts of the previous one, so the two splits share no task.
+    """
+    return {
+        "entropy": state["entropy"],
+        "n_accepted": [0] * len(state["n_accepted"]),
+        "next_attempt": list(state["next_attempt"]),
+        "last_progress": list(state["next_attempt"]),
+    }
+
+
+def generate_task_chunk(transform_idx, start_index, n_tasks):
+    """
+    Generates the attempts [start_index, start_index + n_tasks) of one transform suite of the config.
+
+    Returns:
+    tasks (list): list of (attempt index, ready to export task, task hash) tuples, failed attempts are skipped.
+        Attempts raising an exception are counted as task_error rejections and reported with a warning
+    stats (dict): StageTimer snapshot of the chunk if the workers are instrumented, None otherwise
+    rejections (dict): RejectionStats snapshot of the chunk
+    profile (dict): raw cProfile stats of the chunk if the workers are profiled, None otherwise
+    """
+    profile = _worker_state["profile"]
+    with profile.profile():
+        tasks, stats, rejections = _generate_task_chunk(transform_idx, start_index, n_tasks)
+    return tasks, stats, rejections, profile.pop_snapshot() if profile.enabled else None
+
+
+def _generate_task_chunk(transform_idx, start_index, n_tasks):
+    gen = get_worker_generator(transform_idx)
+    task_space = get_worker_task_space(transform_idx) if gen.config.enumerate_tasks else None
+    timer = gen.timer
+    tasks = []
+    for task_index in range(start_index, start_index + n_tasks):
+        try:
+            if task_space is not None:
+                task = gen.generate_enumerated_task(task_space, task_index)
+            else:
+                task = gen.generate_single_task(task_index=task_index)
+            if not task:
+                timer.count("dropped_tasks")
+                continue
+            with timer.stage("adapt_task_format"):
+                ready_to_export_task = adapt_task_format(task, generate_key(rng=gen.rng))
+            with timer.stage("hash_task"):
+                task_hash = hash_task(ready_to_export_task["input"], ready_to_export_task["transformation_suite"],
+                                      version=_worker_state["hash_version"])
+            tasks.append((task_index, ready_to_export_task, task_hash))
+        except Exception as e:
+            # Failed pairs are handled by the generator: an exception here is a bug, the attempt is dropped
+            timer.count("dropped_tasks")
+            gen.rejections.count(gen.config.allowed_combinations[0], "task_error")
+            warnings.warn(f"Attempt {task_index} of transform {transform_idx} failed: {type(e).__name__}: {e}")
+    return tasks, timer.pop_snapshot() if timer.enabled else None, gen.rejections.pop_snapshot()
+
+
+class InlineExecutor:
+    """Runs work items in the calling process, with the same interface as ProcessPoolExecutor"""
+
+    def __init__(self, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def generate_balanced_tasks(config, n_tasks_to_generate, accept_task, n_workers=1, seed=None, max_chunk_size=25,
+                            state=None, on_progress=None, timer=None, rejections=None, check_feasibility="warn",
+                            max_attempts_without_progress=1000, profile=None, hash_version=HASH_VERSION):
+    """
+    Generates n_tasks_to_generate unique tasks equally balanced over the transform suites of
+    config["allowed_combinations"], using n_workers processes. Accepted tasks are handed to accept_task as soon as
+    they are processed and are not kept in memory.
+
+    Parameters:
+    config (dict): generation config, with one transform suite per entry of allowed_combinations
+    n_tasks_to_generate (int): total number of tasks
+    accept_task (callable): called by the coordinator with (transform index, task, task hash), stores the task and
+        returns False if it is a duplicate
+    n_workers (int): number of worker processes. With 1 worker, tasks are generated in the calling process
+    seed (int): seed of the run, every generation attempt gets its own stream spawned from it
+    max_chunk_size (int): maximum number of tasks generated per work item
+    state (dict): state returned by a previous, interrupted run with the same config, to resume it
+    on_progress (callable): called with the current state each time a work item has been processed
+    timer (StageTimer): if given and enabled, the workers are instrumented and their stats are merged into it, along
+        with the time spent in accept_task (deduplication and storage)
+    rejections (RejectionStats): if given, the rejection counts of the workers are merged into it, along with the
+        accepted and duplicate tasks per transform suite
+    check_feasibility (str): feasibility check of the config (see Generator), run once by the coordinator. The
+        workers do not check it again.
+    max_attempts_without_progress (int): a suite is skipped, with a warning, after this many attempts in a row that
+        failed or produced a duplicate
+    profile (ProfileStats): if given and enabled, the workers profile the chunks they generate and the coordinator
+        the processing of the chunks, and the stats are merged into it
+    hash_version (int): version of the task hashes handed to accept_task, see db_utils.hash_task
+
+    With config["enumerate_tasks"], the exact number of distinct test inputs of every suite is printed up front, and
+    a transform whose space is walked before its quota is reached gets fewer tasks.
+
+    Returns:
+    state (dict): JSON serializable state of the run: seed entropy, accepted tasks, next attempt and attempt after the
+        last accepted task per transform
+    """
+    quotas = split_quotas(n_tasks_to_generate, len(config["allowed_combinations"]))
+    if state is None:
+        state = {
+            "entropy": np.random.SeedSequence(seed).entropy,
+            "n_accepted": [0] * len(quotas),
+            "next_attempt": [0] * len(quotas),  # next attempt to process, per transform
+        }
+    state.setdefault("last_progress", list(state["next_attempt"]))  # States saved before it was tracked
+    entropy, n_accepted, next_to_process = state["entropy"], state["n_accepted"], state["next_attempt"]
+    last_progress = state["last_progress"]  # attempt after the last accepted task, per transform
+    requested = [0] * len(quotas)  # attempts submitted to the workers and not processed yet
+    next_index = list(next_to_process)  # next attempt to submit, per transform
+    finished_chunks = [{} for _ in quotas]  # start index -> (n_tasks, tasks), waiting for the previous chunks
+    max_in_flight = 2 * n_workers
+    pending = {}
+    if timer is None:
+        timer = StageTimer()
+    if rejections is None:
+        rejections = RejectionStats()
+    if profile is None:
+        profile = ProfileStats()
+    transform_suites = config["allowed_combinations"]
+    gen = Generator(config, check_feasibility=check_feasibility)
+
+    max_attempts = [math.inf] * len(quotas)
+    if config.get("enumerate_tasks"):
+        for i, task_space in enumerate(get_task_spaces(gen, entropy)):
+            max_attempts[i] = task_space.n_attempts
+            n_inputs = task_space.count_inputs()
+            print(f"{transform_suites[i]}: {n_inputs} distinct test inputs, "
+                  f"{task_space.n_candidates} candidates in {len(task_space.strata)} strata")
+            if n_inputs < quotas[i]:
+                print(f"{transform_suites[i]}: the task space is smaller than the quota of {quotas[i]} tasks")
+
+    def is_stalled(i, attempt_index):
+        return attempt_index - last_progress[i] >= max_attempts_without_progress
+
+    skipped = [is_stalled(i, next_to_process[i]) for i in range(len(quotas))]
+
+    def n_missing(i):
+        return 0 if skipped[i] else quotas[i] - n_accepted[i] - requested[i]
+
+    def skip(i):
+        skipped[i] = True
+        warnings.warn(f"{transform_suites[i]}: skipped after {max_attempts_without_progress} attempts without a new "
+                      f"task, {n_accepted[i]} / {quotas[i]} tasks")
+
+    def submit_work(executor):
+        for i in range(len(quotas)):
+            while n_missing(i) > 0 and next_index[i] < max_attempts[i] and len(pending) < max_in_flight:
+                n_tasks = min(max_chunk_size, math.ceil(n_missing(i) / n_workers), max_attempts[i] - next_index[i])
+                future = executor.submit(generate_task_chunk, i, next_index[i], n_tasks)
+                pending[future] = (i, next_index[i], n_tasks)
+                next_index[i] += n_tasks
+                requested[i] += n_tasks
+
+    def process_finished_chunks(i):
+        while not skipped[i] and next_to_process[i] in finished_chunks[i]:
+            n_tasks, tasks = finished_chunks[i].pop(next_to_process[i])
+            requested[i] -= n_tasks
+            for task_index, task, task_hash in tasks:
+                if n_accepted[i] >= quotas[i]:
+                    continue
+                if is_stalled(i, task_index):
+                    break
+                with timer.stage("accept_task"):
+                    accepted = accept_task(i, task, task_hash)
+                if accepted:
+                    n_accepted[i] += 1
+                    last_progress[i] = task_index + 1
+                    rejections.count(transform_suites[i], "accepted_tasks")
+                else:
+                    timer.count("duplicate_tasks")
+                    rejections.count(transform_suites[i], "duplicate")
+            # The attempts of a stalled suite are processed up to the limit, whatever the split of the chunks
+            next_to_process[i] = min(next_to_process[i] + n_tasks, last_progress[i] + max_attempts_without_progress)
+            if n_accepted[i] < quotas[i] and is_stalled(i, next_to_process[i]):
+                skip(i)
+            if on_progress is not None:
+                on_progress(state)
+
+    executor_class = ProcessPoolExecutor if n_workers > 1 else InlineExecutor
+    executor_kwargs = {"max_workers": n_workers} if n_workers > 1 else {}
+    initargs = (config, entropy, timer.enabled, profile.enabled, hash_version)
+    with executor_class(initializer=init_worker, initargs=initargs, **executor_kwargs) as executor:
+        submit_work(executor)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, start_index, n_tasks = pending.pop(future)
+                tasks, stats, chunk_rejections, chunk_profile = future.result()
+                if stats is not None:
+                    timer.merge(stats)
+                rejections.merge(chunk_rejections)
+                profile.merge(chunk_profile)
+                finished_chunks[i][start_index] = (n_tasks, tasks)
+                with profile.profile():
+                    process_finished_chunks(i)
+                print(f"Generated {sum(n_accepted)} / {n_tasks_to_generate} tasks", end="\r")
+            submit_work(executor)
+
+    exhausted = [i for i, quota in enumerate(quotas) if n_accepted[i] < quota and not skipped[i]]
+    if exhausted:
+        print()
+    for i in exhausted:
+        print(f"{transform_suites[i]}: the task space is exhausted after {n_accepted[i]} / {quotas[i]} tasks")
+    return state
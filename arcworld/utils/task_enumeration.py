@@ -0,0 +1,230 @@
+import numpy as np
+from scipy.ndimage import binary_dilation
+
+## Exhaustive enumeration of the test inputs of a transform suite, for configs whose task space is small enough to be
+## walked instead of sampled. A candidate is a grid size, one or two shapes of the compatible pool of the suite and the
+## position of each shape. Tasks are deduplicated on their test input, and distinct candidates give distinct inputs
+## (the library has no duplicate shapes, and the two shapes of a candidate are unordered), so walking distinct
+## candidates generates distinct tasks without any deduplication retry. The only exception are pools of shapes made of
+## several parts, where one shape can look like two others placed apart: the task writer still checks the hashes.
+##
+## The candidates are grouped in strata, one per (grid size, number of shapes), which the random sampler picks
+## uniformly. Attempt k of an enumeration is the (k // n_strata)-th candidate of stratum k % n_strata, in an order
+## given by a keyed pseudo-random permutation of the stratum. Attempts are therefore independent of each other (they
+## can be generated by any worker, in any order) and never repeat a candidate. A stratum is made of blocks, one per
+## shape (or unordered pair of shapes), holding every position of the shapes in the grid. Candidates whose shapes touch
+## are kept in the blocks and rejected when the input grid is built; count_inputs counts the valid ones exactly.
+
+MAX_ENUMERATION_SHAPES = 2
+MAX_ENUMERATION_BLOCKS = 10_000_000
+FEISTEL_ROUNDS = 4
+MASK_64 = (1 << 64) - 1
+
+_input_counts_cache = {}  # (pool, strata) -> number of distinct inputs per stratum
+
+
+class IndexPermutation:
+    """
+    Keyed pseudo-random permutation of range(n), evaluated one index at a time in constant memory: a balanced Feistel
+    network on the smallest even number of bits covering n, with cycle walking to stay below n.
+
+    Usage:
+        permutation = IndexPermutation(1000, keys=[1, 2, 3, 4])
+        permutation[0]  # some index in range(1000), different for every argument
+    """
+
+    def __init__(self, n: int, keys):
+        self.n = n
+        self.keys = [int(key) & MASK_64 for key in keys]
+        self.half_bits = max(1, (max(n - 1, 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+
+    def _round(self, value: int, key: int) -> int:
+        # splitmix64 finalizer of (value, key), truncated to half_bits
+        x = (value * 0x9E3779B97F4A7C15 + key) & MASK_64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+        return (x ^ (x >> 31)) & self.half_mask
+
+    def _encrypt(self, index: int) -> int:
+        left, right = index >> self.half_bits, index & self.half_mask
+        for key in self.keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self.n:
+            raise IndexError(f"Index {index} out of range({self.n})")
+        index = self._encrypt(index)
+        while index >= self.n:
+            index = self._encrypt(index)
+        return index
+
+
+def get_danger_coords(mask: np.ndarray) -> np.ndarray:
+    """Coordinates of the cells occupied by, or 8-connected to, the pixels of a shape at (0, 0)"""
+    danger_zone = binary_dilation(np.pad(mask, 1), structure=np.ones((3, 3), dtype=bool))
+    return np.argwhere(danger_zone) - 1
+
+
+def get_touching_offsets(danger_coords_a: np.ndarray, coords_b: np.ndarray) -> np.ndarray:
+    """
+    Parameters:
+    danger_coords_a (np.ndarray): get_danger_coords of shape a
+    coords_b (np.ndarray): coordinates of the pixels of shape b at (0, 0)
+
+    Returns:
+    offsets (np.ndarray): (n, 2) distinct positions of the top left corner of shape b relative to the one of shape a at
+        which the shapes overlap or touch, diagonals included
+    """
+    differences = (danger_coords_a[:, None, :] - coords_b[None, :, :]).reshape(-1, 2)
+    # Unique rows, through a single integer per offset
+    base = 2 * (np.abs(differences).max(initial=0) + 1)
+    keys = np.unique((differences[:, 0] + base // 2) * base + differences[:, 1] + base // 2)
+    return np.column_stack((keys // base, keys % base)) - base // 2
+
+
+def count_shifted_pairs(n_positions_a: np.ndarray, n_positions_b: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Number of positions p of a (in range(n_positions_a), per axis) such that p + offset is a position of b"""
+    low = np.maximum(0, -offsets)
+    high = np.minimum(n_positions_a, n_positions_b - offsets)
+    return np.clip(high - low, 0, None).prod(axis=-1)
+
+
+class TaskSpace:
+    """
+    Candidate test inputs of one transform suite of a config.
+
+    Usage:
+        space = TaskSpace(generator.allowed_suite_plans[0], generator.config, generator.shape_library, seed=0)
+        space.count_inputs()  # exact number of distinct valid input grids
+        space.get_candidate(k)  # (grid size, shape ids, positions) of attempt k, None if there is none
+    """
+
+    def __init__(self, plan, config, shape_library, seed=None):
+        """
+        Parameters:
+        plan (SuitePlan): plan of the suite, its shape_ids are the pool of the candidates
+        config (ConfigValidator): generation config, with at most MAX_ENUMERATION_SHAPES shapes per grid
+        shape_library (ShapeLibrary): library the shape ids refer to
+        seed (int | np.random.SeedSequence): key of the permutations of the strata
+        """
+        if config.max_n_shapes_per_grid > MAX_ENUMERATION_SHAPES:
+            raise ValueError(f"Task enumeration supports at most {MAX_ENUMERATION_SHAPES} shapes per grid")
+        self.plan = plan
+        self.shape_library = shape_library
+        self.pool = np.asarray(plan.shape_ids)
+        self.dims = shape_library.dims[self.pool].astype(np.int64)
+        self._input_counts = None
+
+        blocks_per_n_shapes = {}  # Shared by the strata of every grid size
+        grid_sizes = range(config.min_grid_size, config.max_grid_size + 1)
+        self.strata = []  # (grid size, number of shapes, block pool indices, cumulated block sizes)
+        n_blocks = 0
+        for n_rows in grid_sizes:
+            for n_cols in grid_sizes:
+                n_positions = np.clip(np.array([n_rows, n_cols]) - self.dims + 1, 0, None)  # (len(pool), 2)
+                for n_shapes in range(config.min_n_shapes_per_grid, config.max_n_shapes_per_grid + 1):
+                    if n_shapes not in blocks_per_n_shapes:
+                        blocks_per_n_shapes[n_shapes] = self.get_blocks(n_shapes)
+                    blocks = blocks_per_n_shapes[n_shapes]
+                    block_sizes = n_positions[blocks].prod(axis=(1, 2))
+                    self.strata.append(((n_rows, n_cols), n_shapes, blocks, np.cumsum(block_sizes)))
+                    n_blocks += len(blocks)
+                    if n_blocks > MAX_ENUMERATION_BLOCKS:
+                        raise ValueError(
+                            f"The task space of {plan.transform_suite} has more than {MAX_ENUMERATION_BLOCKS} blocks, "
+                            "use the random sampler"
+                        )
+        self.stratum_sizes = [int(cumsizes[-1]) if len(cumsizes) else 0 for *_, cumsizes in self.strata]
+        keys = np.random.default_rng(seed).integers(1 << 63, size=(len(self.strata), FEISTEL_ROUNDS))
+        self.permutations = [
+            IndexPermutation(size, stratum_keys) for size, stratum_keys in zip(self.stratum_sizes, keys)
+        ]
+
+    def get_blocks(self, n_shapes: int) -> np.ndarray:
+        """(n_blocks, n_shapes) pool indices of the shapes of every block, pairs are unordered"""
+        if n_shapes == 1:
+            return np.arange(len(self.pool))[:, None]
+        return np.column_stack(np.triu_indices(len(self.pool)))
+
+    @property
+    def n_candidates(self) -> int:
+        return sum(self.stratum_sizes)
+
+    @property
+    def n_attempts(self) -> int:
+        """Number of attempts after which every stratum has been walked"""
+        return len(self.strata) * max(self.stratum_sizes, default=0)
+
+    def get_candidate(self, attempt: int):
+        """
+        Returns:
+        candidate (tuple): grid size, library ids of the shapes and position of their top left corners. None if the
+            stratum of the attempt has been walked, or if the attempt is the second ordering of an unordered pair of
+            identical shapes
+        """
+        stratum = attempt % len(self.strata)
+        index = attempt // len(self.strata)
+        if index >= self.stratum_sizes[stratum]:
+            return None
+        grid_size, n_shapes, blocks, cumsizes = self.strata[stratum]
+        index = self.permutations[stratum][index]
+        block = int(np.searchsorted(cumsizes, index, side="right"))
+        offset = index - (int(cumsizes[block - 1]) if block else 0)
+
+        pool_indices = blocks[block]
+        n_positions = np.array(grid_size) - self.dims[pool_indices] + 1
+        positions = []
+        for n_rows, n_cols in reversed(n_positions.tolist()):  # Mixed radix, the last shape varying fastest
+            offset, flat_position = divmod(offset, n_rows * n_cols)
+            positions.append(divmod(flat_position, n_cols))
+        positions.reverse()
+        if n_shapes == 2 and pool_indices[0] == pool_indices[1] and positions[0] >= positions[1]:
+            return None
+        return grid_size, self.pool[pool_indices].tolist(), positions
+
+    def count_inputs(self) -> int:
+        """Exact number of distinct input grids of the space, i.e. of candidates whose shapes do not touch. The counts
+        only depend on the pool and the strata, they are shared by the spaces of the suites with the same pool."""
+        if self._input_counts is None:
+            key = (self.pool.tobytes(), tuple((grid_size, n_shapes) for grid_size, n_shapes, _, _ in self.strata))
+            if key not in _input_counts_cache:
+                _input_counts_cache[key] = self.count_strata_inputs()
+            self._input_counts = _input_counts_cache[key]
+        return sum(self._input_counts)
+
+    def count_strata_inputs(self) -> list:
+        """Number of distinct input grids of every stratum. The touching offsets of every pair of shapes are computed
+        once, and counted for the grid sizes of all the strata of two shapes at once."""
+        counts = [0] * len(self.strata)
+        two_shape_strata = []
+        for i, (grid_size, n_shapes, _, _) in enumerate(self.strata):
+            n_positions = np.clip(np.array(grid_size) - self.dims + 1, 0, None)
+            if n_shapes == 1:
+                counts[i] = int(n_positions.prod(axis=1).sum())
+            else:
+                two_shape_strata.append(i)
+        if not two_shape_strata:
+            return counts
+
+        grid_sizes = np.array([self.strata[i][0] for i in two_shape_strata])  # (n_strata, 2)
+        n_positions = np.clip(grid_sizes[:, None, :] - self.dims[None, :, :] + 1, 0, None)  # (n_strata, len(pool), 2)
+        masks = [self.shape_library.get_grid(int(shape_id)) != 0 for shape_id in self.pool]
+        coords = [np.argwhere(mask) for mask in masks]
+        danger_coords = [get_danger_coords(mask) for mask in masks]
+        n_pairs = np.zeros(len(two_shape_strata), dtype=np.int64)
+        for a, b in self.get_blocks(2):
+            offsets = get_touching_offsets(danger_coords[a], coords[b])
+            n_positions_a, n_positions_b = n_positions[:, a], n_positions[:, b]
+            n_touching = count_shifted_pairs(n_positions_a[:, None], n_positions_b[:, None], offsets[None]).sum(axis=1)
+            n_block_pairs = n_positions_a.prod(axis=1) * n_positions_b.prod(axis=1) - n_touching
+            if a == b:
+                n_block_pairs //= 2  # Both orderings of two copies of a shape give the same grid
+            n_pairs += n_block_pairs
+        for i, n in zip(two_shape_strata, n_pairs.tolist()):
+            counts[i] = n
+        return counts
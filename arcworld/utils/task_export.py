@@ -0,0 +1,205 @@
+import array
+import json
+import os
+
+import h5py
+import numpy as np
+
+from .task_shards import iter_sharded_tasks
+
+## Compact binary format of a generated split, in a single HDF5 file. All the grids of the split are stored one after
+## the other (row-major, uint8) in a flat "pixels" dataset, like the packed shapes file:
+##
+##     pixels        (n_pixels,)    uint8   contiguous and uncompressed, so that it can be memory-mapped
+##     grid_index    (n_grids, 3)   int64   (offset, n_rows, n_cols) of every grid in pixels
+##     task_grids    (n_tasks, 4)   int64   grid ids of input, output, demo_input and demo_output (-1 if there is no demo)
+##     task_keys     (n_tasks,)     bytes   task keys
+##     task_suite    (n_tasks,)     int32   index of the transformation suite of each task in suites
+##     suites        (n_suites,)    str     distinct transformation suites, as json lists
+##
+## TaskArrayWriter streams tasks to disk while they are generated, and TaskArrayDataset reads a split back, returning
+## read-only numpy views on the memory-mapped pixels: loading a task copies no data.
+
+FORMAT_VERSION = 1
+GRID_NAMES = ("input", "output", "demo_input", "demo_output")
+COPY_BLOCK_SIZE = 1 << 24
+
+
+class TaskArrayWriter:
+    """
+    Writes tasks (in the format of adapt_task_format) to a binary split file, in constant memory: the pixels are
+    appended to a temporary raw file and only the index is kept in memory until close().
+
+    Usage:
+        with TaskArrayWriter("train.h5") as writer:
+            for task in tasks:
+                writer.write(task)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pixels_path = f"{path}.{os.getpid()}.pixels.tmp"
+        self._pixels_file = open(self._pixels_path, "wb")
+        self.n_pixels = 0
+        self.grid_index = array.array("q")
+        self.task_grids = array.array("q")
+        self.task_suite = array.array("i")
+        self.task_keys = []
+        self.suites = {}  # json suite -> suite id
+
+    def __len__(self):
+        return len(self.task_keys)
+
+    def _write_grid(self, grid) -> int:
+        grid = np.asarray(grid, dtype=np.uint8)
+        if grid.ndim != 2:
+            raise ValueError(f"Expected a 2D grid, got shape {grid.shape}")
+        self._pixels_file.write(np.ascontiguousarray(grid).tobytes())
+        self.grid_index.extend((self.n_pixels, *grid.shape))
+        self.n_pixels += grid.size
+        return len(self.grid_index) // 3 - 1
+
+    def write(self, task: dict):
+        grid_ids = [self._write_grid(task[name]) if name in task else -1 for name in GRID_NAMES]
+        self.task_grids.extend(grid_ids)
+        suite = json.dumps(task["transformation_suite"])
+        self.task_suite.append(self.suites.setdefault(suite, len(self.suites)))
+        self.task_keys.append(task["task_key"])
+
+    def close(self):
+        """Writes the split file. It is written to a temporary file first and renamed when complete."""
+        if self._pixels_file is None:
+            return
+        self._pixels_file.close()
+        self._pixels_file = None
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with h5py.File(tmp_path, "w") as f:
+                f.attrs["format_version"] = FORMAT_VERSION
+                pixels = f.create_dataset("pixels", shape=(self.n_pixels,), dtype="u1")
+                with open(self._pixels_path, "rb") as raw:
+                    for start in range(0, self.n_pixels, COPY_BLOCK_SIZE):
+                        block = np.frombuffer(raw.read(COPY_BLOCK_SIZE), dtype=np.uint8)
+                        pixels[start : start + len(block)] = block
+                f.create_dataset("grid_index", data=np.frombuffer(self.grid_index, dtype=np.int64).reshape(-1, 3))
+                f.create_dataset("task_grids", data=np.frombuffer(self.task_grids, dtype=np.int64).reshape(-1, 4))
+                f.create_dataset("task_keys", data=np.array(self.task_keys, dtype=bytes).reshape(-1))
+                f.create_dataset("task_suite", data=np.frombuffer(self.task_suite, dtype=np.int32))
+                f.create_dataset("suites", data=list(self.suites), dtype=h5py.string_dtype())
+            os.replace(tmp_path, self.path)
+        finally:
+            os.remove(self._pixels_path)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def abort(self):
+        """Discards everything written so far"""
+        if self._pixels_file is not None:
+            self._pixels_file.close()
+            self._pixels_file = None
+            os.remove(self._pixels_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class TaskArrayDataset:
+    """
+    Reads a binary split file. Tasks are returned as dicts with the same keys as the json tasks, where the grids
+    are read-only uint8 views on the memory-mapped pixels.
+
+    Usage:
+        with TaskArrayDataset("train.h5") as dataset:
+            task = dataset[0]
+            task["input"]  # (n_rows, n_cols) uint8 array
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with h5py.File(path, "r") as f:
+            if f.attrs.get("format_version") != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a task file of version {FORMAT_VERSION}")
+            self.pixels = map_pixels(path, f["pixels"])
+            self.grid_index = f["grid_index"][()]
+            self.task_grids = f["task_grids"][()]
+            self.task_keys = f["task_keys"][()]
+            self.task_suite = f["task_suite"][()]
+            self.suites = [json.loads(suite) for suite in f["suites"].asstr()[()]]
+
+    def __len__(self):
+        return len(self.task_grids)
+
+    def get_grid(self, grid_id: int) -> np.ndarray:
+        offset, n_rows, n_cols = self.grid_index[grid_id]
+        grid = self.pixels[offset : offset + n_rows * n_cols].reshape(n_rows, n_cols)
+        grid.flags.writeable = False
+        return grid
+
+    def __getitem__(self, idx: int) -> dict:
+        if not -len(self) <= idx < len(self):
+            raise IndexError(f"Task {idx} out of range for a dataset of {len(self)} tasks")
+        task = {name: self.get_grid(grid_id) for name, grid_id in zip(GRID_NAMES, self.task_grids[idx]) if grid_id >= 0}
+        task["transformation_suite"] = self.suites[self.task_suite[idx]]
+        task["task_key"] = self.task_keys[idx].decode("utf-8")
+        return task
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def close(self):
+        self.pixels = None  # Releases the memory map once the returned views are gone
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def map_pixels(path: str, dataset: h5py.Dataset) -> np.ndarray:
+    """Memory-maps a contiguous uncompressed uint8 dataset, and falls back to reading it in memory"""
+    offset = dataset.id.get_offset()
+    if offset is None or dataset.chunks is not None or dataset.size == 0:
+        return dataset[()]
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=dataset.shape)
+
+
+def export_tasks(tasks, path: str) -> int:
+    """
+    Writes an iterable of tasks (in the format of adapt_task_format) to a binary split file.
+
+    Returns:
+    n_tasks (int): number of tasks written
+    """
+    with TaskArrayWriter(path) as writer:
+        for task in tasks:
+            writer.write(task)
+    return len(writer)
+
+
+def iter_json_tasks(path: str):
+    """Yields the tasks of a split written by generate_experiment_data.py: a json file or a folder of jsonl shards"""
+    if os.path.isdir(path):
+        yield from iter_sharded_tasks(path)
+    else:
+        with open(path) as f:
+            yield from json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Converts a json or jsonl split to the binary task format")
+    parser.add_argument("src", help="json file or folder of jsonl shards")
+    parser.add_argument("dst", help="output .h5 file")
+    args = parser.parse_args()
+    print(f"Wrote {export_tasks(iter_json_tasks(args.src), args.dst)} tasks to {args.dst}")
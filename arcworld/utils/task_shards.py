@@ -0,0 +1,183 @@
+import json
+import os
+
+## Streaming output of a generated split. Tasks are appended one per line to JSONL shard files as soon as they are
+## accepted, so that memory does not grow with the size of the split. A shard is closed once it holds max_tasks_per_shard
+## tasks or max_bytes_per_shard bytes, and a new one is opened. The output directory looks like:
+##
+##     train/
+##         manifest.json
+##         train-00000.jsonl
+##         train-00001.jsonl
+##
+## The manifest lists the shards with their number of tasks and bytes, and stores the state of the generation run at the
+## last checkpoint. Everything written after the last checkpoint is discarded when the split is resumed, so a crash
+## loses at most one checkpoint interval.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def get_shards_dir(file_path: str) -> str:
+    """train.json -> train/"""
+    root, _ = os.path.splitext(file_path)
+    return root
+
+
+def write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_manifest(directory: str) -> dict:
+    """Returns the manifest of a sharded split, or None if there is none"""
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+class ShardedTaskWriter:
+    """
+    Appends tasks to size-capped JSONL shards and keeps a manifest of the split.
+
+    Usage:
+        with ShardedTaskWriter("out/train") as writer:
+            state = writer.state  # generation state of the last checkpoint, None for a new split
+            for task in tasks:
+                writer.write(task)
+                ...
+                writer.checkpoint(state)
+            writer.finalize(state)
+    """
+
+    def __init__(self, directory: str, max_tasks_per_shard: int = 100_000, max_bytes_per_shard: int = 1 << 30,
+                 prefix: str = None):
+        """
+        Parameters:
+        directory (str): output directory of the split, created if needed
+        max_tasks_per_shard (int): maximum number of tasks per shard file
+        max_bytes_per_shard (int): maximum size of a shard file. A shard always holds at least one task.
+        prefix (str): name prefix of the shard files, defaults to the name of the directory
+        """
+        self.directory = directory
+        self.max_tasks_per_shard = max_tasks_per_shard
+        self.max_bytes_per_shard = max_bytes_per_shard
+        self.prefix = prefix or os.path.basename(os.path.normpath(directory))
+        self.shards = []  # [{"file", "n_tasks", "n_bytes"}], the last one is the open shard
+        self.state = None
+        self.complete = False
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+        self._restore()
+
+    @property
+    def n_tasks(self) -> int:
+        return sum(shard["n_tasks"] for shard in self.shards)
+
+    def _restore(self):
+        """
+        Reloads the manifest of an interrupted run and drops the tasks written after its last checkpoint. Without a
+        manifest, the run crashed before its first checkpoint and all its shards are dropped.
+        """
+        manifest = read_manifest(self.directory)
+        if manifest is not None:
+            self.shards = manifest["shards"]
+            self.state = manifest["state"]
+            self.complete = manifest["complete"]
+        known_files = {shard["file"] for shard in self.shards}
+        for file_name in os.listdir(self.directory):
+            is_shard = file_name.startswith(f"{self.prefix}-") and file_name.endswith(".jsonl")
+            if is_shard and file_name not in known_files:
+                os.remove(os.path.join(self.directory, file_name))  # Shard opened after the last checkpoint
+        for shard in self.shards:
+            self._truncate(shard)
+
+    def _truncate(self, shard: dict):
+        """Drops the bytes written to a shard after it was last checkpointed"""
+        shard_path = os.path.join(self.directory, shard["file"])
+        if os.path.getsize(shard_path) != shard["n_bytes"]:
+            os.truncate(shard_path, shard["n_bytes"])
+
+    def _open_shard(self):
+        if self.shards and not self._is_full(self.shards[-1], 0):
+            shard = self.shards[-1]
+            self._truncate(shard)
+            self._file = open(os.path.join(self.directory, shard["file"]), "ab")
+        else:
+            shard = {"file": f"{self.prefix}-{len(self.shards):05d}.jsonl", "n_tasks": 0, "n_bytes": 0}
+            self.shards.append(shard)
+            self._file = open(os.path.join(self.directory, shard["file"]), "wb")
+
+    def _is_full(self, shard: dict, n_bytes: int) -> bool:
+        if shard["n_tasks"] == 0:
+            return False
+        return shard["n_tasks"] >= self.max_tasks_per_shard or shard["n_bytes"] + n_bytes > self.max_bytes_per_shard
+
+    def write(self, task: dict):
+        """Appends a task to the current shard, rolling over to a new shard if it is full"""
+        if self.complete:
+            raise ValueError(f"Split {self.directory} is already complete")
+        line = (json.dumps(task) + "\n").encode("utf-8")
+        if self._file is None:
+            self._open_shard()
+        elif self._is_full(self.shards[-1], len(line)):
+            self._file.close()
+            self._open_shard()
+        self._file.write(line)
+        self.shards[-1]["n_tasks"] += 1
+        self.shards[-1]["n_bytes"] += len(line)
+
+    def checkpoint(self, state=None):
+        """
+        Makes the tasks written so far durable and records them in the manifest.
+
+        Parameters:
+        state (dict): JSON serializable state of the generation run, returned by `self.state` on resume
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.state = state
+        write_json_atomic(os.path.join(self.directory, MANIFEST_NAME), {
+            "version": MANIFEST_VERSION,
+            "format": "jsonl",
+            "complete": self.complete,
+            "n_tasks": self.n_tasks,
+            "shards": [shard for shard in self.shards if shard["n_tasks"] > 0],
+            "state": state,
+        })
+
+    def finalize(self, state=None):
+        """Writes the last checkpoint and marks the split as complete"""
+        self.complete = True
+        self.checkpoint(state)
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()  # Without a checkpoint: an interrupted run restarts from the last checkpoint
+        return False
+
+
+def iter_sharded_tasks(directory: str):
+    """Yields the tasks of a sharded split in order, reading one line at a time"""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST_NAME} in {directory}")
+    for shard in manifest["shards"]:
+        with open(os.path.join(directory, shard["file"]), "rb") as f:
+            for _, line in zip(range(shard["n_tasks"]), f):
+                yield json.loads(line)
@@ -0,0 +1,89 @@
+"""Microbenchmark for the grid <-> point cloud conversions on the shapes in shapes.h5.
+
+Compares the vectorized conversions of arcworld.shapes.utils / arcworld.point_cloud.utils
+with the per-pixel Python loops they replaced, and checks that both give the same result.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_grid_conversions
+"""
+import argparse
+import time
+
+import h5py
+import numpy as np
+
+from arcworld import hdf5_utils
+from arcworld.constants import MAX_GRID_SIZE
+from arcworld.point_cloud.point_cloud import PointCloud
+from arcworld.point_cloud.utils import pc_to_full_sized_grid, pc_to_shape_only_grid
+from arcworld.shapes.utils import grid_to_pc
+
+
+def loop_grid_to_pc(grid):
+    pc = {}
+    for idx in np.transpose(np.nonzero(grid)):
+        idx = tuple(idx)
+        pc[idx] = grid[idx]
+    return PointCloud(pc)
+
+
+def loop_pc_to_full_sized_grid(pc, n_cols=MAX_GRID_SIZE, n_rows=MAX_GRID_SIZE):
+    grid = np.zeros((n_cols, n_rows), dtype=int)
+    for idx, color in pc.items():
+        grid[idx] = color
+    return grid
+
+
+def loop_pc_to_shape_only_grid(pc):
+    grid = np.zeros((pc.n_rows, pc.n_cols), dtype=int)
+    dx = pc.min_x
+    dy = pc.min_y
+    for (x, y), color in pc.items():
+        grid[(x - dx, y - dy)] = color
+    return grid
+
+
+def time_function(function, inputs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for x in inputs:
+            function(x)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_equal(grids, pcs):
+    for grid, pc in zip(grids, pcs):
+        assert loop_grid_to_pc(grid) == grid_to_pc(grid)
+        assert np.array_equal(loop_pc_to_full_sized_grid(pc), pc_to_full_sized_grid(pc))
+        assert np.array_equal(loop_pc_to_shape_only_grid(pc), pc_to_shape_only_grid(pc))
+
+
+def main(n_shapes=None, repeat=3):
+    with h5py.File(hdf5_utils.SHAPE_DATASET_PATH) as f:
+        n_total = hdf5_utils.get_nr_of_shapes()
+        n_shapes = n_total if n_shapes is None else min(n_shapes, n_total)
+        grids = [hdf5_utils.load_shape(idx, f) for idx in range(n_shapes)]
+    pcs = [grid_to_pc(grid) for grid in grids]
+    check_equal(grids, pcs)
+
+    benchmarks = [
+        ("grid_to_pc", loop_grid_to_pc, grid_to_pc, grids),
+        ("pc_to_full_sized_grid", loop_pc_to_full_sized_grid, pc_to_full_sized_grid, pcs),
+        ("pc_to_shape_only_grid", loop_pc_to_shape_only_grid, pc_to_shape_only_grid, pcs),
+    ]
+    print(f"{n_shapes} shapes, best of {repeat} runs")
+    print(f"{'conversion':<24}{'loop (ms)':>12}{'vectorized (ms)':>18}{'speedup':>10}")
+    for name, loop_function, vectorized_function, inputs in benchmarks:
+        loop_time = time_function(loop_function, inputs, repeat)
+        vectorized_time = time_function(vectorized_function, inputs, repeat)
+        print(f"{name:<24}{loop_time * 1e3:>12.1f}{vectorized_time * 1e3:>18.1f}{loop_time / vectorized_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-shapes", type=int, default=None, help="only use the first n shapes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.n_shapes, args.repeat)
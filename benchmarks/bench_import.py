@@ -0,0 +1,53 @@
+"""Import-time benchmark and guard for the task generation import path.
+
+Imports the generation modules in fresh interpreters and reports the median import time. Fails if one of them
+imports a plotting, rendering or analysis library, which only the plotting helpers and the shape generation
+scripts need.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_import
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CORE_MODULES = ["arcworld.generator", "arcworld.utils.parallel_generation"]
+FORBIDDEN_MODULES = ["matplotlib", "PIL", "pandas", "skimage", "factory"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(m for m in {forbidden} if m in sys.modules)}}))
+"""
+
+
+def time_import(module):
+    script = IMPORT_SCRIPT.format(module=module, forbidden=FORBIDDEN_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(repeat=5, max_seconds=None):
+    failed = False
+    print(f"{'module':<40}{'median (ms)':>14}{'min (ms)':>12}  forbidden imports")
+    for module in CORE_MODULES:
+        runs = [time_import(module) for _ in range(repeat)]
+        seconds = [run["seconds"] for run in runs]
+        forbidden = sorted(set(m for run in runs for m in run["modules"]))
+        median = statistics.median(seconds)
+        print(f"{module:<40}{median * 1e3:>14.1f}{min(seconds) * 1e3:>12.1f}  {', '.join(forbidden) or '-'}")
+        if forbidden or (max_seconds is not None and median > max_seconds):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail if a median import time is above this")
+    args = parser.parse_args()
+    sys.exit(main(args.repeat, args.max_seconds))
@@ -0,0 +1,77 @@
+"""Microbenchmark for the placement search of find_possible_positions_no_diagonal.
+
+Places the shapes of shapes.h5 in partially filled 30x30 worlds, and compares the correlation based search of
+arcworld.general_utils with the per-position Python loop it replaced. Both must return the same positions.
+
+Run from the root of the repository:
+    python -m benchmarks.bench_placement
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.ndimage import binary_dilation
+
+from arcworld.general_utils import find_possible_positions_no_diagonal, sample_position_no_diagonal
+from arcworld.shape_library import ShapeLibrary
+
+
+def loop_find_possible_positions_no_diagonal(original_grid, object_to_position):
+    m, n = original_grid.shape
+    h, w = object_to_position.shape
+    object_mask = object_to_position != 0
+    danger_zone = binary_dilation(original_grid != 0, structure=np.ones((3, 3), dtype=bool))
+    safe_positions = []
+    for i in range(m - h + 1):
+        for j in range(n - w + 1):
+            if not np.any(danger_zone[i : i + h, j : j + w] & object_mask):
+                safe_positions.append((i, j))
+    return safe_positions
+
+
+def make_worlds(n_worlds, grid_size, density, rng):
+    worlds = []
+    for _ in range(n_worlds):
+        world = np.zeros((grid_size, grid_size), dtype=int)
+        occupied = rng.random((grid_size, grid_size)) < density
+        world[occupied] = rng.integers(1, 10, occupied.sum())
+        worlds.append(world)
+    return worlds
+
+
+def time_function(function, inputs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in inputs:
+            function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_shapes=200, grid_size=30, density=0.02, repeat=3, seed=0):
+    rng = np.random.default_rng(seed)
+    library = ShapeLibrary.load()
+    shape_ids = rng.choice(len(library), size=min(n_shapes, len(library)), replace=False)
+    worlds = make_worlds(len(shape_ids), grid_size, density, rng)
+    inputs = [(world, library.get_grid(idx)) for world, idx in zip(worlds, shape_ids)]
+    for world, grid in inputs:
+        assert loop_find_possible_positions_no_diagonal(world, grid) == find_possible_positions_no_diagonal(world, grid)
+    inputs = [(world, grid) for world, grid in inputs if find_possible_positions_no_diagonal(world, grid)]
+
+    loop_time = time_function(loop_find_possible_positions_no_diagonal, inputs, repeat)
+    list_time = time_function(find_possible_positions_no_diagonal, inputs, repeat)
+    sample_time = time_function(lambda world, grid: sample_position_no_diagonal(world, grid, rng), inputs, repeat)
+    print(f"{len(inputs)} placements in {grid_size}x{grid_size} worlds, best of {repeat} runs")
+    print(f"{'loop (ms)':>12}{'all positions (ms)':>20}{'sample one (ms)':>18}")
+    print(f"{loop_time * 1e3:>12.1f}{list_time * 1e3:>20.1f}{sample_time * 1e3:>18.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-shapes", type=int, default=200)
+    parser.add_argument("--grid-size", type=int, default=30)
+    parser.add_argument("--density", type=float, default=0.02, help="fraction of occupied cells in the worlds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.n_shapes, args.grid_size, args.density, args.repeat)
@@ -0,0 +1,95 @@
+import h5py
+import numpy as np
+from tqdm import tqdm
+
+from arcworld.hdf5_utils import get_nr_of_shapes, load_shape, save_transform_feasibility, SHAPE_DATASET_PATH
+from arcworld.shapes.base import Shape
+from arcworld.transformations.shape_transformations import transformations_dict
+from arcworld.transformations.transform_cache import CANONICAL_POSITION
+
+## For every shape of the library and every registered transform, records whether the transform fails, whether it
+## leaves an empty shape, whether it changes the shape at all, and how it moves the bounding box of the shape. The
+## transforms are applied to the shape moved away from the grid borders, so only the failures which do not depend on
+## the position of the shape are recorded. This is the canonical position of the transform cache: the table and the
+## cached results see the transforms in the same conditions, and transforms rasterizing the shape still fit in the
+## full-sized grid.
+
+FEASIBILITY_POSITION = CANONICAL_POSITION
+
+
+def get_bounding_box(shape):
+    return np.array([shape.min_x, shape.min_y, shape.max_x, shape.max_y])
+
+
+def shapes_are_equal(shape_a, shape_b):
+    points_a = sorted(zip(map(tuple, shape_a.pc.coords.tolist()), shape_a.pc.color_array.tolist()))
+    points_b = sorted(zip(map(tuple, shape_b.pc.coords.tolist()), shape_b.pc.color_array.tolist()))
+    return points_a == points_b
+
+
+def calculate_shape_feasibility(shape, transform_names):
+    """
+    Parameters:
+    shape (Shape): shape of the library
+    transform_names (list): names of the transforms in transformations_dict
+
+    Returns:
+    fails, becomes_empty, changes (np.ndarray): one flag per transform. A shape is empty when it has no colored pixel
+    bbox_delta (np.ndarray): (n_transforms, 4) change of (min_x, min_y, max_x, max_y) of the bounding box, 0 if the
+        transform fails or leaves an empty shape
+    """
+    n_transforms = len(transform_names)
+    fails = np.zeros(n_transforms, dtype=bool)
+    becomes_empty = np.zeros(n_transforms, dtype=bool)
+    changes = np.zeros(n_transforms, dtype=bool)
+    bbox_delta = np.zeros((n_transforms, 4), dtype=np.int16)
+
+    shape.move_to_position(FEASIBILITY_POSITION)
+    bounding_box = get_bounding_box(shape)
+    for i, name in enumerate(transform_names):
+        try:
+            transformed_shape = transformations_dict[name](Shape(shape))
+        except Exception:
+            fails[i] = True
+            continue
+        if transformed_shape is None or not np.any(transformed_shape.pc.color_array):
+            becomes_empty[i] = True
+            changes[i] = True
+            continue
+        changes[i] = not shapes_are_equal(shape, transformed_shape)
+        bbox_delta[i] = get_bounding_box(transformed_shape) - bounding_box
+    return fails, becomes_empty, changes, bbox_delta
+
+
+def calculate_transform_feasibility(transform_names=None):
+
+    """Computes the feasibility table of the given transforms (all registered transforms by default) and stores it
+    in shapes.h5, replacing any previous table"""
+
+    if transform_names is None:
+        transform_names = list(transformations_dict.keys())
+
+    n_shapes = get_nr_of_shapes()
+    table = {
+        "fails": np.zeros((n_shapes, len(transform_names)), dtype=bool),
+        "becomes_empty": np.zeros((n_shapes, len(transform_names)), dtype=bool),
+        "changes": np.zeros((n_shapes, len(transform_names)), dtype=bool),
+        "bbox_delta": np.zeros((n_shapes, len(transform_names), 4), dtype=np.int16),
+    }
+
+    f = h5py.File(SHAPE_DATASET_PATH)
+    for shape_idx in tqdm(range(n_shapes)):
+        shape = Shape(load_shape(shape_idx, f=f))
+        fails, becomes_empty, changes, bbox_delta = calculate_shape_feasibility(shape, transform_names)
+        table["fails"][shape_idx] = fails
+        table["becomes_empty"][shape_idx] = becomes_empty
+        table["changes"][shape_idx] = changes
+        table["bbox_delta"][shape_idx] = bbox_delta
+
+    f.close()
+    save_transform_feasibility(transform_names, table)
+
+
+if __name__ == "__main__":
+    # Recompute the table whenever the shape library or a transform changes
+    calculate_transform_feasibility()
@@ -0,0 +1,31 @@
+import argparse
+import os
+
+from arcworld.hdf5_utils import SHAPE_DATASET_PATH, convert_to_packed
+
+## One-shot migration of a shapes file from the legacy layout (one dataset per shape under "shapes/{idx}")
+## to the packed layout (one ragged uint8 pixel dataset + an offsets/dims index), see hdf5_utils.py.
+## Without --dst, the file is converted in place and the original is kept next to it with a ".legacy.h5" suffix.
+
+
+def convert_shapes_file(src, dst=None):
+    if dst is not None:
+        n_shapes = convert_to_packed(src, dst)
+        print(f"Converted {n_shapes} shapes from {src} to {dst}")
+        return
+
+    root, ext = os.path.splitext(src)
+    tmp_path = f"{root}.packed.tmp"
+    backup_path = f"{root}.legacy{ext}"
+    n_shapes = convert_to_packed(src, tmp_path)
+    os.replace(src, backup_path)
+    os.replace(tmp_path, src)
+    print(f"Converted {n_shapes} shapes in {src} (original kept in {backup_path})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a shapes file to the packed layout")
+    parser.add_argument("--src", default=SHAPE_DATASET_PATH, help="shapes file in the legacy layout")
+    parser.add_argument("--dst", default=None, help="output file (default: convert in place)")
+    args = parser.parse_args()
+    convert_shapes_file(args.src, args.dst)
@@ -1,14 +1,16 @@
-from arcworld.general_utils import generate_key
 import os
-import numpy as np
 from tqdm import tqdm
 import copy
 import json
 import pandas
 import time
 
-from arcworld.utils.db_utils import access_db, close_db, store_task_in_db, hash_task
-from arcworld.generator import Generator
+from arcworld.utils.db_utils import access_db, close_db, hash_task, BatchedTaskWriter
+from arcworld.utils.instrumentation import (REJECTION_REASONS, ProfileStats, RejectionStats, StageTimer,
+                                            write_stage_report)
+from arcworld.utils.parallel_generation import generate_balanced_tasks, get_next_split_state
+from arcworld.utils.task_export import TaskArrayWriter
+from arcworld.utils.task_shards import ShardedTaskWriter, get_shards_dir, iter_sharded_tasks, read_manifest
 from experiment_configs.c0 import compositionality_configs as c0_configs
 from experiment_configs.compositionality import compositionality_configs 
 from experiment_configs.generalization import generalization_configs
@@ -16,19 +18,6 @@ from experiment_configs.sample_efficiency import sample_efficiency_configs
 from experiment_configs.compositionality_gridsize import compositionality_gridsize_config
 from experiment_configs.c4 import c4_configs
 
-def adapt_task_format(task, task_key):
-    task_dict = {}
-    task_dict["input"] = np.int_(task["pairs"][-1]["input"]).tolist()
-    task_dict["output"] = np.int_(task["pairs"][-1]["output"]).tolist()
-    
-    if len(task["pairs"]) > 1:
-        task_dict["demo_input"] = np.int_(task["pairs"][0]["input"]).tolist()
-        task_dict["demo_output"] = np.int_(task["pairs"][0]["output"]).tolist()
-    
-    task_dict["transformation_suite"] = task["transformation_suite"]
-    task_dict["task_key"] = task_key
-    return task_dict
-
 def handle_paths(config): 
     path = config["saving_path"].split('/') # define the saving path
     folder_path = os.path.normpath('/'.join(path[:-1]))
@@ -38,43 +27,137 @@ def handle_paths(config):
     file_path = os.path.normpath(config["saving_path"])
     return db_name, folder_path, file_path
 
-def generate_equal_balance_from_transforms(config, n_tasks_to_generate):
-    
+def restore_task_hashes(writer, shards_dir):
+    """Adds to the database the hashes of the checkpointed tasks of a sharded split which are missing from it"""
+    for task in iter_sharded_tasks(shards_dir):
+        task_hash = hash_task(task["input"], task["transformation_suite"], version=writer.hash_version)
+        writer.restore(task["task_key"], task_hash, str(task["transformation_suite"]))
+    writer.flush()
+
+def generate_equal_balance_from_transforms(config, n_tasks_to_generate, n_workers=1, seed=None, output_format="json",
+                                           max_tasks_per_shard=100_000, checkpoint_every=1000, instrument=False,
+                                           profile=False, start_state=None):
+    """
+    Generates a split of n_tasks_to_generate tasks, equally balanced over the transform suites of the config.
+
+    With output_format="jsonl", tasks are streamed to size-capped shards in a folder named after the saving path
+    (train.json -> train/), with a manifest. The split is checkpointed every checkpoint_every tasks, and an
+    interrupted split is resumed from its last checkpoint when the function is called again. The __main__ script of
+    this file uses this format.
+    With output_format="h5", tasks are streamed to a compact binary file (train.json -> train.h5), see task_export.
+    With output_format="json", all the tasks are written at the end in a single json file.
+
+    Rejected pairs and tasks are counted per transform suite, by reason (see instrumentation.REJECTION_REASONS).
+    With instrument=True, the stages of the generation are also timed in every worker, and the breakdown is written
+    next to the saving path (train.json -> train_stages.json). With profile=True, every worker runs its chunks under
+    cProfile and the coordinator its deduplication and storage, and the merged stats are written to train.prof.
+
+    With config["enumerate_tasks"], pass get_next_split_state(stats["state"]) of the previous split of the same config
+    as start_state, so that the splits share no task.
+
+    Returns:
+    stats (dict): "rejections": RejectionStats report of the split (None if the split was already complete), "stages":
+        StageTimer snapshot if instrument is True, "state": generation state at the end of the split
+    """
     db_name, folder_path, file_path = handle_paths(config)
+    manifest = read_manifest(get_shards_dir(file_path))
+    if output_format == "jsonl" and manifest is not None and manifest["complete"]:
+        print(f"{get_shards_dir(file_path)} is already complete, skipping")
+        _, conn = access_db(db_name, folder_path)
+        with BatchedTaskWriter(conn, batch_size=None) as writer:  # The run may have stopped before its last flush
+            restore_task_hashes(writer, get_shards_dir(file_path))
+        close_db(conn)
+        return {"rejections": None, "stages": None, "state": manifest["state"]}
+    timer = StageTimer(enabled=instrument)
+    rejections = RejectionStats()
+    profile_stats = ProfileStats(enabled=profile)
+    try:
+        state = generate_split(config, n_tasks_to_generate, db_name, folder_path, file_path, n_workers, seed,
+                               output_format, max_tasks_per_shard, checkpoint_every, timer, rejections, start_state,
+                               profile_stats)
+    finally:
+        if profile:
+            profile_stats.dump(os.path.splitext(file_path)[0] + ".prof")
+
+    stats = {"rejections": rejections.report(), "stages": None, "state": state}
+    for suite, suite_report in stats["rejections"].items():
+        print(f"{suite}: {suite_report['rejections']} rejections ("
+              + ", ".join(f"{reason} {suite_report[reason]}" for reason in REJECTION_REASONS if suite_report[reason])
+              + f"), pair acceptance rate {suite_report['pair_acceptance_rate']}")
+    if instrument:
+        stats["stages"] = timer.snapshot()
+        write_stage_report({config["saving_path"]: stats["stages"]}, os.path.splitext(file_path)[0] + "_stages.json")
+    return stats
+
+
+def generate_split(config, n_tasks_to_generate, db_name, folder_path, file_path, n_workers, seed, output_format,
+                   max_tasks_per_shard, checkpoint_every, timer, rejections, start_state=None, profile=None):
     cursor, conn = access_db(db_name, folder_path) 
-    
-    list_of_transforms = config["allowed_combinations"]
-    n_per_transform = int(n_tasks_to_generate / len(list_of_transforms))
-    editable_config = copy.deepcopy(config)
-    
-    task_list = []
 
-    while len(task_list) < n_tasks_to_generate:
-        for transform in list_of_transforms:
-            count_per_transform = 0
-            editable_config["allowed_combinations"] = [transform]
-            gen = Generator(editable_config)
-            
-            while count_per_transform < n_per_transform and len(task_list) < n_tasks_to_generate:
-                try: 
-                    task = gen.generate_single_task()
-                    task_key = generate_key()
-                    ready_to_export_task = adapt_task_format(task, task_key)
-                    task_hash = hash_task(ready_to_export_task["input"], 
-                                          ready_to_export_task["transformation_suite"])
-                    if store_task_in_db(cursor, conn, task_key, task_hash, \
-                                        str(ready_to_export_task['transformation_suite']), 
-                                        debug=False): # If the task is not a duplicate
-                        task_list.append(ready_to_export_task)
-                        count_per_transform += 1
-                        print(f"Generated {len(task_list)} / {n_tasks_to_generate} tasks", end='\r')
-                except Exception as e:
-                    print(e)
-                    continue
+    if output_format == "json":
+        task_lists = [[] for _ in config["allowed_combinations"]]
+        with BatchedTaskWriter(conn) as writer:
+            def store_task(transform_idx, task, task_hash): # Returns False if the task is a duplicate
+                if not writer.add(task["task_key"], task_hash, str(task["transformation_suite"])):
+                    return False
+                task_lists[transform_idx].append(task)
+                return True
+
+            state = generate_balanced_tasks(config, n_tasks_to_generate, store_task, n_workers=n_workers, seed=seed,
+                                            state=start_state, timer=timer, rejections=rejections, profile=profile,
+                                            hash_version=writer.hash_version)
+        # Save the tasks in a json file (not using the function)
+        with open(f"{file_path}", "w") as f:
+            json.dump([task for tasks in task_lists for task in tasks], f)
+
+    elif output_format == "jsonl":
+        # Hashes are only stored at checkpoints, after the manifest: the database never holds the hash of a task the
+        # manifest does not record. A crash between the two leaves checkpointed tasks without their hash, which are
+        # added back to the database on resume.
+        with BatchedTaskWriter(conn, batch_size=None) as writer, \
+                ShardedTaskWriter(get_shards_dir(file_path), max_tasks_per_shard) as shards:
+            if shards.n_tasks:
+                restore_task_hashes(writer, shards.directory)
+            last_checkpoint = shards.n_tasks
+
+            def store_task(transform_idx, task, task_hash):
+                if not writer.add(task["task_key"], task_hash, str(task["transformation_suite"])):
+                    return False
+                shards.write(task)
+                return True
+
+            def checkpoint(state):
+                nonlocal last_checkpoint
+                if shards.n_tasks - last_checkpoint >= checkpoint_every:
+                    shards.checkpoint(state)
+                    writer.flush()
+                    last_checkpoint = shards.n_tasks
+
+            state = generate_balanced_tasks(config, n_tasks_to_generate, store_task, n_workers=n_workers, seed=seed,
+                                            state=shards.state or start_state, on_progress=checkpoint, timer=timer,
+                                            rejections=rejections, profile=profile, hash_version=writer.hash_version)
+            shards.finalize(state)
+            writer.flush()
+    elif output_format == "h5":
+        with BatchedTaskWriter(conn) as writer, TaskArrayWriter(os.path.splitext(file_path)[0] + ".h5") as tasks:
+            def store_task(transform_idx, task, task_hash):
+                if not writer.add(task["task_key"], task_hash, str(task["transformation_suite"])):
+                    return False
+                tasks.write(task)
+                return True
+
+            state = generate_balanced_tasks(config, n_tasks_to_generate, store_task, n_workers=n_workers, seed=seed,
+                                            state=start_state, timer=timer, rejections=rejections, profile=profile,
+                                            hash_version=writer.hash_version)
+    else:
+        raise ValueError(f"Unknown output format {output_format}")
+
     close_db(conn)
-    # Save the tasks in a json file (not using the function)
-    with open(f"{file_path}", "w") as f:
-        json.dump(task_list, f)
+    print()
+    for transformations, stats in writer.duplicate_rates().items():
+        print(f"{transformations}: {stats['duplicates']} duplicates / {stats['accepted']} tasks "
+              f"({100 * stats['duplicate_rate']:.1f}%)")
+    return state
 
 
 if __name__ == "__main__":
@@ -86,9 +169,27 @@ if __name__ == "__main__":
     n_train = 100
     n_test = 100
     n_val = 100
+
+    n_workers = os.cpu_count() # Number of processes used to generate each split
+    instrument = False # Set to True to write a per-stage timing breakdown of every split to generation_stages.csv
     
     # df will be used to store how long each config took
     time_dict = {}
+    stage_reports = {}
+    rejection_reports = {}
+
+    def run_split(split_config, n_tasks, previous_stats=None):
+        # With enumerate_tasks, the splits of a config continue the enumeration of the previous split
+        start_state = None
+        if split_config.get("enumerate_tasks") and previous_stats is not None:
+            start_state = get_next_split_state(previous_stats["state"])
+        stats = generate_equal_balance_from_transforms(split_config, n_tasks, n_workers, output_format="jsonl",
+                                                       instrument=instrument, start_state=start_state)
+        if stats["rejections"] is not None:
+            rejection_reports[split_config["saving_path"]] = stats["rejections"]
+        if stats["stages"] is not None:
+            stage_reports[split_config["saving_path"]] = stats["stages"]
+        return stats
 
     for study in configs_to_loop:
         for config in tqdm(study):
@@ -97,29 +198,29 @@ if __name__ == "__main__":
             if "experiment_1" in config["saving_path"]:
 
                 if "train" in config["saving_path"]:
-                    generate_equal_balance_from_transforms(config, n_train)
+                    train_stats = run_split(config, n_train)
                     
                     # Add train_val split
                     train_val_config = copy.deepcopy(config)
                     train_val_config["saving_path"] = train_val_config["saving_path"].replace("train", "val")
-                    generate_equal_balance_from_transforms(train_val_config, n_val)
+                    val_stats = run_split(train_val_config, n_val, train_stats)
                     
                     # # Add test split (in distribution)
                     train_test_config = copy.deepcopy(config)
                     train_test_config["saving_path"] = train_test_config["saving_path"].replace("train", "test")
-                    generate_equal_balance_from_transforms(train_test_config, n_test)
+                    run_split(train_test_config, n_test, val_stats)
 
                 elif "test" in config["saving_path"]:
                     
                     # Val OOD split
                     val_ood_config = copy.deepcopy(config)
                     val_ood_config["saving_path"] = val_ood_config["saving_path"].replace("test", "val_ood")
-                    generate_equal_balance_from_transforms(val_ood_config, n_val)
+                    val_ood_stats = run_split(val_ood_config, n_val)
                     
                     # Test OOD split
                     test_ood_config = copy.deepcopy(config)
                     test_ood_config["saving_path"] = test_ood_config["saving_path"].replace("test", "test_ood")
-                    generate_equal_balance_from_transforms(test_ood_config, n_test)
+                    run_split(test_ood_config, n_test, val_ood_stats)
                     
                 else:
                     print(f"Saving path {config['saving_path']} not recognized.")
@@ -131,6 +232,10 @@ if __name__ == "__main__":
     # convert the dict to a dataframe and save as csv
     df = pandas.DataFrame(list(time_dict.items()), columns=['config_path', 'time_taken_seconds'])
     df.to_csv("generation_times.csv", index=False)
+    if stage_reports:
+        write_stage_report(stage_reports, "generation_stages.csv")
+    with open("generation_rejections.json", "w") as f:
+        json.dump(rejection_reports, f, indent=2)
 
     ## For sample efficiency - comment out the above and uncomment the below
 
@@ -17,7 +17,9 @@ possible_shape_generation_config = {
     "allowed_symmetry": ["horizontal", "vertical", "diag_tl_br", "diag_bl_tr", "point", 'no'],
     "allowed_footprints": ["rectangle", "disk", "square", "diamond", "ellipse"]}
 
-def generate_shapes():
+def generate_shapes(seed=None):
+    """seed (int): seed of the shapes, the library is the same for the same seed"""
+    rng = np.random.default_rng(seed)
     k_obj_per_config = 1
     obj_n = 0
     n_errors = 0
@@ -32,7 +34,8 @@ def generate_shapes():
                     for k in range(k_obj_per_config):
                         try:
                             s = RandomShape(min_cols = cols, min_rows = rows, max_cols = cols, max_rows = rows,
-                                            footprint = foot, color_pattern = col_p, use_footprint = True).as_shape_only_grid
+                                            footprint = foot, color_pattern = col_p, use_footprint = True,
+                                            rng = rng).as_shape_only_grid
                             
 
                             hashed_object = hash(s.tobytes())
@@ -54,7 +57,7 @@ def generate_shapes():
                             try:
                                 s = RandomShape(min_cols = cols, min_rows = rows, max_cols = cols, max_rows = rows,
                                                 color_pattern = col_p, connectivity = con_p, symmetry = sym, 
-                                                use_footprint = False).as_shape_only_grid
+                                                use_footprint = False, rng = rng).as_shape_only_grid
                                 hashed_object = hash(s.tobytes())
                                 if hashed_object in set_of_objects:
                                     continue
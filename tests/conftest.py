@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from arcworld import hdf5_utils
+
+
+@pytest.fixture(scope="session")
+def shape_dataset():
+    """Path of the shape dataset, the tests using it are skipped if it is missing"""
+    if not (os.path.exists(hdf5_utils.SHAPE_DATASET_PATH) or os.path.exists(hdf5_utils.SHAPE_DATASET_ZIP_PATH)):
+        pytest.skip("The shape dataset is not available")
+    return hdf5_utils.SHAPE_DATASET_PATH
+
+
+@pytest.fixture(scope="session")
+def shape_library(shape_dataset):
+    from arcworld.shape_library import ShapeLibrary
+
+    return ShapeLibrary.load()
+
+
+@pytest.fixture(scope="session")
+def core(shape_dataset):
+    """GeneratorCore shared by the generators of the test session"""
+    from arcworld.generator import GeneratorCore
+
+    return GeneratorCore.shared()
+
+
+@pytest.fixture
+def config():
+    return {
+        "min_n_shapes_per_grid": 1,
+        "max_n_shapes_per_grid": 2,
+        "n_examples": 2,
+        "min_grid_size": 10,
+        "max_grid_size": 12,
+        "allowed_combinations": [["translate_up"], ["rot90"]],
+        "shape_compulsory_conditionals": ["is_shape_less_than_6_rows", "is_shape_less_than_6_cols"],
+    }
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from arcworld.conditionals.conditionals_index import ConditionalsIndex
+
+
+def boolean_mask_query(table, names, to_satisfy, not_to_satisfy):
+    mask = np.ones(len(table), dtype=bool)
+    for name in to_satisfy:
+        mask &= table[:, names.index(name)] != 0
+    for name in not_to_satisfy:
+        mask &= table[:, names.index(name)] == 0
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize("n_shapes", [1, 7, 8, 9, 300])
+def test_queries_match_the_boolean_mask_filter(n_shapes):
+    rng = np.random.default_rng(n_shapes)
+    names = [f"conditional_{i}" for i in range(6)]
+    table = (rng.random((n_shapes, len(names))) < 0.6).astype(np.uint8)
+    index = ConditionalsIndex(table, names)
+    for _ in range(50):
+        to_satisfy, not_to_satisfy = (list(rng.choice(names, size=rng.integers(0, 3), replace=False)) for _ in "ab")
+        expected = boolean_mask_query(table, names, to_satisfy, not_to_satisfy)
+        shape_ids = index.query(to_satisfy, not_to_satisfy)
+        assert np.array_equal(shape_ids, expected), (to_satisfy, not_to_satisfy)
+        assert not shape_ids.flags.writeable
+        assert index.query(to_satisfy[::-1], not_to_satisfy) is shape_ids  # Memoized whatever the order
+    assert np.array_equal(index.column(names[0]), table[:, 0] != 0)
+
+
+def test_library_queries_match_the_boolean_mask_filter(shape_dataset):
+    from arcworld import hdf5_utils
+
+    table, names = hdf5_utils.load_conditions()
+    index = ConditionalsIndex(table, names)
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        to_satisfy, not_to_satisfy = (list(rng.choice(names, size=rng.integers(0, 4), replace=False)) for _ in "ab")
+        expected = boolean_mask_query(table, names, to_satisfy, not_to_satisfy)
+        assert np.array_equal(index.query(to_satisfy, not_to_satisfy), expected), (to_satisfy, not_to_satisfy)
+
+
+def test_table_must_match_the_names():
+    with pytest.raises(ValueError):
+        ConditionalsIndex(np.zeros((3, 2)), ["only_one"])
@@ -0,0 +1,56 @@
+import pytest
+
+from arcworld.constants import InfeasibleConfigException
+from arcworld.generator import Generator
+from arcworld.utils.config_feasibility import check_config_feasibility
+
+INFEASIBLE_REPORT = {
+    "['rot90']": {"pool_size": 0, "pair_acceptance_rate": 0.0},
+    "['translate_up']": {"pool_size": 10, "pair_acceptance_rate": 0.0, "fit_probability": 0.0,
+                         "output_fit_probability": 0.0},
+}
+
+
+def test_warn_mode_only_warns_even_if_no_suite_can_produce_a_pair():
+    with pytest.warns(UserWarning, match="no shape of the library"):
+        check_config_feasibility(INFEASIBLE_REPORT)
+
+
+def test_strict_mode_raises():
+    with pytest.raises(InfeasibleConfigException):
+        check_config_feasibility(INFEASIBLE_REPORT, strict=True)
+
+
+def test_feasible_report_is_silent(recwarn):
+    check_config_feasibility({"['rot90']": {"pool_size": 10, "pair_acceptance_rate": 0.5}}, strict=True)
+    assert not recwarn.list
+
+
+def test_report_is_computed_once_per_config(core, config):
+    gen = Generator(config, core=core)
+    assert set(gen.feasibility_report) == {"['translate_up']", "['rot90']"}
+    assert Generator(config, seed=1, core=core).feasibility_report is gen.feasibility_report
+    assert Generator(config, core=core, check_feasibility="off").feasibility_report is None
+
+
+def test_with_config_does_not_check_feasibility_by_default(core, config):
+    gen = Generator(config, core=core, check_feasibility="off")
+    other_config = dict(config, allowed_combinations=[["mirror_vertical"]])
+    assert gen.with_config(other_config).feasibility_report is None
+    assert gen.with_config(other_config, check_feasibility="warn").feasibility_report is not None
+
+
+def test_feasibility_table_matches_the_transforms(shape_library):
+    import numpy as np
+
+    from arcworld import hdf5_utils
+    from calculate_transform_feasibility import calculate_shape_feasibility
+
+    feasibility = hdf5_utils.load_transform_feasibility()
+    if feasibility is None:
+        pytest.skip("The shape dataset has no feasibility table")
+    transform_names, table = feasibility
+    for idx in range(0, len(shape_library), 97):
+        computed = calculate_shape_feasibility(shape_library.get_shape(idx), transform_names)
+        for name, values in zip(("fails", "becomes_empty", "changes", "bbox_delta"), computed):
+            assert np.array_equal(table[name][idx], values), (idx, name)
@@ -0,0 +1,76 @@
+import hashlib
+import sqlite3
+
+import numpy as np
+import pytest
+
+from arcworld.utils.db_utils import HASH_VERSION, BatchedTaskWriter, access_db, get_hash_version, hash_task
+
+
+def get_rows(conn):
+    return conn.execute("SELECT task_key, task_hash, transformations FROM tasks ORDER BY i").fetchall()
+
+
+def test_batched_writer_flushes_full_batches_and_on_close(tmp_path):
+    _, conn = access_db("tasks", str(tmp_path))
+    with BatchedTaskWriter(conn, batch_size=2) as writer:
+        for i in range(3):
+            assert writer.add(f"key_{i}", f"hash_{i}", "['rot90']")
+        assert len(get_rows(conn)) == 2  # The first batch is inserted, the last task is buffered
+    assert get_rows(conn) == [(f"key_{i}", f"hash_{i}", "['rot90']") for i in range(3)]
+    conn.close()
+
+
+def test_batched_writer_detects_duplicates(tmp_path):
+    _, conn = access_db("tasks", str(tmp_path))
+    with BatchedTaskWriter(conn) as writer:
+        assert writer.add("key_0", "hash_0", "['rot90']")
+    with BatchedTaskWriter(conn) as writer:
+        assert not writer.add("key_1", "hash_0", "['rot90']")  # Hash in the database
+        assert writer.add("key_2", "hash_2", "['rot90']")
+        assert not writer.add("key_3", "hash_2", "['rot90']")  # Hash in the buffer
+        assert not writer.add("key_2", "hash_4", "['translate_up']")  # Key in the buffer
+        assert writer.duplicate_rates() == {
+            "['rot90']": {"accepted": 1, "duplicates": 2, "duplicate_rate": 2 / 3},
+            "['translate_up']": {"accepted": 0, "duplicates": 1, "duplicate_rate": 1.0},
+        }
+    assert [row[0] for row in get_rows(conn)] == ["key_0", "key_2"]
+    conn.close()
+
+
+def test_batched_writer_drops_its_buffer_on_error(tmp_path):
+    _, conn = access_db("tasks", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with BatchedTaskWriter(conn) as writer:
+            writer.add("key_0", "hash_0", "['rot90']")
+            raise RuntimeError()
+    assert get_rows(conn) == []
+    conn.close()
+
+
+def test_hash_task_tells_transposed_grid_shapes_apart():
+    grid = np.arange(20).reshape(4, 5) % 10
+    assert hash_task(grid.tolist(), ["rot90"]) != hash_task(grid.reshape(5, 4).tolist(), ["rot90"])
+
+
+def test_version_1_hashes_are_unchanged():
+    grid = [[1, 2], [3, 4]]
+    expected = hashlib.sha256(np.array(grid, dtype=np.uint8).tobytes() + b"rot90|translate_up").hexdigest()
+    assert hash_task(grid, ["rot90", "translate_up"], version=1) == expected
+
+
+def test_databases_keep_the_hash_version_they_were_created_with(tmp_path):
+    _, conn = access_db("new", str(tmp_path))
+    assert get_hash_version(conn) == HASH_VERSION
+    conn.close()
+
+    with sqlite3.connect(str(tmp_path / "legacy.db")) as conn:  # Created before the hashes were versioned
+        conn.execute("CREATE TABLE tasks (i INTEGER PRIMARY KEY AUTOINCREMENT, task_key TEXT UNIQUE, "
+                     "task_hash TEXT UNIQUE, transformations TEXT)")
+        conn.execute("INSERT INTO tasks (task_key, task_hash, transformations) VALUES (?, ?, ?)",
+                     ("key", hash_task([[1]], ["rot90"], version=1), "['rot90']"))
+    _, conn = access_db("legacy", str(tmp_path))
+    with BatchedTaskWriter(conn) as writer:
+        assert writer.hash_version == 1
+        assert not writer.add("other_key", hash_task([[1]], ["rot90"], version=writer.hash_version), "['rot90']")
+    conn.close()
@@ -0,0 +1,23 @@
+from arcworld.generator import Generator
+
+
+def test_suite_plans_are_compiled_once_per_config(shape_dataset, config):
+    gen = Generator(config, seed=0)
+    plans = gen.allowed_suite_plans
+    assert [plan.transform_suite for plan in plans] == config["allowed_combinations"]
+    for plan in plans:
+        assert gen.get_suite_plan(plan.transform_suite) is plan
+        # Shapes satisfying the compulsory conditionals and none of the constraints of the suite
+        assert len(plan.shape_ids)
+        for name in config["shape_compulsory_conditionals"]:
+            assert gen.conditionals_index.column(name)[plan.shape_ids].all()
+        for name in plan.shape_constraints:
+            assert not gen.conditionals_index.column(name)[plan.shape_ids].any()
+
+
+def test_generators_share_the_core(core, config):
+    gen = Generator(config, seed=0)
+    assert gen.core is core and gen.shape_library is core.shape_library
+    other = gen.with_config(dict(config, allowed_combinations=[["mirror_vertical"]]), seed=1)
+    assert other.core is core
+    assert [plan.transform_suite for plan in other.allowed_suite_plans] == [["mirror_vertical"]]
@@ -0,0 +1,86 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from arcworld.constants import MAX_GRID_SIZE
+from arcworld.point_cloud.point_cloud import PointCloud
+from arcworld.point_cloud.utils import pc_to_full_sized_grid
+from arcworld.shapes.base import Shape
+from arcworld.transformations.geometric_transformations import LINEAR_MAPS, TRANSLATIONS, GeometricMap
+from arcworld.transformations.shape_transformations import (apply_transform_suite, compile_transform_suite,
+                                                            transformations_dict)
+
+GEOMETRIC_TRANSFORMS = list(TRANSLATIONS) + list(LINEAR_MAPS)
+RASTERS = {"rot90": lambda grid: np.rot90(grid, 1), "mirror_horizontal": np.flipud, "mirror_vertical": np.fliplr}
+
+
+def baseline_step(shape, transform_name):
+    '''Geometric transforms of the original code: moves, and rasters on full sized grids'''
+    x, y = shape.current_position
+    if transform_name in TRANSLATIONS:
+        dx, dy = TRANSLATIONS[transform_name]
+        new_shape = Shape(shape)
+        new_shape.move_to_position((x + dx, y + dy))
+        return new_shape
+    new_shape = Shape(RASTERS[transform_name](pc_to_full_sized_grid(shape.pc, MAX_GRID_SIZE, MAX_GRID_SIZE)))
+    new_shape.move_to_position((x, y))
+    return new_shape
+
+
+def outcome(function, shape):
+    '''Points of the transformed shape, in order, or the type of the exception raised'''
+    try:
+        shape = function(shape)
+    except Exception as e:
+        return type(e)
+    return [(tuple(int(v) for v in idx), int(color)) for idx, color in shape.pc.items()]
+
+
+SHAPES = {
+    "l_shape": Shape({(3, 4): 1, (4, 4): 1, (5, 4): 1, (5, 5): 2}),
+    "colorless_points": Shape(PointCloud({(2, 6): 0, (3, 3): 4, (3, 4): 5, (4, 3): 4, (5, 7): 0})),
+    "at_origin": Shape({(0, 0): 3, (0, 1): 3, (1, 0): 7}),
+}
+SUITES = [list(suite) for n in (1, 2, 3) for suite in itertools.product(GEOMETRIC_TRANSFORMS, repeat=n)]
+
+
+@pytest.mark.parametrize("name", SHAPES)
+def test_fused_suites_match_the_step_by_step_rasters(name):
+    shape = SHAPES[name]
+    for suite in SUITES:
+        stages = compile_transform_suite(suite)
+        assert len(stages) == 1 and isinstance(stages[0], GeometricMap)
+
+        def baseline(shape):
+            for t in suite:
+                shape = baseline_step(shape, t)
+            return shape
+
+        expected = outcome(baseline, shape)
+        assert outcome(lambda shape: apply_transform_suite(shape, stages), shape) == expected, suite
+        assert outcome(lambda shape: apply_transform_suite(shape, [transformations_dict[t] for t in suite]),
+                       shape) == expected, suite
+
+
+def test_geometric_steps_are_fused_around_raster_steps():
+    stages = compile_transform_suite(["rot90", "translate_up", "fill_holes_same_color", "mirror_vertical"])
+    assert len(stages) == 3 and stages[1] is transformations_dict["fill_holes_same_color"]
+    assert isinstance(stages[0], GeometricMap) and isinstance(stages[2], GeometricMap)
+    assert stages[0].steps == ["rot90", "translate_up"]
+
+
+def test_fused_suites_on_library_shapes(shape_library):
+    rng = np.random.default_rng(0)
+    for idx in range(0, len(shape_library), 11):
+        shape = shape_library.get_shape(idx)
+        shape.move_to_position((int(rng.integers(3)), int(rng.integers(3))))
+        suite = list(rng.choice(GEOMETRIC_TRANSFORMS, size=int(rng.integers(1, 5))))
+
+        def baseline(shape):
+            for t in suite:
+                shape = baseline_step(shape, t)
+            return shape
+
+        fused = outcome(lambda shape: apply_transform_suite(shape, compile_transform_suite(suite)), shape)
+        assert fused == outcome(baseline, shape), (idx, suite)
@@ -0,0 +1,77 @@
+import h5py
+import numpy as np
+import pytest
+
+from arcworld import hdf5_utils
+
+
+@pytest.fixture
+def shapes_file(tmp_path, monkeypatch):
+    """Points the shape dataset functions to a file of the test, returns a function to switch to another file"""
+    def use(name):
+        path = str(tmp_path / name)
+        monkeypatch.setattr(hdf5_utils, "SHAPE_DATASET_PATH", path)
+        return path
+    return use
+
+
+GRIDS = [np.array([[1, 0], [2, 3]]), np.array([[4]]), np.array([[0, 5, 5]]), np.arange(12).reshape(4, 3) % 10]
+
+
+def test_packed_shapes_round_trip(shapes_file):
+    pixels, index = hdf5_utils.pack_grids(GRIDS)
+    with h5py.File(shapes_file("shapes.h5"), "w") as f:
+        hdf5_utils.create_packed_datasets(f, pixels[:0], index[:0])
+        for idx, grid in enumerate(GRIDS):
+            hdf5_utils.save_shape(grid, idx, f)
+        with pytest.raises(ValueError):
+            hdf5_utils.save_shape(GRIDS[0], 7, f)  # Packed shapes can only be appended
+    assert hdf5_utils.get_nr_of_shapes() == len(GRIDS)
+    for idx, grid in enumerate(GRIDS):
+        assert np.array_equal(hdf5_utils.load_shape(idx), grid)
+
+
+
+def test_convert_legacy_file_to_packed(shapes_file):
+    legacy_path = shapes_file("legacy.h5")
+    with h5py.File(legacy_path, "w") as f:
+        for idx, grid in enumerate(GRIDS):
+            hdf5_utils.save_shape(grid, idx, f)
+    conditions = np.array([[1, 0], [0, 1], [1, 1], [0, 0]])
+    hdf5_utils.save_conditions(conditions, ["is_a", "is_b"])
+    table = {flag: np.random.default_rng(0).random((len(GRIDS), 3)) < 0.5 for flag in hdf5_utils.FEASIBILITY_FLAGS}
+    table["bbox_delta"] = np.arange(len(GRIDS) * 3 * 4).reshape(len(GRIDS), 3, 4) - 20
+    hdf5_utils.save_transform_feasibility(["rot90", "translate_up", "pad_shape"], table)
+    with hdf5_utils.open_shape_dataset("a") as f:
+        f[hdf5_utils.TRANSFORM_FEASIBILITY].attrs["position"] = 32
+
+    packed_path = shapes_file("packed.h5")
+    assert hdf5_utils.convert_to_packed(legacy_path, packed_path) == len(GRIDS)
+    with hdf5_utils.open_shape_dataset() as f:
+        assert hdf5_utils.is_packed(f)
+        assert f[hdf5_utils.TRANSFORM_FEASIBILITY].attrs["position"] == 32
+    assert hdf5_utils.get_nr_of_shapes() == len(GRIDS)
+    for idx, grid in enumerate(GRIDS):
+        assert np.array_equal(hdf5_utils.load_shape(idx), grid)
+    loaded_conditions, names = hdf5_utils.load_conditions()
+    assert np.array_equal(loaded_conditions, conditions) and names == ["is_a", "is_b"]
+    transform_names, loaded_table = hdf5_utils.load_transform_feasibility()
+    assert transform_names == ["rot90", "translate_up", "pad_shape"]
+    for name, values in table.items():
+        assert np.array_equal(loaded_table[name], values), name
+
+    with pytest.raises(ValueError):
+        hdf5_utils.convert_to_packed(packed_path, shapes_file("twice.h5"))
+
+
+def test_transform_feasibility_round_trip(shapes_file):
+    with h5py.File(shapes_file("shapes.h5"), "w"):
+        pass
+    assert hdf5_utils.load_transform_feasibility() is None
+    table = {flag: np.random.default_rng(0).random((len(GRIDS), 3)) < 0.5 for flag in hdf5_utils.FEASIBILITY_FLAGS}
+    table["bbox_delta"] = np.arange(len(GRIDS) * 3 * 4).reshape(len(GRIDS), 3, 4) - 20
+    hdf5_utils.save_transform_feasibility(["rot90", "translate_up", "pad_shape"], table)
+    transform_names, loaded_table = hdf5_utils.load_transform_feasibility()
+    assert transform_names == ["rot90", "translate_up", "pad_shape"]
+    for name, values in table.items():
+        assert np.array_equal(loaded_table[name], values), name
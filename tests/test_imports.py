@@ -0,0 +1,8 @@
+import pytest
+
+from benchmarks.bench_import import CORE_MODULES, time_import
+
+
+@pytest.mark.parametrize("module", CORE_MODULES)
+def test_generation_modules_do_not_import_plotting_libraries(module):
+    assert time_import(module)["modules"] == []
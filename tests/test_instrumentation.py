@@ -0,0 +1,66 @@
+import csv
+import json
+
+from arcworld.utils.instrumentation import RejectionStats, StageTimer, write_stage_report
+
+
+def test_stage_timer_accumulates_and_merges_snapshots():
+    timer = StageTimer(enabled=True)
+    for _ in range(3):
+        with timer.stage("outer"):
+            with timer.stage("inner"):
+                pass
+    timer.count("failures", 2)
+    snapshot = timer.pop_snapshot()
+    assert snapshot["stages"]["outer"]["calls"] == 3
+    assert snapshot["stages"]["outer"]["seconds"] >= snapshot["stages"]["inner"]["seconds"]  # Stages are nested
+    assert snapshot["counters"] == {"failures": 2}
+    assert timer.snapshot() == {"stages": {}, "counters": {}}
+
+    timer.merge(snapshot)
+    timer.merge(snapshot)
+    assert timer.snapshot()["stages"]["inner"]["calls"] == 6
+    assert timer.snapshot()["counters"] == {"failures": 4}
+
+
+def test_disabled_timer_records_nothing():
+    timer = StageTimer()
+    with timer.stage("outer"):
+        pass
+    timer.count("failures")
+    assert timer.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_stage_reports_are_written_as_json_or_csv(tmp_path):
+    reports = {"train": {"stages": {"outer": {"calls": 2, "seconds": 0.5}}, "counters": {"failures": 1}}}
+    write_stage_report(reports, str(tmp_path / "stages.json"))
+    with open(tmp_path / "stages.json") as f:
+        assert json.load(f) == reports
+    write_stage_report(reports, str(tmp_path / "stages.csv"))
+    with open(tmp_path / "stages.csv", newline="") as f:
+        assert list(csv.reader(f)) == [
+            ["config", "kind", "name", "calls", "seconds"],
+            ["train", "stage", "outer", "2", "0.500000"],
+            ["train", "counter", "failures", "1", ""],
+        ]
+
+
+def test_rejection_report_sorts_the_suites_by_rejections():
+    stats = RejectionStats()
+    stats.count(["translate_up"], "pair_attempts")
+    stats.count(["translate_up"], "pairs")
+    stats.count(["translate_up"], "duplicate")
+    stats.count(["rot90"], "pair_attempts", 4)
+    stats.count(["rot90"], "does_not_fit", 3)
+    stats.count(["rot90"], "pairs")
+    stats.count(["rot90"], "accepted_tasks")
+    merged = RejectionStats()
+    merged.merge(stats.pop_snapshot())
+    assert not stats.snapshot()
+
+    report = merged.report()
+    assert list(report) == ["['rot90']", "['translate_up']"]
+    assert report["['rot90']"]["rejections"] == 3
+    assert report["['rot90']"]["pair_acceptance_rate"] == 0.25
+    assert report["['rot90']"]["task_acceptance_rate"] == 1.0
+    assert report["['translate_up']"]["task_acceptance_rate"] == 0.0
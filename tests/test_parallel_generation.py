@@ -0,0 +1,106 @@
+import pytest
+
+from arcworld.utils import parallel_generation
+from arcworld.utils.instrumentation import RejectionStats
+
+
+def test_split_quotas():
+    assert parallel_generation.split_quotas(10, 3) == [4, 3, 3]
+    assert sum(parallel_generation.split_quotas(7, 7)) == 7
+
+
+def test_generate_balanced_tasks_fills_every_quota(shape_dataset, config):
+    hashes = set()
+    suites = []
+
+    def accept_task(i, task, task_hash):  # The coordinator drops the duplicates
+        if task_hash in hashes:
+            return False
+        hashes.add(task_hash)
+        suites.append(task["transformation_suite"])
+        return True
+
+    state = parallel_generation.generate_balanced_tasks(config, 5, accept_task, n_workers=2, seed=0, max_chunk_size=2)
+    assert state["n_accepted"] == [3, 2]
+    assert sorted(suites) == [["rot90"]] * 2 + [["translate_up"]] * 3
+
+
+def test_generate_balanced_tasks_does_not_depend_on_the_workers(shape_dataset, config):
+    def run(n_workers):
+        tasks = []
+        parallel_generation.generate_balanced_tasks(
+            config, 10, lambda i, task, task_hash: tasks.append((i, task_hash)) or True, n_workers=n_workers, seed=3
+        )
+        return tasks
+
+    assert sorted(run(1)) == sorted(run(2))
+
+
+def test_generate_task_chunk_counts_failed_attempts(shape_dataset, config, monkeypatch):
+    def fail(task, task_key):
+        raise ValueError("export failed")
+
+    parallel_generation.init_worker(config, entropy=0)
+    monkeypatch.setattr(parallel_generation, "adapt_task_format", fail)
+    with pytest.warns(UserWarning, match="ValueError: export failed"):
+        tasks, _, rejections, _ = parallel_generation.generate_task_chunk(0, 0, 3)
+    assert tasks == []
+    stats = RejectionStats()
+    stats.merge(rejections)
+    assert stats.report()["['translate_up']"]["task_error"] == 3
+
+
+def test_instrumentation_does_not_change_the_tasks(shape_dataset, config):
+    from arcworld.utils.instrumentation import StageTimer
+
+    def run(timer):
+        hashes = []
+        parallel_generation.generate_balanced_tasks(
+            config, 6, lambda i, task, task_hash: hashes.append(task_hash) or True, n_workers=2, seed=1, timer=timer
+        )
+        return hashes
+
+    timer = StageTimer(enabled=True)
+    assert sorted(run(timer)) == sorted(run(None))
+    stages = timer.snapshot()["stages"]
+    assert {"set_up_initial_grid", "hash_task", "accept_task"} <= set(stages)  # Workers and coordinator
+
+
+def test_generate_balanced_tasks_skips_stalled_suites(shape_dataset, config, monkeypatch):
+    monkeypatch.setattr(parallel_generation.Generator, "generate_single_task", lambda self, task_index=None: {})
+    with pytest.warns(UserWarning, match="skipped after 40 attempts"):
+        state = parallel_generation.generate_balanced_tasks(
+            config, 4, lambda i, task, task_hash: True, seed=0, max_attempts_without_progress=40
+        )
+    assert state["n_accepted"] == [0, 0]
+    assert state["next_attempt"] == [40, 40]
+
+
+def test_duplicates_count_as_no_progress(shape_dataset, config):
+    accepted = []
+
+    def accept_first_tasks(i, task, task_hash):  # Every task after the first two of a suite is a duplicate
+        if sum(j == i for j in accepted) >= 2:
+            return False
+        accepted.append(i)
+        return True
+
+    with pytest.warns(UserWarning, match="skipped"):
+        state = parallel_generation.generate_balanced_tasks(
+            config, 10, accept_first_tasks, seed=0, max_chunk_size=7, max_attempts_without_progress=15
+        )
+    assert state["n_accepted"] == [2, 2]
+    assert [n - last for n, last in zip(state["next_attempt"], state["last_progress"])] == [15, 15]
+
+
+def test_profile_covers_the_workers_and_the_coordinator(shape_dataset, config):
+    from arcworld.utils.instrumentation import ProfileStats
+
+    def accept_task(i, task, task_hash):
+        return True
+
+    profile = ProfileStats(enabled=True)
+    parallel_generation.generate_balanced_tasks(config, 6, accept_task, n_workers=2, seed=0, profile=profile)
+    functions = {function for _, _, function in profile.stats.stats}
+    assert "_generate_single_task" in functions  # Run in the workers
+    assert "accept_task" in functions
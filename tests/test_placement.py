@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from arcworld.constants import (DoesNotFitException, EmptyShapeException, ShapeOutsideWorldException,
+                                ShapeOverlapException)
+from arcworld.general_utils import (PlacementContext, find_possible_positions_no_diagonal, get_danger_zone,
+                                    get_placement_error, position_shape_in_world, sample_position_no_diagonal)
+from arcworld.shapes.base import Shape
+
+
+def loop_find_possible_positions_no_diagonal(world, shape_grid):
+    """Per position search replaced by the correlation"""
+    n_rows, n_cols = shape_grid.shape
+    danger_zone = get_danger_zone(world)
+    return [(x, y) for x in range(world.shape[0] - n_rows + 1) for y in range(world.shape[1] - n_cols + 1)
+            if not np.any(danger_zone[x:x + n_rows, y:y + n_cols] & (shape_grid != 0))]
+
+
+def test_possible_positions_match_the_per_position_search():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        world = np.where(rng.random((12, 15)) < 0.1, rng.integers(1, 10, (12, 15)), 0)
+        shape_grid = np.where(rng.random((3, 4)) < 0.6, rng.integers(1, 10, (3, 4)), 0)
+        expected = loop_find_possible_positions_no_diagonal(world, shape_grid)
+        assert find_possible_positions_no_diagonal(world, shape_grid) == expected
+
+
+def test_sampled_positions_are_drawn_like_the_possible_positions():
+    world = np.zeros((6, 7), dtype=int)
+    world[0, 0] = 1
+    shape_grid = np.ones((2, 2), dtype=int)
+    positions = find_possible_positions_no_diagonal(world, shape_grid)
+    for seed in range(10):
+        expected = positions[np.random.default_rng(seed).integers(len(positions))]
+        assert sample_position_no_diagonal(world, shape_grid, rng=seed) == expected
+    with pytest.raises(DoesNotFitException):
+        sample_position_no_diagonal(world, np.ones((7, 7), dtype=int))
+
+
+def test_placement_context_keeps_shapes_apart():
+    world = np.zeros((8, 8), dtype=int)
+    context = PlacementContext(world)
+    rng = np.random.default_rng(0)
+    square = Shape({(0, 0): 1, (0, 1): 1, (1, 0): 1, (1, 1): 1})
+    for _ in range(3):
+        placed = context.add_shape(square, rng)
+        assert world[placed.current_position] == 1
+    # No position left can touch a placed shape, diagonals included
+    for x, y in find_possible_positions_no_diagonal(world, square.as_shape_only_grid):
+        assert not world[max(x - 1, 0):x + 3, max(y - 1, 0):y + 3].any()
+    x, y = placed.current_position
+    assert context.touches(Shape({(x + 2, y + 2): 1}))
+
+
+def test_incremental_danger_zone_matches_a_full_recompute():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        world = np.zeros((9, 11), dtype=int)
+        world[rng.integers(9), rng.integers(11)] = 5  # Shape already in the world
+        context = PlacementContext(world)
+        for _ in range(4):
+            points = {(int(x), int(y)): int(rng.integers(1, 10)) for x, y in rng.integers(0, 3, size=(4, 2))}
+            shape = Shape(points)
+            # Anywhere in the world, borders included: commit does not check for overlaps
+            shape.move_to_position((int(rng.integers(0, 7)), int(rng.integers(0, 9))))
+            context.commit(shape)
+            assert np.array_equal(context.occupancy, world != 0)
+            assert np.array_equal(context.danger_zone, get_danger_zone(world != 0))
+
+
+def test_position_shape_in_world_writes_the_shape():
+    world = np.zeros((6, 6), dtype=int)
+    new_world = position_shape_in_world(world, Shape({(1, 2): 3, (2, 2): 4}))
+    assert new_world[1, 2] == 3 and new_world[2, 2] == 4 and np.count_nonzero(new_world) == 2
+    assert not world.any()
+
+
+def test_overlap_is_only_checked_under_the_colored_pixels():
+    world = np.zeros((6, 6), dtype=int)
+    world[0, 0] = 1
+    assert get_placement_error(world, Shape({(0, 0): 0, (0, 1): 2})) is None
+    assert isinstance(get_placement_error(world, Shape({(0, 0): 2})), ShapeOverlapException)
+    with pytest.raises(ShapeOverlapException):
+        position_shape_in_world(world, Shape({(0, 0): 2}))
+
+
+@pytest.mark.parametrize("colorless_point", [(-1, 3), (3, -1), (6, 3), (3, 6)])
+def test_colorless_points_out_of_the_world_are_rejected(colorless_point):
+    world = np.zeros((6, 6), dtype=int)
+    world[5, 3] = 7
+    shape = Shape({colorless_point: 0, (0, 3): 5})
+    assert isinstance(get_placement_error(world, shape), ShapeOutsideWorldException)
+    with pytest.raises(DoesNotFitException):
+        position_shape_in_world(world, shape)
+    assert world[5, 3] == 7
+
+
+def test_colorless_points_are_not_written():
+    world = np.zeros((6, 6), dtype=int)
+    new_world = position_shape_in_world(world, Shape({(2, 2): 0, (2, 3): 5}))
+    assert np.count_nonzero(new_world) == 1
+    new_world[2, 2] = 1
+    # Unchecked writes do not erase the cells under colorless points either
+    assert position_shape_in_world(new_world, Shape({(2, 2): 0}), check_for_overlap=False)[2, 2] == 1
+
+
+def test_colorless_shape_can_not_be_placed():
+    assert isinstance(get_placement_error(np.zeros((3, 3), dtype=int), Shape({(1, 1): 0})), EmptyShapeException)
+
+
+def test_placement_retries_only_replace_the_shape_that_does_not_fit(shape_library, config):
+    from arcworld.generator import Generator
+
+    small = np.flatnonzero((shape_library.n_rows == 1) & (shape_library.n_cols == 1))
+    large = np.flatnonzero((shape_library.n_rows >= 5) & (shape_library.n_cols >= 5))
+    gen = Generator(dict(config, max_placement_retries=2), seed=0, instrument=True, check_feasibility="off")
+    world = np.zeros((4, 4), dtype=int)
+    kept = shape_library.get_shape(int(small[0]))
+    shapes = [kept, shape_library.get_shape(int(large[0]))]
+    placed = gen.place_shapes_with_retries(PlacementContext(world), shapes, small)
+
+    # The large shape is placed first, does not fit and is replaced by a small one. The small shape is kept.
+    assert [shape.library_id for shape in placed[1:]] == [kept.library_id]
+    assert placed[0].library_id in small
+    assert np.count_nonzero(world) == 2
+    assert gen.timer.counters["placement_retries"] == 1
+
+    with pytest.raises(DoesNotFitException):
+        context = PlacementContext(np.zeros((4, 4), dtype=int))
+        gen.place_shapes_with_retries(context, [shape_library.get_shape(int(large[0]))], large)
+    assert gen.timer.counters["placement_retries"] == 3
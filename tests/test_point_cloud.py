@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from arcworld.constants import MAX_GRID_SIZE, ShapeOutOfBounds
+from arcworld.point_cloud.point_cloud import PointCloud
+from arcworld.point_cloud.utils import pc_to_full_sized_grid, pc_to_shape_only_grid
+from arcworld.shapes.base import Shape
+from arcworld.shapes.utils import grid_to_pc
+
+
+def test_grid_to_pc_round_trip():
+    grid = np.array([[0, 3, 0], [2, 0, 0], [0, 0, 7]])
+    pc = grid_to_pc(grid)
+    assert dict(pc.items()) == {(0, 1): 3, (1, 0): 2, (2, 2): 7}
+    assert np.array_equal(pc_to_shape_only_grid(pc), grid)
+    assert np.array_equal(pc_to_full_sized_grid(pc, 3, 3), grid)
+
+
+def test_full_sized_grids_share_their_default_size():
+    small = Shape({(0, 0): 1})
+    large = Shape({(4, 2): 1, (5, 6): 2})
+    assert small.grid.shape == large.grid.shape == (MAX_GRID_SIZE, MAX_GRID_SIZE)
+    assert (large.grid - small.grid).sum() == 2
+
+
+def test_full_sized_grid_keeps_colorless_points_out_of_the_grid():
+    pc = PointCloud({(1, 1): 4, (2, 3): 0})
+    grid = pc_to_full_sized_grid(pc)
+    assert grid.shape == (MAX_GRID_SIZE, MAX_GRID_SIZE)
+    assert grid[1, 1] == 4 and np.count_nonzero(grid) == 1
+
+
+@pytest.mark.parametrize("coords", [(-1, 0), (0, -1), (MAX_GRID_SIZE, 0)])
+def test_full_sized_grid_rejects_out_of_bounds_points(coords):
+    with pytest.raises(ShapeOutOfBounds):
+        pc_to_full_sized_grid(PointCloud({coords: 1}))
@@ -0,0 +1,38 @@
+import os
+
+import h5py
+import numpy as np
+
+from arcworld import hdf5_utils
+from arcworld.shape_library import ShapeLibrary, get_cache_paths
+
+GRIDS = [np.array([[1, 0], [2, 3]]), np.array([[4]]), np.array([[0, 5, 5]]), np.arange(12).reshape(4, 3) % 10]
+
+
+def test_library_shapes_match_the_grids():
+    library = ShapeLibrary.from_grids(GRIDS)
+    assert len(library) == len(GRIDS)
+    assert library.n_rows.tolist() == [2, 1, 1, 4] and library.n_cols.tolist() == [2, 1, 3, 3]
+    for idx, grid in enumerate(GRIDS):
+        assert np.array_equal(library.get_grid(idx), grid)
+        assert not library.get_grid(idx).flags.writeable
+        points = {(x, y): color for (x, y), color in np.ndenumerate(grid) if color}
+        assert dict(library.get_shape(idx).pc.items()) == points
+    # The point cloud is built once, moving a shape does not move the other shapes sharing it
+    shape = library.get_shape(0)
+    shape.move_to_position((5, 7))
+    assert library.get_shape(0).current_position == (0, 0)
+
+
+def test_cached_library_matches_the_shapes_file(tmp_path):
+    path = str(tmp_path / "shapes.h5")
+    with h5py.File(path, "w") as f:
+        for idx, grid in enumerate(GRIDS):
+            hdf5_utils.save_shape(grid, idx, f)
+
+    for _ in range(2):  # The first load writes the cache, the second one only reads it
+        library = ShapeLibrary.load(path)
+        for idx, grid in enumerate(GRIDS):
+            assert np.array_equal(library.get_grid(idx), grid)
+    assert isinstance(library.pixels, np.memmap)
+    assert all(os.path.exists(cache_path) for cache_path in get_cache_paths(path))
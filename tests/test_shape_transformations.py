@@ -0,0 +1,112 @@
+import pytest
+import scipy
+
+from arcworld.conditionals.single_shape_conditionals import is_shape_hollow
+from arcworld.constants import MAX_GRID_SIZE
+from arcworld.point_cloud.point_cloud import PointCloud
+from arcworld.point_cloud.utils import pc_to_full_sized_grid
+from arcworld.shapes.base import Shape
+from arcworld.transformations.shape_transformations import (crop_bottom_side, crop_right_side,
+                                                            fill_holes_different_color, fill_holes_same_color)
+
+## Raster transforms of the original code, on full sized grids, as a reference
+
+
+def full_sized_grid(shape):
+    return pc_to_full_sized_grid(shape.pc, MAX_GRID_SIZE, MAX_GRID_SIZE)
+
+
+def baseline_fill_holes_same_color(shape):
+    if is_shape_hollow(shape):
+        grid = full_sized_grid(shape)
+        return Shape(scipy.ndimage.binary_fill_holes(grid).astype(int) * shape.most_frequent_color)
+    return shape
+
+
+def baseline_fill_holes_different_color(shape):
+    if is_shape_hollow(shape):
+        new_color = (shape.most_frequent_color % 9) + 1
+        grid = full_sized_grid(shape)
+        filled_shape = Shape(scipy.ndimage.binary_fill_holes(grid).astype(int) * shape.colors[0])
+        filling_diff = ((full_sized_grid(filled_shape) - grid) != 0) * new_color
+        return Shape(filling_diff + grid)
+    return shape
+
+
+def canonical(shape):
+    return sorted((tuple(int(v) for v in idx), int(color)) for idx, color in shape.pc.items() if color != 0)
+
+
+def outcome(transform, shape):
+    '''Colored pixels of the transformed shape, or the type of the exception raised by the transform'''
+    try:
+        return canonical(transform(shape))
+    except Exception as e:
+        return type(e)
+
+
+def ring(n_rows, n_cols, color=3, position=(2, 3)):
+    x, y = position
+    return {
+        (x + i, y + j): color
+        for i in range(n_rows)
+        for j in range(n_cols)
+        if i in (0, n_rows - 1) or j in (0, n_cols - 1)
+    }
+
+
+def with_colorless_points(points, colorless, first=False):
+    pc = {point: 0 for point in colorless} if first else {}
+    pc.update(points)
+    if not first:
+        pc.update({point: 0 for point in colorless})
+    return Shape(PointCloud(pc))
+
+
+HOLLOW_SHAPES = {
+    "ring": Shape(ring(4, 5)),
+    "colorless_last_row": with_colorless_points(ring(4, 5), [(6, 4)]),
+    "colorless_last_column": with_colorless_points(ring(3, 3), [(3, 6)]),
+    "colorless_last_row_and_column": with_colorless_points(ring(5, 4), [(7, 3), (4, 7)]),
+    "colorless_first_point": with_colorless_points(ring(4, 4), [(2, 8)], first=True),
+    "at_origin": with_colorless_points(ring(3, 4, position=(0, 0)), [(0, 4)]),
+    # Right column only colored in the bottom half: cropping the bottom half leaves it colorless
+    "cropped_bottom": crop_bottom_side(Shape({**ring(3, 3, color=5, position=(1, 1)), (5, 4): 5})),
+    "cropped_right": crop_right_side(Shape({**ring(3, 3, color=5, position=(1, 1)), (4, 5): 5})),
+}
+
+
+FILL_TRANSFORMS = [
+    (fill_holes_different_color, baseline_fill_holes_different_color),
+    (fill_holes_same_color, baseline_fill_holes_same_color),
+]
+
+
+@pytest.mark.parametrize("name", HOLLOW_SHAPES)
+@pytest.mark.parametrize("transform, baseline", FILL_TRANSFORMS)
+def test_fill_holes_matches_the_full_sized_grids(name, transform, baseline):
+    shape = HOLLOW_SHAPES[name]
+    assert is_shape_hollow(shape)
+    assert outcome(transform, shape) == outcome(baseline, shape)
+
+
+def test_cropped_shapes_have_colorless_borders():
+    grid = HOLLOW_SHAPES["cropped_bottom"].as_shape_only_grid
+    assert not grid[:, -1].any()
+    grid = HOLLOW_SHAPES["cropped_right"].as_shape_only_grid
+    assert not grid[-1, :].any()
+
+
+@pytest.mark.parametrize("transform, baseline", FILL_TRANSFORMS)
+def test_fill_holes_on_library_shapes(shape_library, transform, baseline):
+    for idx in range(0, len(shape_library), 7):
+        for crop in (crop_bottom_side, crop_right_side):
+            shape = shape_library.get_shape(idx)
+            shape.move_to_position((4, 5))
+            try:
+                shape = crop(shape)
+            except Exception:
+                continue
+            if shape.is_null or not is_shape_hollow(shape):
+                continue
+            assert outcome(transform, shape) == outcome(baseline, shape), idx
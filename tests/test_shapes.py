@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from arcworld.shapes import Diamond, Rectangle, Single_Pixel, StraightLine, TShape
+from arcworld.shapes.random_shape import RandomShape
+
+
+def test_random_shape_only_depends_on_its_seed():
+    np.random.seed(0)
+    first = RandomShape(rng=5).as_shape_only_grid
+    np.random.seed(1)
+    assert np.array_equal(first, RandomShape(rng=5).as_shape_only_grid)
+
+
+@pytest.mark.parametrize("make_shape", [
+    lambda rng: Diamond(5, 5, None, rng=rng),
+    lambda rng: Rectangle(6, 6, "hor_line", rng=rng),
+    lambda rng: Single_Pixel(1, 1, rng=rng),
+    lambda rng: StraightLine(8, 8, rng=rng),
+    lambda rng: TShape(6, 6, rng=rng),
+])
+def test_basic_shapes_only_depend_on_their_seed(make_shape):
+    state = np.random.get_state()
+    grids = [make_shape(np.random.default_rng(seed)).as_shape_only_grid for seed in (3, 3, 4, 5, 6)]
+    assert np.array_equal(np.random.get_state()[1], state[1])  # The global state is not used
+    assert np.array_equal(grids[0], grids[1])
+    assert any(not np.array_equal(grids[0], grid) for grid in grids[2:])
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from arcworld.constants import DoesNotFitException
+from arcworld.generator import Generator
+from arcworld.utils import parallel_generation
+from arcworld.utils.task_enumeration import IndexPermutation, TaskSpace
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 17, 1000, 4097])
+def test_index_permutation_is_a_permutation(n):
+    permutation = IndexPermutation(n, keys=[1, 2, 3, 4])
+    assert sorted(permutation[i] for i in range(n)) == list(range(n))
+    with pytest.raises(IndexError):
+        permutation[n]
+
+
+def test_index_permutation_depends_on_its_keys():
+    first, second = IndexPermutation(1000, keys=[1, 2, 3, 4]), IndexPermutation(1000, keys=[5, 6, 7, 8])
+    assert [first[i] for i in range(20)] != [second[i] for i in range(20)]
+
+
+@pytest.fixture
+def enumeration_config(config):
+    return dict(config, min_grid_size=4, max_grid_size=5, n_examples=1, allowed_combinations=[["translate_up"]],
+                shape_compulsory_conditionals=["is_shape_less_than_3_rows", "is_shape_less_than_3_cols"],
+                enumerate_tasks=True)
+
+
+def test_count_inputs_matches_the_distinct_grids_of_the_candidates(core, enumeration_config):
+    gen = Generator(dict(enumeration_config, max_grid_size=4), core=core, check_feasibility="off")
+    plan = gen.allowed_suite_plans[0]
+    plan.shape_ids = plan.shape_ids[:6]
+    task_space = TaskSpace(plan, gen.config, gen.shape_library, seed=0)
+    candidates, grids = set(), set()
+    for attempt in range(task_space.n_attempts):
+        candidate = task_space.get_candidate(attempt)
+        if candidate is None:
+            continue
+        grid_size, shape_ids, positions = candidate
+        key = (grid_size, tuple(shape_ids), tuple(positions))
+        assert key not in candidates
+        candidates.add(key)
+        try:
+            grid, _ = gen.place_candidate(candidate)
+        except DoesNotFitException:
+            continue
+        grids.add((grid.shape, grid.tobytes()))
+    assert grids and task_space.count_inputs() == len(grids)
+    assert len(candidates) <= task_space.n_candidates
+
+
+def test_enumeration_and_generator_seeds_are_independent():
+    generator_seed = np.random.SeedSequence(7, spawn_key=(0,))
+    enumeration_seed = parallel_generation.get_enumeration_seed(7, 0)
+    assert enumeration_seed.spawn_key != generator_seed.spawn_key
+    task_seeds = [np.random.SeedSequence(7, spawn_key=(0, k)).generate_state(4).tolist() for k in range(100)]
+    assert enumeration_seed.generate_state(4).tolist() not in task_seeds + [generator_seed.generate_state(4).tolist()]
+
+
+def test_splits_continuing_the_enumeration_share_no_task(shape_dataset, enumeration_config):
+    config = dict(enumeration_config, allowed_combinations=[["mirror_horizontal"]])
+
+    def run(n_tasks, state):
+        hashes = []
+        state = parallel_generation.generate_balanced_tasks(
+            config, n_tasks, lambda i, task, task_hash: hashes.append(task_hash) or True, seed=0, state=state,
+            check_feasibility="off"
+        )
+        return hashes, state
+
+    train, state = run(50, None)
+    test, _ = run(50, parallel_generation.get_next_split_state(state))
+    assert len(set(train)) == 50 and len(set(test)) == 50
+    assert not set(train) & set(test)
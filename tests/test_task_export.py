@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from arcworld.utils.task_export import TaskArrayDataset, TaskArrayWriter, export_tasks
+
+TASKS = [
+    {"input": [[1, 2, 3], [0, 0, 4]], "output": [[4, 0], [0, 1]], "demo_input": [[5]], "demo_output": [[6]],
+     "transformation_suite": ["rot90"], "task_key": "a1"},
+    {"input": [[0]], "output": [[7, 7]], "transformation_suite": ["translate_up", "rot90"], "task_key": "b2"},
+    {"input": [[9] * 4] * 5, "output": [[8] * 5] * 4, "demo_input": [[1]], "demo_output": [[2]],
+     "transformation_suite": ["rot90"], "task_key": "c3"},
+]
+
+
+def test_tasks_round_trip(tmp_path):
+    path = str(tmp_path / "train.h5")
+    assert export_tasks(TASKS, path) == len(TASKS)
+    with TaskArrayDataset(path) as dataset:
+        assert len(dataset) == len(TASKS)
+        for task, loaded in zip(TASKS, dataset):
+            assert set(loaded) == set(task)
+            for name, value in task.items():
+                if name in ("transformation_suite", "task_key"):
+                    assert loaded[name] == value
+                else:
+                    assert loaded[name].dtype == np.uint8 and not loaded[name].flags.writeable
+                    assert np.array_equal(loaded[name], value), name
+        assert dataset[-1]["task_key"] == "c3"
+        with pytest.raises(IndexError):
+            dataset[len(TASKS)]
+
+
+def test_empty_split_round_trip(tmp_path):
+    path = str(tmp_path / "test.h5")
+    assert export_tasks([], path) == 0
+    with TaskArrayDataset(path) as dataset:
+        assert len(dataset) == 0 and list(dataset) == []
+
+
+def test_aborted_split_writes_nothing(tmp_path):
+    path = tmp_path / "train.h5"
+    with pytest.raises(RuntimeError):
+        with TaskArrayWriter(str(path)) as writer:
+            writer.write(TASKS[0])
+            raise RuntimeError()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+
+import pytest
+
+import generate_experiment_data
+from arcworld.utils.task_shards import ShardedTaskWriter, iter_sharded_tasks, read_manifest
+
+
+def make_tasks(n):
+    return [{"task_key": f"key_{i}", "input": [[i]]} for i in range(n)]
+
+
+def test_resume_drops_the_tasks_written_after_the_last_checkpoint(tmp_path):
+    directory = str(tmp_path / "train")
+    with ShardedTaskWriter(directory, max_tasks_per_shard=2) as writer:
+        for task in make_tasks(3):
+            writer.write(task)
+        writer.checkpoint({"step": 3})
+        for task in make_tasks(6)[3:]:
+            writer.write(task)  # Never checkpointed
+
+    with ShardedTaskWriter(directory, max_tasks_per_shard=2) as writer:
+        assert writer.state == {"step": 3}
+        assert writer.n_tasks == 3
+        writer.write({"task_key": "key_3", "input": [[3]]})
+        writer.finalize({"step": 4})
+    assert [task["task_key"] for task in iter_sharded_tasks(directory)] == [f"key_{i}" for i in range(4)]
+    assert read_manifest(directory)["complete"]
+
+
+def test_resume_before_the_first_checkpoint_starts_a_new_split(tmp_path):
+    directory = str(tmp_path / "train")
+    with ShardedTaskWriter(directory, max_tasks_per_shard=2) as writer:
+        for task in make_tasks(3):
+            writer.write(task)  # Crash before the first checkpoint: two shards, no manifest
+
+    with ShardedTaskWriter(directory, max_tasks_per_shard=2) as writer:
+        assert writer.state is None and writer.n_tasks == 0
+        assert not os.listdir(directory)
+        writer.write({"task_key": "new", "input": [[0]]})
+        writer.finalize()
+    assert [task["task_key"] for task in iter_sharded_tasks(directory)] == ["new"]
+    shard = os.path.join(directory, "train-00000.jsonl")
+    assert read_manifest(directory)["shards"][0]["n_bytes"] == os.path.getsize(shard)
+
+
+def test_resume_after_a_torn_write_appends_after_the_checkpoint(tmp_path):
+    directory = str(tmp_path / "train")
+    with ShardedTaskWriter(directory) as writer:
+        for task in make_tasks(2):
+            writer.write(task)
+        writer.checkpoint({"step": 2})
+    with open(os.path.join(directory, "train-00000.jsonl"), "ab") as f:
+        f.write(b'{"task_key": "torn", "inp')  # Crash in the middle of a write
+
+    with ShardedTaskWriter(directory) as writer:
+        writer.write({"task_key": "key_2", "input": [[2]]})
+        writer.finalize({"step": 3})
+    assert [task["task_key"] for task in iter_sharded_tasks(directory)] == ["key_0", "key_1", "key_2"]
+    shard = os.path.join(directory, "train-00000.jsonl")
+    assert read_manifest(directory)["shards"][0]["n_bytes"] == os.path.getsize(shard)
+
+
+class Crash(Exception):
+    pass
+
+
+def get_db_task_keys(folder):
+    (db_file,) = [name for name in os.listdir(folder) if name.endswith(".db")]
+    with sqlite3.connect(os.path.join(folder, db_file)) as conn:
+        return {task_key for (task_key,) in conn.execute("SELECT task_key FROM tasks")}
+
+
+def test_crash_between_checkpoint_and_flush_is_reconciled_on_resume(shape_dataset, config, tmp_path, monkeypatch):
+    config["saving_path"] = str(tmp_path / "exp" / "train.json")
+    shards_dir = str(tmp_path / "exp" / "train")
+
+    checkpoint = ShardedTaskWriter.checkpoint
+
+    def checkpoint_then_crash(self, state=None):
+        checkpoint(self, state)
+        raise Crash()  # After the manifest is written, before the database is flushed
+
+    monkeypatch.setattr(ShardedTaskWriter, "checkpoint", checkpoint_then_crash)
+    with pytest.raises(Crash):
+        generate_experiment_data.generate_equal_balance_from_transforms(
+            config, 20, seed=0, output_format="jsonl", checkpoint_every=5
+        )
+    checkpointed = {task["task_key"] for task in iter_sharded_tasks(shards_dir)}
+    assert checkpointed and not get_db_task_keys(str(tmp_path / "exp")) & checkpointed
+
+    monkeypatch.setattr(ShardedTaskWriter, "checkpoint", checkpoint)
+    generate_experiment_data.generate_equal_balance_from_transforms(
+        config, 20, seed=0, output_format="jsonl", checkpoint_every=5
+    )
+    stored = [task["task_key"] for task in iter_sharded_tasks(shards_dir)]
+    assert len(stored) == 20 and checkpointed <= set(stored)
+    assert get_db_task_keys(str(tmp_path / "exp")) == set(stored)
@@ -0,0 +1,82 @@
+import numpy as np
+
+from arcworld.constants import MAX_GRID_SIZE
+from arcworld.shapes.base import Shape
+from arcworld.transformations.shape_transformations import (apply_transform_suite, compile_transform_suite,
+                                                            transformations_dict)
+from arcworld.transformations.transform_cache import CANONICAL_POSITION, TransformCache, compute_entry
+
+SUITES = [[t] for t in transformations_dict] + [
+    ["rot90", "translate_up", "fill_holes_different_color"],
+    ["double_up", "double_left", "translate_left"],
+    ["crop_bottom_side", "fill_holes_different_color"],
+    ["extend_contours_same_color", "mirror_vertical", "pad_shape"],
+]
+
+
+def outcome(function, shape):
+    try:
+        shape = function(shape)
+    except Exception as e:
+        return type(e)
+    return [(tuple(int(v) for v in idx), int(color)) for idx, color in shape.pc.items()]
+
+
+def test_canonical_position_leaves_room_in_the_full_sized_grid(shape_library):
+    # Transforms rasterizing a shape at the canonical position build small grids, and never go out of them
+    assert max(CANONICAL_POSITION) + 4 * shape_library.dims.max() < MAX_GRID_SIZE
+
+
+def test_cached_results_match_the_transforms(shape_library):
+    cache = TransformCache()
+    rng = np.random.default_rng(0)
+    for idx in range(0, len(shape_library), 13):
+        for suite in SUITES:
+            for position in rng.integers(0, 12, size=(3, 2)):  # The first lookup computes the entry
+                shape = shape_library.get_shape(idx)
+                shape.move_to_position(tuple(int(v) for v in position))
+                expected = outcome(lambda shape: apply_transform_suite(shape, compile_transform_suite(suite)), shape)
+                assert outcome(lambda shape: cache.apply(shape, suite), shape) == expected, (idx, suite, position)
+    stats = cache.stats()
+    assert stats["hits"] > 0 and stats["uncached"] > 0
+
+
+def test_entries_going_past_the_borders_are_not_used(shape_library):
+    shape = shape_library.get_shape(0)
+    # The input of the last step is at row 0 of the canonical position: the entry can still be used
+    assert compute_entry(shape, ("translate_up",) * (CANONICAL_POSITION[0] + 1)).usable
+    entry = compute_entry(shape, ("translate_up",) * (CANONICAL_POSITION[0] + 2))
+    assert not entry.usable
+    cache = TransformCache()
+    shape.move_to_position((60, 60))
+    result = cache.apply(shape, ("translate_up",) * (CANONICAL_POSITION[0] + 2))
+    assert result.current_position == (60 - CANONICAL_POSITION[0] - 2, 60)
+    assert cache.stats()["uncached"] == 1
+
+
+def test_shapes_outside_the_library_are_not_cached():
+    cache = TransformCache()
+    result = cache.apply(Shape({(2, 2): 1, (2, 3): 2}), ["translate_down"])
+    assert result.current_position == (3, 2)
+    assert cache.stats()["uncached"] == 1 and len(cache) == 0
+
+
+def test_grid_sequence_only_caches_the_full_suite(shape_library, config):
+    from arcworld.generator import Generator
+
+    suite = ["rot90", "translate_up", "mirror_vertical"]
+    gen = Generator(dict(config, allowed_combinations=[suite]), seed=0, check_feasibility="off")
+    gen.transform_cache = TransformCache()
+    shapes = [shape_library.get_shape(idx) for idx in (0, 1)]
+    shapes[0].move_to_position((2, 2))
+    shapes[1].move_to_position((2, 8))
+    input_grid = np.zeros((12, 12), dtype=int)
+    _, sequence = gen.apply_transform_suite_to_grid_2(suite, input_grid, shapes, plan=gen.get_suite_plan(suite))
+
+    assert {key[1] for key in gen.transform_cache._entries} == {tuple(suite)}
+    for step, grid in enumerate(sequence[1:], start=1):
+        expected = np.zeros_like(input_grid)
+        for shape in shapes:
+            transformed = apply_transform_suite(shape, compile_transform_suite(suite[:step]))
+            expected[transformed.x_vals, transformed.y_vals] = transformed.colors
+        assert np.array_equal(grid, expected), step